@@ -1,6 +1,12 @@
 import streamlit as st
-import os
-from PIL import Image
+
+from utils.answer_cache import prewarm_async
+from utils.config import get_setting, get_int_setting
+from utils.image_cache import get_image_cache, warm_up_async
+from utils.photo_catalog import get_photo_catalog
+from utils.image_pyramid import DEFAULT_MAX_HEIGHT, DEFAULT_WIDTHS, build_pyramid, img_tag
+from utils.carousel_component import render_carousel
+from utils.fragments import fragment, rerun_fragment
 
 # 设置页面配置
 st.set_page_config(
@@ -9,6 +15,9 @@ st.set_page_config(
     layout="centered"
 )
 
+# 在后台预热 AI 问答默认问题中本地 FAQ 回答不了的部分，用户进入问答页点击时可以直接得到回答
+prewarm_async()
+
 # 添加自定义CSS
 st.markdown("""
 <style>
@@ -144,77 +153,112 @@ with col2:
     
     st.markdown('<div class="feature-box"><p class="feature-title">💭 真实的情感分享</p><p>分享你的困惑、喜悦和感悟，与志同道合的伙伴一起探索成长的奥秘。</p></div>', unsafe_allow_html=True)
 
-# 图片轮播功能 - 简化版本
+# 图片轮播功能
 image_folder = 'photos'
-if os.path.exists(image_folder):
-    image_files = [f for f in os.listdir(image_folder) if f.endswith(('jpg', 'jpeg', 'png', 'gif'))]
+max_height = 380  # 留出一些内边距
+# 响应式金字塔的高度上限取显示高度的 2 倍，高分屏也能清晰显示（命令行预热使用同一个值）
+pyramid_max_height = DEFAULT_MAX_HEIGHT
+# 轮播图片在页面中的显示宽度（centered 布局下最宽约 700px）
+carousel_sizes = "(max-width: 740px) 90vw, 700px"
+
+# 轮播模式：component（浏览器端翻页，默认）/ server（旧的按钮 + rerun 方式）
+carousel_mode = str(get_setting("CAROUSEL_MODE", "component")).lower()
+
+
+def show_component_carousel(image_paths):
+    """浏览器端轮播：URL 列表只下发一次，翻页不再触发服务器 rerun"""
+    try:
+        # 先把未缓存的最小一档交给后台线程池并行生成，再逐张生成金字塔（会等待正在生成的任务）
+        get_image_cache().prefetch(image_paths, max_width=320, max_height=pyramid_max_height)
+        images = [build_pyramid(path, max_height=pyramid_max_height) for path in image_paths]
+    except Exception as e:
+        st.error(f"无法加载图片: {e}")
+        return
+
+    autoplay_seconds = get_int_setting("CAROUSEL_AUTOPLAY_SECONDS", 5)
+    render_carousel(images, image_height=max_height, autoplay_seconds=autoplay_seconds, sizes=carousel_sizes)
+
+
+@fragment
+def show_server_carousel(image_paths):
+    """旧的轮播方式：点击箭头重跑轮播所在的 fragment（不支持 fragment 的版本会 rerun 整个页面）"""
+    # 如果没有设置索引，则初始化为0
+    if 'carousel_index' not in st.session_state:
+        st.session_state.carousel_index = 0
+    
+    # 获取当前图片索引
+    current_index = st.session_state.carousel_index % len(image_paths)
+    
+    # 计算上一张和下一张的索引
+    prev_index = (current_index - 1) % len(image_paths)
+    next_index = (current_index + 1) % len(image_paths)
     
-    if image_files:
-        # 如果没有设置索引，则初始化为0
-        if 'carousel_index' not in st.session_state:
-            st.session_state.carousel_index = 0
-        
-        # 获取当前图片索引
-        current_index = st.session_state.carousel_index
-        
-        # 计算上一张和下一张的索引
-        prev_index = (current_index - 1) % len(image_files)
-        next_index = (current_index + 1) % len(image_files)
-        
-        # 显示轮播标题
-        st.markdown('<p class="carousel-title">✨ 精彩瞬间 ✨</p>', unsafe_allow_html=True)
-        
-        # 使用三列布局
-        left_col, img_col, right_col = st.columns([1, 10, 1])
-        
-        # 左箭头
-        with left_col:
-            st.write("")  # 添加一些空间，使按钮垂直居中
-            st.write("")
-            if st.button("◀", key="prev_arrow"):
-                st.session_state.carousel_index = prev_index
-                st.rerun()
-        
-        # 图片区域
-        with img_col:
-            try:
-                img_path = os.path.join(image_folder, image_files[current_index])
-                img = Image.open(img_path)
-                
-                # 调整图片大小以适应容器，但保持原始比例
-                max_height = 380  # 留出一些内边距
-                width, height = img.size
-                if height > max_height:
-                    ratio = max_height / height
-                    new_width = int(width * ratio)
-                    img = img.resize((new_width, max_height), Image.LANCZOS)
-                
-                # 将PIL图像转换为字节流
-                import io
-                import base64
-                img_byte_arr = io.BytesIO()
-                img.save(img_byte_arr, format='PNG')
-                img_bytes = img_byte_arr.getvalue()
-                encoded_img = base64.b64encode(img_bytes).decode()
-                
-                # 使用单个markdown块创建容器和图片，避免Streamlit的渲染问题
-                st.markdown(f"""
-                <div class="image-box">
-                    <img src="data:image/png;base64,{encoded_img}" 
-                         style="max-width: 100%; max-height: 380px; object-fit: contain;">
-                </div>
-                <p class="carousel-caption">图片 {current_index+1}/{len(image_files)}</p>
-                """, unsafe_allow_html=True)
-            except Exception as e:
-                st.error(f"无法加载图片: {e}")
-        
-        # 右箭头
-        with right_col:
-            st.write("")  # 添加一些空间，使按钮垂直居中
-            st.write("")
-            if st.button("▶", key="next_arrow"):
-                st.session_state.carousel_index = next_index
-                st.rerun()
+    # 使用三列布局
+    left_col, img_col, right_col = st.columns([1, 10, 1])
+    
+    # 左箭头
+    with left_col:
+        st.write("")  # 添加一些空间，使按钮垂直居中
+        st.write("")
+        if st.button("◀", key="prev_arrow"):
+            st.session_state.carousel_index = prev_index
+            rerun_fragment()
+    
+    # 图片区域
+    with img_col:
+        try:
+            img_path = image_paths[current_index]
+
+            # 从磁盘衍生图缓存获取多档尺寸的图片，并发布为带内容哈希的静态 URL
+            # （浏览器按屏幕选择尺寸并可长期缓存，websocket 只需发送 URL 和极小的模糊占位图）
+            pyramid = build_pyramid(img_path, max_height=pyramid_max_height)
+            img_html = img_tag(
+                pyramid,
+                sizes=carousel_sizes,
+                alt=f"图片 {current_index+1}",
+                style="max-width: 100%; max-height: 380px; object-fit: contain;",
+            )
+            
+            # 使用单个markdown块创建容器和图片，避免Streamlit的渲染问题
+            st.markdown(f"""
+            <div class="image-box">
+                {img_html}
+            </div>
+            <p class="carousel-caption">图片 {current_index+1}/{len(image_paths)}</p>
+            """, unsafe_allow_html=True)
+        except Exception as e:
+            st.error(f"无法加载图片: {e}")
+
+        # 当前图片显示后，立即在后台准备上一张和下一张，下次点击时直接命中缓存
+        neighbour_paths = [image_paths[prev_index], image_paths[next_index]]
+        image_cache = get_image_cache()
+        for width in DEFAULT_WIDTHS:
+            image_cache.prefetch(neighbour_paths, max_width=width, max_height=pyramid_max_height)
+    
+    # 右箭头
+    with right_col:
+        st.write("")  # 添加一些空间，使按钮垂直居中
+        st.write("")
+        if st.button("▶", key="next_arrow"):
+            st.session_state.carousel_index = next_index
+            rerun_fragment()
+
+
+# 从进程级图片清单读取（只在目录变化时重新扫描），不再每次 rerun 都 os.listdir
+image_paths = get_photo_catalog(image_folder).paths()
+
+if image_paths:
+    # 进程启动后首次访问时在后台预热全部轮播图的衍生图
+    for width in DEFAULT_WIDTHS:
+        warm_up_async(image_folder, max_width=width, max_height=pyramid_max_height)
+
+    # 显示轮播标题
+    st.markdown('<p class="carousel-title">✨ 精彩瞬间 ✨</p>', unsafe_allow_html=True)
+
+    if carousel_mode == "server":
+        show_server_carousel(image_paths)
+    else:
+        show_component_carousel(image_paths)
 
 # 页脚
 st.markdown("---")
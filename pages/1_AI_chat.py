@@ -3,6 +3,13 @@ import streamlit as st
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.answer_cache import DEFAULT_QUESTIONS, get_answer_cache, prewarm_async
+from utils.config import get_float_setting
+from utils.faq import answer_from_faq
+from utils.fragments import fragment, rerun_fragment
+
+# 后台预热默认问题的回答（每个进程只执行一次）
+prewarm_async()
 
 #st.title("AI Chat")
 
@@ -26,74 +33,165 @@ st.markdown(
 
 # 初始化后续问题列表和聊天记录
 if "followup_questions" not in st.session_state:
-    st.session_state.followup_questions = [
-        "挑选内衣的注意事项",
-        "胸部发育有哪些阶段",
-        "胸部发育过程会遇到哪些疾病"
-    ]
+    st.session_state.followup_questions = list(DEFAULT_QUESTIONS)
 
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
 # 问题查询函数
-def query_question(question):
+def query_question(question, history_container, chat_user, turn):
     #time.sleep(1)  # 模拟延时
     #return question  # 简单返回原问题作为结果
-    """处理查询并获取Coze回答"""
+    """
+    处理查询并获取Coze回答，返回 (answer, follow_ups)；turn 为 ask 中已经 checkout 的 (conversation_id, owned)，
+    问题追加到这个会话；新会话第一轮（conversation_id 为 None）的回答写入答案缓存
+    （带有之前上下文的回答不一定适用于别人的同一个问题）
+    """
     import utils.coze_agent  # 导入coze_agent模块
     
+    fresh = turn[0] is None
+    if utils.coze_agent.get_chat_mode() == "stream":
+        # 流式：问题和逐段到达的回答直接显示在历史记录区域，结束后随历史记录一起重新显示
+        with history_container:
+            with st.chat_message("user"):
+                st.markdown(question)
+            with st.chat_message("assistant"):
+                stream = utils.coze_agent.stream_coze(question, chat_user, turn)
+                try:
+                    st.write_stream(stream)
+                except Exception as e:
+                    # 对话失败或网络错误：已经显示的部分回答保留，后面附上错误信息
+                    print(f"Coze stream failed: {e}")
+                    return (stream.answer + "\n\n" if stream.answer else "") + f"获取回答失败：{e}", []
+        if fresh:
+            get_answer_cache().put(question, utils.coze_agent.bot_id, stream.answer, stream.follow_ups)
+        return stream.answer, stream.follow_ups
+
     # 调用coze接口获取答案和后续问题
     with st.spinner("正在查询中..."):  # 添加加载提示
         time.sleep(0.5)  # 保持临时回答可见时间
-        answer, follow_ups = utils.coze_agent.ask_coze(question)
-    
+        if not fresh:
+            return utils.coze_agent.ask_coze(question, chat_user, turn)
+
+        # 其他会话正在问同一个问题时等待它的回答，这一轮没有用到会话
+        asked = []
+
+        def ask_with_turn(q):
+            asked.append(q)
+            return utils.coze_agent.ask_coze(q, chat_user, turn)
+
+        try:
+            return get_answer_cache().ask(question, utils.coze_agent.bot_id, ask_with_turn)
+        finally:
+            if not asked:
+                utils.coze_agent.get_conversation_store().release(chat_user, *turn)
+
+
+def ask(question, history_container):
+    """
+    提问：
+    - 本地 FAQ 能回答（utils.faq）时直接显示回答
+    - 否则开始一轮会话（checkout）：没有之前上下文的新会话才查答案缓存，命中时直接显示并归还会话
+    - FAQ 和缓存的回答不会发送到提问者的 Coze 会话，之后的提问里 Coze 看不到这些问答
+    - async 模式把问题交给共享事件循环后立即整页 rerun，问答区域切换为定时重跑、显示生成进度
+    - 其他模式当场等待回答，然后只重跑问答区域
+    """
+    import utils.coze_agent
+
+    st.session_state.messages.append({"role": "user", "content": question})
+    cached = answer_from_faq(question)
+    chat_user = utils.coze_agent.get_chat_user_id()
+    turn = None
+    if cached is None:
+        # 缓存是否可用和这一轮使用的会话在同一次 checkout 里确定
+        conversations = utils.coze_agent.get_conversation_store()
+        turn = conversations.checkout(chat_user)
+        if turn[0] is None:
+            cached = get_answer_cache().get(question, utils.coze_agent.bot_id)
+            if cached is not None:
+                conversations.release(chat_user, *turn)
+    if cached is None and utils.coze_agent.get_chat_mode() == "async":
+        from utils.coze_async import get_chat_loop
+        st.session_state.pending_chat = get_chat_loop().submit(question, chat_user, turn)
+        st.rerun()
+
+    answer, follow_ups = cached if cached is not None else query_question(question, history_container, chat_user, turn)
+
     # 更新后续问题列表（如果返回的列表不为空）
     if follow_ups:
         st.session_state.followup_questions = follow_ups
+    st.session_state.messages.append({"role": "assistant", "content": answer or "未获取到答复"})
+    rerun_fragment()
+
+
+def show_pending_answer(pending, history_container):
+    """显示异步提问的进度；完成（或停止）后写入聊天记录并整页 rerun，结束定时重跑"""
+    pending.touch()
+    with history_container:
+        with st.chat_message("assistant"):
+            st.markdown(pending.answer or "正在思考...")
+
+    if not pending.done() and st.button("停止回答", key="cancel_chat"):
+        pending.cancel()
+
+    if pending.done():
+        if pending.follow_ups:
+            st.session_state.followup_questions = pending.follow_ups
+        st.session_state.messages.append({"role": "assistant", "content": pending.result_text()})
+        del st.session_state["pending_chat"]
+        st.rerun()
+
+
+def chat_panel():
+    """
+    问答区域作为独立的 fragment：点击后续问题或提交问题只重跑这里，
+    页面顶部的视频等其余部分不会重新执行
+    """
+    pending = st.session_state.get("pending_chat")
+
+    # 显示历史问答记录
+    history_container = st.container(height=400)
+    with history_container:
+        for message in st.session_state.messages:
+            with st.chat_message(message["role"]):
+                st.markdown(message["content"])
+
+    if pending is not None:
+        show_pending_answer(pending, history_container)
+
+    # 显示后续问题（等待回答期间不能再提问）
+    if st.session_state.followup_questions:
+        cols = st.columns(len(st.session_state.followup_questions))
+        for i, question in enumerate(st.session_state.followup_questions):
+            with cols[i]:
+                if st.button(question, key=f"followup_{i}", disabled=pending is not None):
+                    # 直接调用查询函数
+                    ask(question, history_container)
+
+    # 提问输入部分
+    with st.form("question_form"):
+        temp_question = st.text_input(
+            "输入你的问题", 
+            key="input_question",
+            label_visibility="collapsed",
+            placeholder="在这里输入问题..."
+        )
+        submitted = st.form_submit_button("提交", disabled=pending is not None)
     
-    # 返回答案或默认提示
-    return answer if answer else "未获取到答复"
-
-# 显示历史问答记录
-history_container = st.container(height=400)
-with history_container:
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"]):
-            st.markdown(message["content"])
-
-# 显示后续问题
-if st.session_state.followup_questions:
-    cols = st.columns(len(st.session_state.followup_questions))
-    for i, question in enumerate(st.session_state.followup_questions):
-        with cols[i]:
-            if st.button(question, key=f"followup_{i}"):
-                # 直接调用查询函数
-                st.session_state.messages.append({"role": "user", "content": question})
-                response = query_question(question)
-                st.session_state.messages.append({"role": "assistant", "content": response})
-                st.rerun()
-
-# 提问输入部分
-with st.form("question_form"):
-    temp_question = st.text_input(
-        "输入你的问题", 
-        key="input_question",
-        label_visibility="collapsed",
-        placeholder="在这里输入问题..."
-    )
-    submitted = st.form_submit_button("提交")
-    
-    if submitted or st.session_state.get("submitted"):
-        if temp_question:
-            # 添加用户问题到聊天记录
-            st.session_state.messages.append({"role": "user", "content": temp_question})
-            
-            # 调用查询函数
-            response = query_question(temp_question)
-            
-            # 添加回答到聊天记录
-            st.session_state.messages.append({"role": "assistant", "content": response})
-            
-            # 清空输入并重置状态
-            st.session_state["submitted"] = False
-            st.rerun()
+        if submitted or st.session_state.get("submitted"):
+            if temp_question:
+                # 清空输入并重置状态
+                st.session_state["submitted"] = False
+
+                # 调用查询函数（回答写入聊天记录）
+                ask(temp_question, history_container)
+
+
+show_chat_panel = fragment(chat_panel)
+# 等待异步回答期间问答区域每隔 COZE_POLL_INTERVAL 秒自动重跑一次
+poll_chat_panel = fragment(chat_panel, run_every=get_float_setting("COZE_POLL_INTERVAL", 0.5))
+
+if st.session_state.get("pending_chat") is not None:
+    poll_chat_panel()
+else:
+    show_chat_panel()
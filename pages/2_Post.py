@@ -1,9 +1,19 @@
 import streamlit as st
 import os
 import datetime
+import html
+import re
 import uuid
 import time
-import requests
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.api_client import api_post, get_base_host, latency_budget
+from utils.config import get_float_setting, get_int_setting, get_setting
+from utils.fragments import fragment, rerun_fragment
+from utils.post_feed import DEFAULT_PAGE_SIZE, get_post_page, get_post_replies, invalidate_feed_cache, normalize_post, normalize_reply
+from utils.post_outbox import get_outbox, get_write_mode
+from utils.post_search import get_post_search
+from utils.post_wall import render_post_wall
 
 # 设置页面配置
 st.set_page_config(
@@ -146,34 +156,32 @@ else:
                 # 使用远程 Web API 保存帖子
                 post_id = str(uuid.uuid4())
                 current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                payload = {
+                    "item_id": post_id,
+                    "item_type": "post",
+                    "parent_post_id": None,
+                    "author_username": st.session_state.username,
+                    "content": post_content,
+                    "created_at": current_time,
+                }
 
-                try:
-                    base_host = st.secrets.get("DataBaseHOST", "").strip()
-                except Exception:
-                    base_host = ""
-
-                if not base_host:
+                if get_write_mode() == "outbox":
+                    # 先写入本地发件箱，帖子立即显示在墙上，由后台线程发送到远程服务
+                    get_outbox().enqueue(payload)
+                    st.session_state.show_post_form = False
+                    st.rerun()
+                elif not get_base_host():
                     st.error("服务器配置错误：未找到 DataBaseHOST")
                 else:
-                    base_host = base_host.rstrip("/")
-                    url = f"{base_host}/api/post_items"
-
-                    payload = {
-                        "item_id": post_id,
-                        "item_type": "post",
-                        "parent_post_id": None,
-                        "author_username": st.session_state.username,
-                        "content": post_content,
-                        "created_at": current_time,
-                    }
-
                     try:
-                        resp = requests.post(url, json=payload, timeout=10)
+                        resp = api_post("/api/post_items", "post_items_write", json=payload)
                         resp_data = resp.json()
                     except Exception as e:
                         st.error(f"发布失败：远程服务异常（{e}）")
                     else:
                         if isinstance(resp_data, dict) and resp_data.get("success"):
+                            # 写入成功后立即让共享缓存失效，作者刷新后能看到自己的帖子
+                            invalidate_feed_cache(item=payload)
                             st.success("🎉 发布成功！你的心语已经分享给大家了~")
                             st.session_state.show_post_form = False
                             st.rerun()
@@ -189,174 +197,383 @@ else:
 st.markdown('<h2 class="section-header">💕 成长心语墙</h2>', unsafe_allow_html=True)
 st.markdown("大家的心路历程和感悟...")
 
-# 获取所有帖子（仅从远程 Web API 读取）
+
+def highlight(text, query):
+    """转义内容并高亮查询中的词（中文按单字高亮）"""
+    terms = {term for term in re.split(r"\s+", query.strip().lower()) if term}
+    chars = {ch for term in terms for ch in term if not ch.isascii()}
+    words = {term for term in terms if term.isascii()}
+    pattern = "|".join(sorted((re.escape(t) for t in chars | words), key=len, reverse=True))
+    if not pattern:
+        return html.escape(text)
+    parts = re.split(f"({pattern})", text, flags=re.IGNORECASE)
+    return "".join(
+        f"<mark>{html.escape(part)}</mark>" if i % 2 else html.escape(part)
+        for i, part in enumerate(parts)
+    )
+
+
+# 本次 rerun 读取帖子（和搜索）的总耗时预算（秒），后端变慢时不会让页面一直卡住
+feed_budget = get_float_setting("POST_FEED_LATENCY_BUDGET", 4.0)
+
+
+@fragment
+def show_search():
+    """搜索框：输入查询只重跑这个 fragment，不重新读取整面墙"""
+    query = st.text_input(
+        "搜索心语",
+        key="post_search_query",
+        placeholder="🔍 搜索心语和回复（内容或作者）...",
+        label_visibility="collapsed",
+    )
+    if not query.strip():
+        return
+
+    # 本地镜像 / 副本模式下不请求后端；其他模式拉取变化时受耗时预算限制，超时后使用已有的索引
+    with latency_budget(feed_budget):
+        ok, results = get_post_search().search(query, limit=get_int_setting("POST_SEARCH_LIMIT", 20))
+    if not ok:
+        st.error(results)
+        return
+    if not results:
+        st.info("没有找到相关的心语")
+        return
+
+    st.markdown(f'<div style="font-size: 0.9rem; color: #666;">找到 {len(results)} 条相关内容</div>', unsafe_allow_html=True)
+    for item in results:
+        label = "💬 回复" if item["item_type"] == "reply" else "✨ 心语"
+        st.markdown(f"""
+        <div style="margin-bottom: 10px;">
+            <div style="font-size: 0.9em; color: #666;">
+                {label} · {html.escape(str(item['author']))} · {html.escape(str(item['time']))}
+            </div>
+            <div class="post-content">{highlight(item['content'], query)}</div>
+        </div>
+        """, unsafe_allow_html=True)
+
+
+show_search()
+
+# 分页读取帖子（仅从远程 Web API 读取）：只获取已加载的几页，点击“加载更多”再取下一页
+# post_page_cursors 记录已加载各页的起始游标，第一页为 None
+if "post_page_cursors" not in st.session_state:
+    st.session_state.post_page_cursors = [None]
+
+page_size = get_int_setting("POST_PAGE_SIZE", DEFAULT_PAGE_SIZE)
 posts = []
+seen_post_ids = set()
+next_cursor = None
+feed_stale_error = None
 
-try:
-    base_host = st.secrets.get("DataBaseHOST", "").strip()
-except Exception:
-    base_host = ""
+with latency_budget(feed_budget):
+    for cursor in st.session_state.post_page_cursors:
+        # 经过进程级缓存读取，多个会话在 TTL 内共享同一份结果
+        ok, result = get_post_page(cursor, page_size)
+        if not ok:
+            st.error(result)
+            next_cursor = None
+            break
 
-if not base_host:
-    # 没有远程配置时，不再使用本地旧数据
-    st.error("服务器配置错误：未找到 DataBaseHOST，无法加载帖子")
-else:
-    base_host = base_host.rstrip("/")
-    url = f"{base_host}/api/post_items"
-    try:
-        resp = requests.get(url, timeout=10)
-        data = resp.json()
-    except Exception as e:
-        st.error(f"获取帖子失败：远程服务异常（{e}）")
-    else:
-        if not isinstance(data, dict) or not data.get("success"):
-            msg = data.get("message", "未知错误") if isinstance(data, dict) else "服务返回格式错误"
-            st.error(f"获取帖子失败：{msg}")
+        if result.get("stale"):
+            feed_stale_error = result.get("error")
+
+        for post in result["posts"]:
+            # 翻页期间有新帖子时，避免同一条帖子显示两次
+            if post["id"] in seen_post_ids:
+                continue
+            seen_post_ids.add(post["id"])
+            posts.append(post)
+
+        next_cursor = result["next_cursor"]
+        if not next_cursor:
+            break
+
+if feed_stale_error:
+    st.warning(f"⚠️ 服务器暂时无法访问，当前显示的是最近一次获取到的内容（{feed_stale_error}）")
+
+# 发件箱模式：当前用户还没发送成功的帖子/回复先显示出来（后台线程发送成功后会出现在正常数据里）
+if get_write_mode() == "outbox":
+    outbox = get_outbox()
+    if 'username' in st.session_state:
+        pending_posts = []
+        for item in outbox.items_for(st.session_state.username):
+            if item["status"] == "rejected":
+                col1, col2 = st.columns([6, 1])
+                col1.error(f"「{item['content'][:20]}」发送失败：{item['last_error']}")
+                if col2.button("丢弃", key=f"discard_{item['item_id']}"):
+                    outbox.discard(item["item_id"])
+                    st.rerun()
+            elif item["item_type"] == "reply":
+                reply = normalize_reply(item)
+                reply["time"] = f"{reply['time']} · ⏳ 发送中"
+                mine = st.session_state.setdefault(f"my_replies_{item['parent_post_id']}", [])
+                mine[:] = [r for r in mine if r["id"] != reply["id"]] + [reply]
+            elif item["item_id"] not in seen_post_ids:
+                post = normalize_post(item)
+                post["time"] = f"{post['time']} · ⏳ 发送中"
+                pending_posts.append(post)
+        posts = pending_posts[::-1] + posts
+
+def show_reply(reply):
+    st.markdown(f"""
+    <div style="margin-left: 20px; margin-bottom: 10px;">
+        <div style="font-size: 0.9em; color: #666;">
+            {reply['author']} · {reply['time']}
+        </div>
+        <div style="background-color: #F0F0F0; padding: 10px; border-radius: 5px; margin-top: 5px;">
+            {reply['content']}
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
+
+
+def with_my_replies(post, replies):
+    """
+    把本会话刚发送、但还没出现在已读取数据里的回复追加到末尾
+    （发送回复只重跑这个帖子的 fragment，不重新读取整面墙）
+    """
+    key = f"my_replies_{post['id']}"
+    mine = st.session_state.get(key)
+    if not mine:
+        return replies
+    known = {reply["id"] for reply in replies}
+    mine = [reply for reply in mine if reply["id"] not in known]
+    st.session_state[key] = mine
+    return replies + mine
+
+
+def show_reply_form(post, full_rerun=False):
+    """
+    显示某个帖子的回复表单（回复状态为打开时），处理发送和取消
+    full_rerun 为 True 时发送成功后 rerun 整个页面（批量渲染模式下墙不在 fragment 内）
+    """
+    reply_state_key = f"show_reply_{post['id']}"
+    if 'username' not in st.session_state or not st.session_state.get(reply_state_key):
+        return
+
+    with st.form(key=f"reply_form_{post['id']}"):
+        reply_content = st.text_area("写下你的回复", key=f"reply_input_{post['id']}", height=100)
+        col1, col2 = st.columns([1, 6])
+        submit_reply = col1.form_submit_button("发送")
+        cancel_reply = col2.form_submit_button("取消")
+
+        if submit_reply and reply_content:
+            # ===== 原本本地文件保存回复逻辑（已改为远程 API，保留为注释） =====
+            # reply_filename = f"{int(time.time())}.txt"
+            # reply_path = os.path.join(replies_dir, reply_filename)
+            # current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            # with open(reply_path, "w", encoding="utf-8") as f:
+            #     f.write(f"作者: {st.session_state.username}\n")
+            #     f.write(f"时间: {current_time}\n")
+            #     f.write(f"内容:\n{reply_content}")
+            # ==========================================================
+
+            # 使用远程 Web API 保存回复
+            reply_id = str(uuid.uuid4())
+            current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            payload = {
+                "item_id": reply_id,
+                "item_type": "reply",
+                "parent_post_id": post["id"],
+                "author_username": st.session_state.username,
+                "content": reply_content,
+                "created_at": current_time,
+            }
+
+            sent = False
+            if get_write_mode() == "outbox":
+                # 先写入本地发件箱并立即显示，由后台线程发送，不用等待远程服务
+                get_outbox().enqueue(payload)
+                sent = True
+            elif not get_base_host():
+                st.error("服务器配置错误：未找到 DataBaseHOST")
+            else:
+                try:
+                    resp = api_post("/api/post_items", "post_items_write", json=payload)
+                    resp_data = resp.json()
+                except Exception as e:
+                    st.error(f"回复失败：远程服务异常（{e}）")
+                else:
+                    if isinstance(resp_data, dict) and resp_data.get("success"):
+                        invalidate_feed_cache(post["id"], item=payload)
+                        sent = True
+                    else:
+                        msg = resp_data.get("message", "未知错误") if isinstance(resp_data, dict) else "服务返回格式错误"
+                        st.error(f"回复失败：{msg}")
+
+            if sent:
+                st.session_state[reply_state_key] = False
+                st.success("回复成功！")
+                st.session_state.setdefault(f"my_replies_{post['id']}", []).append(normalize_reply(payload))
+                if full_rerun:
+                    st.rerun()
+                rerun_fragment()
+
+        if cancel_reply:
+            st.session_state[reply_state_key] = False
+            rerun_fragment()
+
+
+@fragment
+def show_post_block(post):
+    """
+    单个帖子（默认渲染方式）：作为独立的 fragment，
+    回复按钮、回复表单和展开回复只重跑这个帖子，不重新读取整面墙
+    """
+    with st.expander(f"✨ {post['author']} · {post['time']}", expanded=True):
+        # 使用自定义样式显示帖子内容，保持换行格式
+        st.markdown(f'<div class="post-content">{post["content"]}</div>', unsafe_allow_html=True)
+        
+        # 初始化回复状态
+        reply_state_key = f"show_reply_{post['id']}"
+        if reply_state_key not in st.session_state:
+            st.session_state[reply_state_key] = False
+        
+        # 从远程数据中获取回复（懒加载模式下为 None，只有回复数和最新一条回复）
+        replies = post.get("replies")
+        reply_count = post.get("reply_count", 0)
+        
+        # 1. 回复输入框容器 - 包含回复数量、按钮和表单
+        reply_input_container = st.container()
+        with reply_input_container:
+            # 显示回复数量和回复按钮
+            col1, col2 = st.columns([6, 1])
+            with col1:
+                if reply_count:
+                    st.markdown(f'<div style="font-size: 0.9rem; color: #666; margin-bottom: 10px;">💬 {reply_count}条回复</div>', unsafe_allow_html=True)
+                else:
+                    st.markdown('<div style="font-size: 0.9rem; color: #666; margin-bottom: 10px;">💬 暂无回复</div>', unsafe_allow_html=True)
+            
+            # 只有登录用户才显示回复按钮
+            if 'username' in st.session_state:
+                with col2:
+                    st.markdown("""
+                    <style>
+                    div[data-testid="stButton"] > button {
+                        white-space: nowrap;
+                        padding: 0.25rem 0.5rem;
+                        font-size: 0.85rem;
+                        min-width: auto;
+                        height: auto;
+                        display: inline-flex;
+                        align-items: center;
+                        justify-content: center;
+                    }
+                    </style>
+                    """, unsafe_allow_html=True)
+                    if st.button("回复", key=f"reply_btn_{post['id']}", type="secondary", use_container_width=True):
+                        st.session_state[reply_state_key] = True
+                        rerun_fragment()
+            
+            # 显示回复表单
+            show_reply_form(post)
+        
+        # 2. 回复列表容器
+        reply_list_container = st.container()
+        with reply_list_container:
+            if replies is not None:
+                # 显示已有的回复
+                shown_replies = replies
+            elif reply_count:
+                # 懒加载：默认只显示最新一条，展开时才读取（并缓存）这个帖子的全部回复
+                show_all = st.toggle(f"展开全部 {reply_count} 条回复", key=f"expand_replies_{post['id']}")
+                shown_replies = [post["latest_reply"]] if post.get("latest_reply") else []
+                if show_all:
+                    ok, result = get_post_replies(post["id"])
+                    if ok:
+                        shown_replies = result
+                    else:
+                        st.error(result)
+            else:
+                shown_replies = []
+
+            for reply in with_my_replies(post, shown_replies):
+                show_reply(reply)
+        # 这里可以添加查看图片的功能
+
+
+@fragment
+def show_selected_reply(post):
+    """批量渲染模式下的回复按钮和表单：打开/取消只重跑这里，发送成功后 rerun 整个页面刷新墙"""
+    if st.button("回复", key="reply_btn_selected", type="secondary"):
+        st.session_state[f"show_reply_{post['id']}"] = True
+        rerun_fragment()
+    show_reply_form(post, full_rerun=True)
+
+
+def show_batched_wall(posts):
+    """
+    整面墙作为一个 HTML 元素渲染（见 utils.post_wall），
+    交互控件只保留一组：选择帖子后在下方回复或展开全部回复
+    """
+    # 懒加载模式下用户已展开的帖子：读取完整回复一起渲染进墙里
+    # 展开状态单独保存（post_id -> True），开关只渲染给选中的帖子，切换帖子后状态不会丢失
+    expanded = st.session_state.setdefault("expanded_reply_posts", {})
+    expanded_replies = {}
+    for post in posts:
+        if post.get("replies") is None and expanded.get(post["id"]):
+            ok, result = get_post_replies(post["id"])
+            if ok:
+                expanded_replies[post["id"]] = result
+            else:
+                st.error(result)
+
+    # 本会话刚发送、还没出现在已读取数据里的回复（包括发件箱里发送中的）也渲染进墙里
+    wall_posts = []
+    for post in posts:
+        replies = expanded_replies.get(post["id"], post.get("replies"))
+        if replies is not None:
+            expanded_replies[post["id"]] = with_my_replies(post, replies)
         else:
-            items = data.get("data") or []
-            for item in items:
-                replies = []
-                for r in item.get("replies") or []:
-                    replies.append({
-                        "id": r.get("item_id"),
-                        "author": r.get("author_username"),
-                        "time": r.get("created_at"),
-                        "content": r.get("content", "")
-                    })
-
-                posts.append({
-                    "id": item.get("item_id"),
-                    "author": item.get("author_username"),
-                    "time": item.get("created_at"),
-                    "content": item.get("content", ""),
-                    "replies": replies
-                })
-
-            posts.sort(key=lambda x: x["time"] or "", reverse=True)
+            # 懒加载预览只有最新一条回复：自己刚发的回复就是最新的
+            preview = [post["latest_reply"]] if post.get("latest_reply") else []
+            mine = with_my_replies(post, preview)[len(preview):]
+            if mine:
+                post = {**post, "latest_reply": mine[-1], "reply_count": post.get("reply_count", 0) + len(mine)}
+        wall_posts.append(post)
+
+    render_post_wall(wall_posts, expanded_replies)
+
+    posts_by_id = {post["id"]: post for post in posts}
+    selected_id = st.selectbox(
+        "选择一条心语",
+        options=list(posts_by_id),
+        format_func=lambda post_id: f"{posts_by_id[post_id]['author']} · {posts_by_id[post_id]['time']} · {posts_by_id[post_id]['content'][:20]}",
+        key="selected_post_id",
+    )
+    post = posts_by_id[selected_id]
+
+    # 展开回复会改变墙的内容，放在 fragment 外面（切换时整页 rerun）
+    if post.get("replies") is None and post.get("reply_count", 0) > 1:
+        toggle_key = f"expand_replies_selected_{post['id']}"
+
+        def on_expand_change(post_id=post["id"], toggle_key=toggle_key):
+            # 在回调里更新，rerun 时墙已经按新的状态渲染
+            expanded[post_id] = st.session_state[toggle_key]
+
+        st.toggle(
+            f"展开全部 {post['reply_count']} 条回复",
+            value=bool(expanded.get(post["id"])),
+            key=toggle_key,
+            on_change=on_expand_change,
+        )
+    if 'username' in st.session_state:
+        show_selected_reply(post)
+
 
 # 显示帖子
 if not posts:
     st.markdown('<div class="empty-state">💭 暂时还没有人分享心语，成为第一个分享者吧！</div>', unsafe_allow_html=True)
 else:
-    for post in posts:
-        with st.expander(f"✨ {post['author']} · {post['time']}", expanded=True):
-            # 使用自定义样式显示帖子内容，保持换行格式
-            st.markdown(f'<div class="post-content">{post["content"]}</div>', unsafe_allow_html=True)
-            
-            # 初始化回复状态
-            reply_state_key = f"show_reply_{post['id']}"
-            if reply_state_key not in st.session_state:
-                st.session_state[reply_state_key] = False
-            
-            # 从远程数据中获取回复
-            replies = post.get("replies", [])
-            
-            # 1. 回复输入框容器 - 包含回复数量、按钮和表单
-            reply_input_container = st.container()
-            with reply_input_container:
-                # 显示回复数量和回复按钮
-                col1, col2 = st.columns([6, 1])
-                with col1:
-                    if replies:
-                        st.markdown(f'<div style="font-size: 0.9rem; color: #666; margin-bottom: 10px;">💬 {len(replies)}条回复</div>', unsafe_allow_html=True)
-                    else:
-                        st.markdown('<div style="font-size: 0.9rem; color: #666; margin-bottom: 10px;">💬 暂无回复</div>', unsafe_allow_html=True)
-                
-                # 只有登录用户才显示回复按钮
-                if 'username' in st.session_state:
-                    with col2:
-                        st.markdown("""
-                        <style>
-                        div[data-testid="stButton"] > button {
-                            white-space: nowrap;
-                            padding: 0.25rem 0.5rem;
-                            font-size: 0.85rem;
-                            min-width: auto;
-                            height: auto;
-                            display: inline-flex;
-                            align-items: center;
-                            justify-content: center;
-                        }
-                        </style>
-                        """, unsafe_allow_html=True)
-                        if st.button("回复", key=f"reply_btn_{post['id']}", type="secondary", use_container_width=True):
-                            st.session_state[reply_state_key] = True
-                            st.rerun()
-                
-                # 显示回复表单
-                if 'username' in st.session_state and st.session_state[reply_state_key]:
-                    with st.form(key=f"reply_form_{post['id']}"):
-                        reply_content = st.text_area("写下你的回复", key=f"reply_input_{post['id']}", height=100)
-                        col1, col2 = st.columns([1, 6])
-                        submit_reply = col1.form_submit_button("发送")
-                        cancel_reply = col2.form_submit_button("取消")
-                        
-                        if submit_reply and reply_content:
-                            # ===== 原本本地文件保存回复逻辑（已改为远程 API，保留为注释） =====
-                            # reply_filename = f"{int(time.time())}.txt"
-                            # reply_path = os.path.join(replies_dir, reply_filename)
-                            # current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                            # with open(reply_path, "w", encoding="utf-8") as f:
-                            #     f.write(f"作者: {st.session_state.username}\n")
-                            #     f.write(f"时间: {current_time}\n")
-                            #     f.write(f"内容:\n{reply_content}")
-                            # ==========================================================
-
-                            # 使用远程 Web API 保存回复
-                            reply_id = str(uuid.uuid4())
-                            current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-                            try:
-                                base_host = st.secrets.get("DataBaseHOST", "").strip()
-                            except Exception:
-                                base_host = ""
-
-                            if not base_host:
-                                st.error("服务器配置错误：未找到 DataBaseHOST")
-                            else:
-                                base_host = base_host.rstrip("/")
-                                url = f"{base_host}/api/post_items"
-
-                                payload = {
-                                    "item_id": reply_id,
-                                    "item_type": "reply",
-                                    "parent_post_id": post["id"],
-                                    "author_username": st.session_state.username,
-                                    "content": reply_content,
-                                    "created_at": current_time,
-                                }
-
-                                try:
-                                    resp = requests.post(url, json=payload, timeout=10)
-                                    resp_data = resp.json()
-                                except Exception as e:
-                                    st.error(f"回复失败：远程服务异常（{e}）")
-                                else:
-                                    if isinstance(resp_data, dict) and resp_data.get("success"):
-                                        st.session_state[reply_state_key] = False
-                                        st.success("回复成功！")
-                                        st.rerun()
-                                    else:
-                                        msg = resp_data.get("message", "未知错误") if isinstance(resp_data, dict) else "服务返回格式错误"
-                                        st.error(f"回复失败：{msg}")
-                        
-                        if cancel_reply:
-                            st.session_state[reply_state_key] = False
-                            st.rerun()
-            
-            # 2. 回复列表容器
-            reply_list_container = st.container()
-            with reply_list_container:
-                # 显示已有的回复
-                for reply in replies:
-                    st.markdown(f"""
-                    <div style="margin-left: 20px; margin-bottom: 10px;">
-                        <div style="font-size: 0.9em; color: #666;">
-                            {reply['author']} · {reply['time']}
-                        </div>
-                        <div style="background-color: #F0F0F0; padding: 10px; border-radius: 5px; margin-top: 5px;">
-                            {reply['content']}
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
-            # 这里可以添加查看图片的功能 
\ No newline at end of file
+    # POST_RENDER_MODE："widgets"（默认，逐个帖子渲染）或 "batched"（整面墙一个元素）
+    if str(get_setting("POST_RENDER_MODE", "widgets")).lower() == "batched":
+        show_batched_wall(posts)
+    else:
+        for post in posts:
+            show_post_block(post)
+
+    # 加载更多：只追加下一页的游标，已加载的页保持不变
+    if next_cursor:
+        if st.button("加载更多心语", key="load_more_posts", use_container_width=True):
+            st.session_state.post_page_cursors.append(next_cursor)
+            st.rerun()
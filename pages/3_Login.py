@@ -4,6 +4,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.user_utils import UserManager
 from utils.auth_utils import AuthManager
+from utils.image_pyramid import build_pyramid, img_tag
 import re
 from pathlib import Path
 from datetime import datetime
@@ -17,6 +18,10 @@ def is_valid_email(email):
     pattern = r'^[\w\.-]+@[\w\.-]+\.\w+$'
     return re.match(pattern, email) is not None
 
+# 侧边栏头像显示宽度（像素），金字塔按 1x/2x/3x 屏生成
+AVATAR_SIZE = 60
+AVATAR_WIDTHS = (AVATAR_SIZE, AVATAR_SIZE * 2, AVATAR_SIZE * 3)
+
 def show_user_profile():
     """显示用户信息和退出按钮"""
     st.sidebar.markdown("---")
@@ -27,9 +32,19 @@ def show_user_profile():
     if avatar_value:
         avatar_path = Path(avatar_value)
         if avatar_path.exists():
-            col1.image(str(avatar_path), width=60)
+            # 本地头像可能是任意大小的上传文件，按显示尺寸生成小图并输出 srcset
+            try:
+                pyramid = build_pyramid(str(avatar_path), widths=AVATAR_WIDTHS)
+                col1.markdown(
+                    img_tag(pyramid, sizes=f"{AVATAR_SIZE}px", alt="头像",
+                            style=f"width: {AVATAR_SIZE}px; border-radius: 5px;"),
+                    unsafe_allow_html=True
+                )
+            except Exception as e:
+                print(f"Error building avatar pyramid: {e}")
+                col1.image(str(avatar_path), width=AVATAR_SIZE)
         else:
-            col1.image(avatar_value, width=60)
+            col1.image(avatar_value, width=AVATAR_SIZE)
     
     # 显示欢迎语
     col2.markdown(f"欢迎, **{st.session_state.username}**")
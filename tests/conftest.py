@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 与 pages/ 中的做法相同：把项目根目录加入 sys.path，测试里可以直接 import utils.xxx
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
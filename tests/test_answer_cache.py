@@ -0,0 +1,149 @@
+import threading
+
+import pytest
+
+import utils.answer_cache as answer_cache
+from utils.answer_cache import AnswerCache, normalize_question
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(answer_cache, "time", clock)
+    return clock
+
+
+def test_normalize_question():
+    assert normalize_question("  胸部发育 有哪些阶段？？ ") == "胸部发育 有哪些阶段"
+    assert normalize_question("ＡＢＣ!") == "abc"
+    assert normalize_question(None) == ""
+
+
+def test_hit_miss_and_expiry(clock):
+    cache = AnswerCache(ttl=60, max_entries=10)
+    assert cache.get("问题", "bot") is None
+    cache.put("问题", "bot", "回答", ["后续"])
+
+    answer, follow_ups = cache.get("问题？", "bot")
+    assert answer == "回答" and follow_ups == ["后续"]
+    # 返回的是副本，调用方修改不影响缓存
+    follow_ups.append("x")
+    assert cache.get("问题", "bot")[1] == ["后续"]
+    assert cache.get("问题", "other-bot") is None
+
+    clock.now += 61
+    assert cache.get("问题", "bot") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expired"]) == (2, 3, 1)
+
+
+def test_empty_answers_and_disabled_cache(clock):
+    cache = AnswerCache(ttl=60)
+    cache.put("问题", "bot", "", [])
+    assert cache.get("问题", "bot") is None
+
+    disabled = AnswerCache(ttl=0)
+    disabled.put("问题", "bot", "回答", [])
+    assert disabled.get("问题", "bot") is None
+    assert disabled.ask("问题", "bot", lambda q: ("直接提问", [])) == ("直接提问", [])
+
+
+def test_lru_eviction(clock):
+    cache = AnswerCache(ttl=60, max_entries=2)
+    cache.put("一", "bot", "1", [])
+    cache.put("二", "bot", "2", [])
+    cache.get("一", "bot")
+    cache.put("三", "bot", "3", [])
+    assert cache.get("二", "bot") is None
+    assert cache.get("一", "bot")[0] == "1"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_concurrent_asks_share_one_call():
+    cache = AnswerCache(ttl=60)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def ask(question):
+        calls.append(question)
+        started.set()
+        assert release.wait(2)
+        return "回答", []
+
+    results = []
+    owner = threading.Thread(target=lambda: results.append(cache.ask("问题", "bot", ask)))
+    owner.start()
+    assert started.wait(2)
+    waiter = threading.Thread(target=lambda: results.append(cache.ask("问题？", "bot", ask)))
+    waiter.start()
+    release.set()
+    owner.join(2)
+    waiter.join(2)
+
+    assert calls == ["问题"]
+    assert results == [("回答", []), ("回答", [])]
+    assert cache.get("问题", "bot") == ("回答", [])
+
+
+def test_ask_errors_are_not_cached():
+    cache = AnswerCache(ttl=60)
+
+    def ask(question):
+        raise RuntimeError("coze down")
+
+    with pytest.raises(RuntimeError):
+        cache.ask("问题", "bot", ask)
+    assert cache.ask("问题", "bot", lambda q: ("回答", [])) == ("回答", [])
+
+
+@pytest.fixture
+def fake_coze(monkeypatch):
+    """替换 utils.coze_agent，记录预热时向 Coze 提的问题"""
+    import sys
+    import types
+
+    import utils
+
+    asked = []
+    module = types.SimpleNamespace(bot_id="bot", ask_coze=lambda q: asked.append(q) or (f"answer {q}", []))
+    monkeypatch.setitem(sys.modules, "utils.coze_agent", module)
+    monkeypatch.setattr(utils, "coze_agent", module, raising=False)
+    monkeypatch.setattr(answer_cache, "_answer_cache", AnswerCache())
+    return asked
+
+
+def test_bundled_faq_covers_default_questions(tmp_path, monkeypatch):
+    import os
+
+    from utils.faq import FaqIndex
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    faq = FaqIndex(os.path.join(root, "data", "faq", "faq.json"), str(tmp_path / "index.json.gz"))
+    monkeypatch.setattr(answer_cache, "answer_from_faq", faq.answer)
+    assert answer_cache.questions_to_prewarm() == []
+
+
+def test_prewarm_only_asks_questions_faq_cannot_answer(monkeypatch, fake_coze):
+    covered = set(answer_cache.DEFAULT_QUESTIONS[:2])
+    monkeypatch.setattr(answer_cache, "answer_from_faq", lambda q: ("faq", []) if q in covered else None)
+
+    answer_cache._prewarm()
+
+    missing = answer_cache.DEFAULT_QUESTIONS[2]
+    assert fake_coze == [missing]
+    assert answer_cache.get_answer_cache().get(missing, "bot") == (f"answer {missing}", [])
+
+
+def test_prewarm_skips_coze_when_faq_answers_everything(monkeypatch, fake_coze):
+    monkeypatch.setattr(answer_cache, "answer_from_faq", lambda q: ("faq", []))
+    answer_cache._prewarm()
+    assert fake_coze == []
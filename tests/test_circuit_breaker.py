@@ -0,0 +1,121 @@
+import pytest
+import requests
+
+import utils.api_client as api_client
+from utils.api_client import CircuitBreaker, CircuitOpenError, LatencyBudgetExceeded
+
+
+def fail(breaker, times):
+    for _ in range(times):
+        assert breaker.allow()
+        breaker.record(False)
+
+
+def test_opens_when_failure_rate_reached():
+    breaker = CircuitBreaker(failure_rate=0.5, min_requests=4, window=60, cooldown=60)
+    breaker.record(True)
+    breaker.record(True)
+    fail(breaker, 1)
+    assert breaker.state == "closed"
+
+    fail(breaker, 1)
+    assert breaker.state == "open"
+    assert breaker.is_open()
+    assert not breaker.allow()
+    assert breaker.stats()["short_circuited"] == 1
+
+
+def test_needs_min_requests_before_opening():
+    breaker = CircuitBreaker(failure_rate=0.5, min_requests=5, window=60, cooldown=60)
+    fail(breaker, 4)
+    assert breaker.state == "closed"
+    fail(breaker, 1)
+    assert breaker.state == "open"
+
+
+def test_half_open_allows_a_single_probe():
+    breaker = CircuitBreaker(failure_rate=0.5, min_requests=1, window=60, cooldown=0)
+    fail(breaker, 1)
+    assert breaker.state == "open"
+
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()
+
+    breaker.record(True)
+    assert breaker.state == "closed"
+    assert breaker.stats()["recent_requests"] == 0
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker(failure_rate=0.5, min_requests=1, window=60, cooldown=60)
+    fail(breaker, 1)
+    breaker.cooldown = 0
+    assert breaker.allow()
+    breaker.cooldown = 60
+    breaker.record(False)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+class BrokenSession:
+    def request(self, *args, **kwargs):
+        raise ValueError("bad url")
+
+
+def test_request_releases_probe_on_unexpected_exception(monkeypatch):
+    breaker = CircuitBreaker(failure_rate=0.5, min_requests=1, window=60, cooldown=0)
+    fail(breaker, 1)
+    monkeypatch.setattr(api_client, "_breaker", breaker)
+    monkeypatch.setattr(api_client, "get_session", lambda: BrokenSession())
+
+    with pytest.raises(ValueError):
+        api_client._request("GET", "/api/post_items", "default", retries=0)
+    # 探测失败后重新 open，而不是一直停在 half_open 占着探测名额
+    assert breaker.state == "open"
+    assert not breaker._probe_in_flight
+
+
+def test_request_short_circuits_when_open(monkeypatch):
+    breaker = CircuitBreaker(failure_rate=0.5, min_requests=1, window=60, cooldown=60)
+    fail(breaker, 1)
+    monkeypatch.setattr(api_client, "_breaker", breaker)
+    monkeypatch.setattr(api_client, "get_session", lambda: pytest.fail("熔断时不应发出请求"))
+
+    with pytest.raises(CircuitOpenError):
+        api_client._request("GET", "/api/post_items", "default", retries=0)
+
+
+class SlowSession:
+    def request(self, *args, **kwargs):
+        raise requests.exceptions.ReadTimeout("read timed out")
+
+
+def test_budget_limited_timeout_is_not_a_backend_failure(monkeypatch):
+    breaker = CircuitBreaker(failure_rate=0.5, min_requests=1, window=60, cooldown=60)
+    monkeypatch.setattr(api_client, "_breaker", breaker)
+    monkeypatch.setattr(api_client, "get_session", lambda: SlowSession())
+
+    with api_client.latency_budget(0.5):
+        with pytest.raises(LatencyBudgetExceeded):
+            api_client._request("GET", "/api/post_items", "default", retries=2)
+    assert breaker.state == "closed"
+    assert breaker.stats()["recent_requests"] == 0
+
+    # 没有被预算截短的超时仍然算后端故障
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        api_client._request("GET", "/api/post_items", "default", retries=0)
+    assert breaker.state == "open"
+
+
+def test_budget_limited_probe_is_released(monkeypatch):
+    breaker = CircuitBreaker(failure_rate=0.5, min_requests=1, window=60, cooldown=0)
+    fail(breaker, 1)
+    monkeypatch.setattr(api_client, "_breaker", breaker)
+    monkeypatch.setattr(api_client, "get_session", lambda: SlowSession())
+
+    with api_client.latency_budget(0.5):
+        with pytest.raises(LatencyBudgetExceeded):
+            api_client._request("GET", "/api/post_items", "default", retries=0)
+    assert breaker.state == "half_open"
+    assert breaker.allow()
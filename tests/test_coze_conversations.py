@@ -0,0 +1,148 @@
+import threading
+import time
+
+import pytest
+
+import utils.coze_conversations as coze_conversations
+from utils.coze_conversations import ConversationStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(coze_conversations, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def deleted():
+    deleted = []
+    condition = threading.Condition()
+
+    def delete(conversation_id):
+        with condition:
+            deleted.append(conversation_id)
+            condition.notify_all()
+
+    def wait(count):
+        with condition:
+            assert condition.wait_for(lambda: len(deleted) >= count, timeout=2)
+        return deleted
+
+    delete.wait = wait
+    delete.ids = deleted
+    return delete
+
+
+def finish(store, chat_user, conversation_id, **kwargs):
+    turn = store.checkout(chat_user)
+    store.checkin(chat_user, conversation_id, turn[1], **kwargs)
+    return turn
+
+
+def test_turns_reuse_the_same_conversation(clock):
+    store = ConversationStore(idle_seconds=60)
+    assert finish(store, "user:a", "conv-1") == (None, True)
+    assert finish(store, "user:a", "conv-1") == ("conv-1", True)
+    assert finish(store, "user:b", "conv-2") == (None, True)
+    assert store.stats() == {"conversations": 2, "created": 2, "reused": 1, "expired": 0}
+
+
+def test_concurrent_turn_gets_a_throwaway_conversation(clock, deleted):
+    store = ConversationStore(idle_seconds=60, delete=deleted)
+    finish(store, "user:a", "conv-1")
+
+    first = store.checkout("user:a")
+    second = store.checkout("user:a")
+    assert first == ("conv-1", True)
+    assert second == (None, False)
+
+    # 一次性会话结束后删除，提问者自己的会话不受影响
+    store.checkin("user:a", "conv-tmp", second[1])
+    assert deleted.wait(1) == ["conv-tmp"]
+    store.checkin("user:a", "conv-1", first[1])
+    assert store.checkout("user:a") == ("conv-1", True)
+
+
+def test_anonymous_questions_do_not_keep_a_conversation(clock):
+    store = ConversationStore(idle_seconds=60)
+    assert store.checkout(None) == (None, False)
+    assert store.stats()["conversations"] == 0
+
+
+def test_idle_conversation_expires_and_is_deleted(clock, deleted):
+    store = ConversationStore(idle_seconds=60, delete=deleted)
+    finish(store, "user:a", "conv-1")
+
+    clock.now += 61
+    assert store.checkout("user:a") == (None, True)
+    assert deleted.wait(1) == ["conv-1"]
+    assert store.stats()["expired"] == 1
+
+
+def test_sweep_removes_other_idle_conversations(clock, deleted):
+    store = ConversationStore(idle_seconds=60, delete=deleted, sweep_interval=30)
+    finish(store, "user:a", "conv-a")
+    finish(store, "user:b", "conv-b")
+
+    clock.now += 61
+    store.checkout("user:c")
+    assert sorted(deleted.wait(2)) == ["conv-a", "conv-b"]
+    assert store.stats()["conversations"] == 1
+
+
+def test_conversation_in_use_never_expires(clock):
+    store = ConversationStore(idle_seconds=60, sweep_interval=0)
+    finish(store, "user:a", "conv-1")
+    turn = store.checkout("user:a")
+
+    clock.now += 600
+    store.checkout("user:b")
+    store.checkin("user:a", "conv-1", turn[1])
+    assert store.checkout("user:a") == ("conv-1", True)
+
+
+def test_failed_turn_discards_the_conversation(clock, deleted):
+    store = ConversationStore(idle_seconds=60, delete=deleted)
+    finish(store, "user:a", "conv-1")
+    finish(store, "user:a", "conv-1", failed=True)
+
+    assert deleted.wait(1) == ["conv-1"]
+    assert store.checkout("user:a") == (None, True)
+
+
+def test_release_keeps_state_unchanged(clock):
+    store = ConversationStore(idle_seconds=60)
+
+    # 还没有会话：归还后不留下空记录
+    turn = store.checkout("user:a")
+    store.release("user:a", *turn)
+    assert store.stats()["conversations"] == 0
+
+    finish(store, "user:a", "conv-1")
+    turn = store.checkout("user:a")
+    store.release("user:a", *turn)
+    assert store.checkout("user:a") == ("conv-1", True)
+    assert store.stats()["reused"] == 0
+
+
+def test_delete_errors_are_swallowed(clock, capsys):
+    done = threading.Event()
+
+    def delete(conversation_id):
+        done.set()
+        raise RuntimeError("gone")
+
+    store = ConversationStore(idle_seconds=60, delete=delete)
+    finish(store, "user:a", "conv-1", failed=True)
+    assert done.wait(2)
+    time.sleep(0.05)
+    assert "Failed to delete Coze conversation conv-1" in capsys.readouterr().out
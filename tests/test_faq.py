@@ -0,0 +1,95 @@
+import json
+import os
+
+import pytest
+
+from utils.faq import DEFAULT_MIN_CONFIDENCE, FaqIndex
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CORPUS = [
+    {"id": "size", "questions": ["内衣尺码怎么测量", "怎么量内衣尺码"], "answer": "用软尺量上下胸围。", "follow_ups": ["挑选内衣的注意事项"]},
+    {"id": "sport", "questions": ["运动时需要穿什么内衣"], "answer": "选运动内衣。", "follow_ups": []},
+]
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    path = tmp_path / "faq.json"
+    path.write_text(json.dumps(CORPUS, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+def test_answers_close_questions_only(corpus, tmp_path):
+    faq = FaqIndex(str(corpus), str(tmp_path / "index.json.gz"))
+    assert faq.answer("内衣尺码怎么测量？") == ("用软尺量上下胸围。", ["挑选内衣的注意事项"])
+    assert faq.match("内衣尺码怎么测量")[1] == pytest.approx(1.0)
+
+    # 只有部分词相同时置信度低于阈值，交给 Coze
+    faq_id, confidence = faq.match("内衣洗涤要注意什么")
+    assert confidence < DEFAULT_MIN_CONFIDENCE
+    assert faq.answer("内衣洗涤要注意什么") is None
+    assert faq.answer("完全无关") is None
+
+
+def test_threshold(corpus, tmp_path):
+    faq = FaqIndex(str(corpus), str(tmp_path / "index.json.gz"))
+    _, confidence = faq.match("运动的时候穿什么")
+    assert faq.answer("运动的时候穿什么", min_confidence=confidence) is not None
+    assert faq.answer("运动的时候穿什么", min_confidence=confidence + 0.01) is None
+
+
+def test_index_is_saved_and_rebuilt_when_corpus_changes(corpus, tmp_path):
+    index_path = tmp_path / "index.json.gz"
+    FaqIndex(str(corpus), str(index_path)).match("内衣尺码")
+    assert index_path.exists()
+
+    loaded = FaqIndex(str(corpus), str(index_path))
+    assert loaded._read_index([corpus.stat().st_mtime_ns, corpus.stat().st_size]) is not None
+
+    corpus.write_text(json.dumps(CORPUS[:1], ensure_ascii=False), encoding="utf-8")
+    rebuilt = FaqIndex(str(corpus), str(index_path))
+    rebuilt.match("内衣")
+    assert rebuilt.stats() == {"entries": 1, "questions": 2}
+
+
+def test_missing_corpus_disables_faq(tmp_path, capsys):
+    faq = FaqIndex(str(tmp_path / "missing.json"), str(tmp_path / "index.json.gz"))
+    assert faq.answer("内衣尺码怎么测量") is None
+    assert "FAQ corpus unavailable" in capsys.readouterr().out
+
+
+def test_default_questions_are_answered_by_bundled_faq(tmp_path):
+    faq = FaqIndex(os.path.join(ROOT, "data", "faq", "faq.json"), str(tmp_path / "index.json.gz"))
+    for question in ("挑选内衣的注意事项", "胸部发育有哪些阶段", "胸部发育过程会遇到哪些疾病"):
+        assert faq.answer(question) is not None, question
+
+
+@pytest.fixture(scope="module")
+def bundled_faq(tmp_path_factory):
+    return FaqIndex(os.path.join(ROOT, "data", "faq", "faq.json"), str(tmp_path_factory.mktemp("faq") / "index.json.gz"))
+
+
+@pytest.mark.parametrize("question, faq_id", [
+    ("乳房有硬块怎么办", "breast-pain"),
+    ("胸部有硬块怎么办", "breast-pain"),
+    ("乳房里有硬块正常吗", "breast-pain"),
+    ("初潮是什么时候", "first-period"),
+    ("初潮一般在什么时候", "first-period"),
+    ("什么时候来初潮", "first-period"),
+    ("我胸部一边大一边小正常吗", "breast-asymmetry"),
+    ("胸部一边大一边小怎么办", "breast-asymmetry"),
+    ("乳房两边不一样大", "breast-asymmetry"),
+])
+def test_paraphrases_hit_intended_entry(bundled_faq, question, faq_id):
+    matched, confidence = bundled_faq.match(question)
+    assert matched == faq_id
+    assert confidence >= DEFAULT_MIN_CONFIDENCE
+
+
+def test_every_bundled_question_matches_its_own_entry(bundled_faq):
+    with open(os.path.join(ROOT, "data", "faq", "faq.json"), encoding="utf-8") as f:
+        corpus = json.load(f)
+    for entry in corpus:
+        for question in entry["questions"]:
+            assert bundled_faq.match(question)[0] == entry["id"], question
@@ -0,0 +1,48 @@
+import os
+
+import pytest
+from PIL import Image
+
+import utils.image_assets as image_assets
+import utils.image_cache as image_cache
+import utils.image_pyramid as image_pyramid
+from utils.image_cache import ImageCache
+
+
+@pytest.fixture
+def photo(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_assets, "STATIC_DIR", tmp_path / "static")
+    monkeypatch.setattr(image_assets, "get_serve_mode", lambda: "static")
+    monkeypatch.setattr(image_pyramid, "get_serve_mode", lambda: "static")
+    monkeypatch.setattr(image_assets, "_published", {})
+    monkeypatch.setattr(image_pyramid, "_pyramids", {})
+    monkeypatch.setattr(image_pyramid, "_placeholders", {})
+    cache = ImageCache(cache_dir=tmp_path / "cache")
+    monkeypatch.setattr(image_cache, "_cache", cache)
+
+    path = tmp_path / "photo.png"
+    Image.new("RGB", (1600, 1200), (200, 120, 160)).save(path)
+    return str(path)
+
+
+def published_files(pyramid):
+    urls = [pyramid["src"]] + [entry.rsplit(" ", 1)[0] for entry in pyramid["srcset"].split(", ")]
+    return {image_assets.STATIC_DIR / image_assets.ASSET_SUBDIR / url.rsplit("/", 1)[-1] for url in urls}
+
+
+def test_pyramid_is_cached_while_files_exist(photo):
+    first = image_pyramid.build_pyramid(photo, max_height=760)
+    assert image_pyramid.build_pyramid(photo, max_height=760) is first
+    assert all(path.exists() for path in published_files(first))
+
+
+def test_evicted_files_are_republished(photo):
+    pyramid = image_pyramid.build_pyramid(photo, max_height=760)
+    files = published_files(pyramid)
+    for path in files:
+        os.remove(path)
+
+    rebuilt = image_pyramid.build_pyramid(photo, max_height=760)
+    # 内容哈希相同，URL 不变，文件重新发布
+    assert rebuilt["srcset"] == pyramid["srcset"]
+    assert all(path.exists() for path in published_files(rebuilt))
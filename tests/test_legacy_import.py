@@ -0,0 +1,111 @@
+import uuid
+
+import pytest
+
+import utils.legacy_import as legacy_import
+from utils.legacy_import import REPLY_NAMESPACE, LegacyFormatError, parse_legacy_file, read_legacy_post, run_import
+
+
+def write(path, author="小红", created_at="2024-03-01 10:00:00", content="你好"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(f"作者: {author}\n时间: {created_at}\n内容:\n{content}\n", encoding="utf-8")
+
+
+def test_parse_legacy_file(tmp_path):
+    path = tmp_path / "content.txt"
+    write(path, content="第一行\n内容: 第二行")
+    assert parse_legacy_file(path) == ("小红", "2024-03-01 10:00:00", "第一行\n内容: 第二行")
+
+
+@pytest.mark.parametrize("text, message", [
+    ("作者: a\n时间: 2024-03-01 10:00:00\n", "缺少“内容:”"),
+    ("时间: 2024-03-01 10:00:00\n内容:\nx", "缺少作者"),
+    ("作者: a\n时间: 2024/03/01\n内容:\nx", "时间格式错误"),
+    ("作者: a\n时间: 2024-03-01 10:00:00\n内容:\n  \n", "内容为空"),
+])
+def test_parse_errors(tmp_path, text, message):
+    path = tmp_path / "bad.txt"
+    path.write_text(text, encoding="utf-8")
+    with pytest.raises(LegacyFormatError, match=message):
+        parse_legacy_file(path)
+
+
+def test_read_legacy_post_uses_stable_ids(tmp_path):
+    post_dir = tmp_path / "posts" / "post-1"
+    write(post_dir / "content.txt")
+    write(post_dir / "replies" / "200.txt", created_at="2024-03-01 12:00:00", content="后")
+    write(post_dir / "replies" / "100.txt", created_at="2024-03-01 11:00:00", content="先")
+    (post_dir / "replies" / "300.txt").write_text("坏文件", encoding="utf-8")
+
+    items, errors = read_legacy_post(str(post_dir))
+    assert [item["content"] for item in items] == ["你好", "先", "后"]
+    assert items[0]["item_id"] == "post-1"
+    assert items[1]["item_id"] == str(uuid.uuid5(REPLY_NAMESPACE, "post-1/100.txt"))
+    assert items[1]["parent_post_id"] == "post-1"
+    assert len(errors) == 1 and "300.txt" in errors[0]
+
+    # 重复读取生成相同的 id（重复导入是幂等的）
+    assert read_legacy_post(str(post_dir))[0] == items
+
+
+def test_unreadable_post(tmp_path):
+    post_dir = tmp_path / "posts" / "post-1"
+    (post_dir).mkdir(parents=True)
+    (post_dir / "content.txt").write_text("坏文件", encoding="utf-8")
+    items, errors = read_legacy_post(str(post_dir))
+    assert items == [] and len(errors) == 1
+
+
+@pytest.fixture
+def posts(tmp_path):
+    root = tmp_path / "posts"
+    write(root / "ok" / "content.txt")
+    write(root / "ok" / "replies" / "1.txt")
+    write(root / "partial" / "content.txt")
+    (root / "partial" / "replies").mkdir()
+    (root / "partial" / "replies" / "1.txt").write_text("坏文件", encoding="utf-8")
+    return root
+
+
+def test_import_checkpoints_complete_posts_only(posts, tmp_path, monkeypatch):
+    sent = []
+
+    def deliver_item(payload):
+        sent.append(payload["item_id"])
+        return "delivered", None
+
+    monkeypatch.setattr(legacy_import, "deliver_item", deliver_item)
+    checkpoint = tmp_path / "import.checkpoint"
+
+    stats = run_import(str(posts), batch_size=1, concurrency=2, checkpoint_path=str(checkpoint))
+    assert sorted(checkpoint.read_text().split()) == ["ok"]
+    assert (stats.posts, stats.replies, stats.sent, stats.incomplete_posts, stats.invalid_files) == (2, 1, 3, 1, 1)
+
+    # 再次运行：完整导入的帖子跳过，有解析错误的帖子重新发送
+    sent.clear()
+    stats = run_import(str(posts), batch_size=1, concurrency=2, checkpoint_path=str(checkpoint))
+    assert sent == ["partial"]
+    assert stats.skipped_posts == 1
+
+
+def test_import_stops_post_on_rejection(posts, tmp_path, monkeypatch):
+    monkeypatch.setattr(legacy_import, "deliver_item", lambda payload: ("rejected", "HTTP 400"))
+    checkpoint = tmp_path / "import.checkpoint"
+    stats = run_import(str(posts), batch_size=5, concurrency=1, checkpoint_path=str(checkpoint))
+    assert checkpoint.read_text() == ""
+    assert stats.failed_posts == 2 and stats.sent == 0
+
+
+def test_send_with_retry_retries_transient_errors(monkeypatch):
+    outcomes = [("retry", "HTTP 503"), ("retry", "HTTP 503"), ("delivered", None)]
+    monkeypatch.setattr(legacy_import, "deliver_item", lambda payload: outcomes.pop(0))
+    monkeypatch.setattr(legacy_import.time, "sleep", lambda seconds: None)
+    assert legacy_import.send_with_retry({"item_id": "x"}) == (True, None)
+    assert outcomes == []
+
+
+def test_dry_run_sends_nothing(posts, tmp_path, monkeypatch):
+    monkeypatch.setattr(legacy_import, "deliver_item", lambda payload: pytest.fail("dry run 不应发送"))
+    stats = run_import(str(posts), checkpoint_path=str(tmp_path / "never"), dry_run=True)
+    assert stats.posts == 2
+    assert not (tmp_path / "never").exists()
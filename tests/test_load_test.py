@@ -0,0 +1,52 @@
+import argparse
+
+import pytest
+
+from utils.load_test import JOURNEYS, Recorder, _widget_key, parse_mix, percentile
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([7], 99) == 7
+    assert percentile([], 50) is None
+
+
+def test_parse_mix():
+    assert parse_mix("feed=4, chat") == {"feed": 4.0, "chat": 1.0}
+    assert set(parse_mix(",".join(JOURNEYS))) == set(JOURNEYS)
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_mix("feed=1,unknown=2")
+
+
+def test_widget_key():
+    assert _widget_key("$$ID-abc123-load_more_posts") == "load_more_posts"
+    assert _widget_key("$$ID-abc123-reply-btn-1") == "reply-btn-1"
+    assert _widget_key("$$ID-abc123") is None
+
+
+def test_recorder_summaries():
+    recorder = Recorder()
+    for ms in range(1, 11):
+        recorder.record("feed", ms / 1000)
+    recorder.record("feed", 0.5, error="timeout")
+    recorder.record("chat answer", 2.0, wait=True)
+    recorder.journeys["feed"] += 1
+    recorder.rss.extend([None, 100 * 2**20, 120 * 2**20])
+
+    summary = recorder.to_dict(elapsed=2.0)
+    assert summary["reruns"] == 11
+    assert summary["reruns_per_second"] == 5.5
+    assert summary["steps"]["feed"]["count"] == 11
+    assert summary["steps"]["feed"]["max_ms"] == 500
+    # 等待不计入 rerun 统计
+    assert "chat answer" not in summary["steps"]
+    assert summary["waits"]["chat answer"]["count"] == 1
+    assert summary["errors"] == {"feed: timeout": 1}
+    assert summary["rss_peak_bytes"] == 120 * 2**20
+
+    report = recorder.report(elapsed=2.0)
+    assert "all reruns" in report
+    assert "error x1: feed: timeout" in report
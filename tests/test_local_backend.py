@@ -0,0 +1,93 @@
+import threading
+
+import pytest
+import requests
+
+from utils.local_backend import LocalBackend, make_server
+
+
+@pytest.fixture
+def backend():
+    """在本进程内启动替身服务，按 docs/backend_api.md 的约定通过 HTTP 访问"""
+    local = LocalBackend()
+    local.seed(25, replies_per_post=2, seed=1)
+    server = make_server(local, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    local.url = f"http://127.0.0.1:{server.server_address[1]}/api/post_items"
+    yield local
+    server.shutdown()
+    server.server_close()
+
+
+def new_item(item_id, parent=None, created_at="2030-01-01 00:00:00"):
+    return {"item_id": item_id, "item_type": "reply" if parent else "post", "parent_post_id": parent,
+            "author_username": "tester", "content": f"content {item_id}", "created_at": created_at}
+
+
+def test_cursor_paging_covers_every_post_once(backend):
+    snapshot = requests.get(backend.url).json()["data"]
+    assert len(snapshot) == 25
+
+    seen, params = [], {"limit": 10}
+    while True:
+        body = requests.get(backend.url, params=params).json()
+        assert body["success"]
+        seen.extend(post["item_id"] for post in body["data"])
+        if not body["next_cursor"]:
+            break
+        params = {"limit": 10, "before_created_at": body["next_cursor"]["created_at"],
+                  "before_item_id": body["next_cursor"]["item_id"]}
+    assert seen == [post["item_id"] for post in snapshot]
+
+
+def test_reply_preview_and_replies_endpoint(backend):
+    post = next(p for p in requests.get(backend.url).json()["data"] if p["replies"])
+    preview = requests.get(backend.url, params={"limit": 25, "replies": "preview"}).json()["data"]
+    entry = next(p for p in preview if p["item_id"] == post["item_id"])
+    assert "replies" not in entry
+    assert entry["reply_count"] == len(post["replies"])
+    assert entry["latest_reply"] == post["replies"][-1]
+
+    replies = requests.get(f"{backend.url}/{post['item_id']}/replies").json()["data"]
+    assert replies == post["replies"]
+
+
+def test_etag_not_modified_until_a_write(backend):
+    first = requests.get(backend.url)
+    etag = first.headers["ETag"]
+    again = requests.get(backend.url, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+
+    assert requests.post(backend.url, json=new_item("new-post")).json()["success"]
+    changed = requests.get(backend.url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_post_is_idempotent_and_validates_parent(backend):
+    assert requests.post(backend.url, json=new_item("dup")).json()["success"]
+    assert requests.post(backend.url, json=new_item("dup")).json()["success"]
+    assert backend.counts()["post"] == 26
+
+    orphan = requests.post(backend.url, json=new_item("orphan", parent="missing"))
+    assert orphan.status_code == 400
+    assert not orphan.json()["success"]
+
+
+def test_since_returns_changes_and_deletions(backend):
+    watermark = requests.get(backend.url).json()["watermark"]
+    victim = requests.get(backend.url, params={"limit": 1}).json()["data"][0]
+
+    requests.post(backend.url, json=new_item("p-new"))
+    requests.post(backend.url, json=new_item("r-new", parent="p-new"))
+    delta = requests.get(backend.url, params={"since": watermark}).json()
+    assert {item["item_id"] for item in delta["data"]} >= {"p-new", "r-new"}
+    assert next(item for item in delta["data"] if item["item_id"] == "r-new")["parent_post_id"] == "p-new"
+    assert delta["deleted"] == []
+
+    assert requests.delete(f"{backend.url}/{victim['item_id']}").json()["success"]
+    after = requests.get(backend.url, params={"since": delta["watermark"]}).json()
+    assert set(after["deleted"]) == {victim["item_id"]} | {reply["item_id"] for reply in victim["replies"]}
+    assert after["watermark"] > delta["watermark"]
+    assert victim["item_id"] not in {post["item_id"] for post in requests.get(backend.url).json()["data"]}
+    assert requests.delete(f"{backend.url}/{victim['item_id']}").status_code == 404
@@ -0,0 +1,66 @@
+from utils.post_feed import _slice_locally, decode_cursor, encode_cursor, normalize_post
+
+
+def make_items():
+    # 同一秒内有多条，游标需要靠 item_id 区分
+    items = []
+    for second in range(5):
+        for suffix in "abc":
+            items.append({"item_id": f"{second}{suffix}", "created_at": f"2025-03-09 11:00:0{second}"})
+    return items
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("2025-03-09 11:06:47", "abc-123")
+    assert decode_cursor(cursor) == ("2025-03-09 11:06:47", "abc-123")
+
+
+def test_cursor_handles_missing_values():
+    assert decode_cursor(None) == ("", "")
+    assert decode_cursor(encode_cursor(None, None)) == ("", "")
+
+
+def test_slice_locally_pages_without_duplicates_or_gaps():
+    items = make_items()
+    seen = []
+    cursor = None
+    while True:
+        page, has_more = _slice_locally(items, cursor, 4)
+        seen.extend(item["item_id"] for item in page)
+        if not has_more:
+            break
+        cursor = encode_cursor(page[-1]["created_at"], page[-1]["item_id"])
+
+    expected = [item["item_id"] for item in sorted(items, key=lambda i: (i["created_at"], i["item_id"]), reverse=True)]
+    assert seen == expected
+
+
+def test_slice_locally_is_stable_when_new_items_arrive():
+    items = make_items()
+    first, _ = _slice_locally(items, None, 4)
+    cursor = encode_cursor(first[-1]["created_at"], first[-1]["item_id"])
+
+    items.append({"item_id": "new", "created_at": "2025-03-09 12:00:00"})
+    second, _ = _slice_locally(items, cursor, 4)
+    assert "new" not in [item["item_id"] for item in second]
+    assert second[0]["item_id"] == "3b"
+
+
+def test_slice_locally_last_page():
+    page, has_more = _slice_locally(make_items(), encode_cursor("2025-03-09 11:00:00", "0b"), 4)
+    assert [item["item_id"] for item in page] == ["0a"]
+    assert not has_more
+
+
+def test_normalize_post_full_and_preview():
+    full = normalize_post({
+        "item_id": "p", "author_username": "a", "created_at": "t", "content": "c",
+        "replies": [{"item_id": "r1", "author_username": "b", "created_at": "t1", "content": "x"}],
+    })
+    assert full["reply_count"] == 1
+    assert full["latest_reply"]["id"] == "r1"
+
+    preview = normalize_post({"item_id": "p", "reply_count": 3, "latest_reply": None})
+    assert preview["replies"] is None
+    assert preview["reply_count"] == 3
+    assert preview["latest_reply"] is None
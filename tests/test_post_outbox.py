@@ -0,0 +1,162 @@
+import pytest
+import requests
+
+import utils.post_outbox as post_outbox
+from utils.post_outbox import deliver_item
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None, text=None):
+        self.status_code = status_code
+        self._data = data
+        self._text = text
+
+    def json(self):
+        if self._text is not None:
+            raise ValueError("not json")
+        return self._data
+
+
+@pytest.fixture
+def respond(monkeypatch):
+    monkeypatch.setattr(post_outbox, "get_base_host", lambda: "http://backend.invalid")
+
+    def set_response(response):
+        def api_post(*args, **kwargs):
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        monkeypatch.setattr(post_outbox, "api_post", api_post)
+
+    return set_response
+
+
+PAYLOAD = {"item_id": "x", "item_type": "post", "content": "hi"}
+
+
+@pytest.mark.parametrize("response, outcome, error", [
+    (FakeResponse(200, {"success": True}), "delivered", None),
+    (FakeResponse(201, {"success": True}), "delivered", None),
+    (FakeResponse(409, text="<html>conflict</html>"), "delivered", None),
+    (FakeResponse(409, {"success": False, "message": "exists"}), "delivered", None),
+    (FakeResponse(503, {"success": False, "message": "busy"}), "retry", "HTTP 503"),
+    (FakeResponse(502, text="<html>bad gateway</html>"), "retry", "HTTP 502"),
+    (FakeResponse(400, {"success": False, "message": "内容为空"}), "rejected", "内容为空"),
+    (FakeResponse(413, text="<html>too large</html>"), "rejected", "HTTP 413"),
+    (FakeResponse(404, {"success": True}), "rejected", "HTTP 404"),
+    (FakeResponse(200, {"success": False, "message": "非法内容"}), "rejected", "非法内容"),
+    (FakeResponse(200, ["unexpected"]), "rejected", "服务返回格式错误"),
+])
+def test_classifies_by_status_first(respond, response, outcome, error):
+    respond(response)
+    assert deliver_item(PAYLOAD) == (outcome, error)
+
+
+def test_non_json_2xx_is_retried(respond):
+    respond(FakeResponse(200, text="<html>ok</html>"))
+    outcome, error = deliver_item(PAYLOAD)
+    assert outcome == "retry"
+    assert "HTTP 200" in error
+
+
+def test_network_error_is_retried(respond):
+    respond(requests.exceptions.ConnectionError("refused"))
+    outcome, error = deliver_item(PAYLOAD)
+    assert outcome == "retry"
+    assert "refused" in error
+
+
+def test_missing_host_is_retried(monkeypatch):
+    monkeypatch.setattr(post_outbox, "get_base_host", lambda: "")
+    monkeypatch.setattr(post_outbox, "api_post", lambda *a, **k: pytest.fail("未配置 DataBaseHOST 时不应发送"))
+    assert deliver_item(PAYLOAD)[0] == "retry"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        # 每次取时间前进一点，保证 queued_at 按提交顺序递增
+        self.now += 0.001
+        return self.now
+
+
+@pytest.fixture
+def outbox(tmp_path, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(post_outbox, "time", clock)
+    monkeypatch.setattr(post_outbox, "invalidate_feed_cache", lambda parent=None, item=None: None)
+    box = post_outbox.PostOutbox(str(tmp_path / "outbox.sqlite3"), max_attempts=3)
+    # 不启动后台线程，测试里手动调用 deliver_once
+    box._worker = object()
+    box.clock = clock
+    return box
+
+
+def deliver_with(monkeypatch, outcomes):
+    """按 item_id 决定发送结果，返回发送顺序"""
+    sent = []
+
+    def fake_deliver(payload):
+        sent.append(payload["item_id"])
+        return outcomes.get(payload["item_id"], ("delivered", None))
+
+    monkeypatch.setattr(post_outbox, "deliver_item", fake_deliver)
+    return sent
+
+
+def item(item_id, author, parent=None):
+    return {
+        "item_id": item_id,
+        "item_type": "reply" if parent else "post",
+        "parent_post_id": parent,
+        "author_username": author,
+    }
+
+
+def test_failing_item_only_blocks_its_own_thread(outbox, monkeypatch):
+    sent = deliver_with(monkeypatch, {"p1": ("retry", "HTTP 503")})
+    outbox.enqueue(item("p1", "alice"))
+    outbox.enqueue(item("r1", "alice", parent="p1"))
+    outbox.enqueue(item("p2", "alice"))
+    outbox.enqueue(item("p3", "bob"))
+
+    while outbox.deliver_once() == 0:
+        pass
+
+    # p1 在退避中：它的回复 r1 继续等待，其他帖子照常发送
+    assert sent == ["p1", "p2", "p3"]
+    assert [i["item_id"] for i in outbox.items_for("alice")] == ["p1", "r1"]
+
+
+def test_reply_waits_for_its_post(outbox, monkeypatch):
+    sent = deliver_with(monkeypatch, {})
+    outbox.enqueue(item("p1", "alice"))
+    outbox.enqueue(item("r1", "alice", parent="p1"))
+
+    while outbox.deliver_once() == 0:
+        pass
+
+    assert sent == ["p1", "r1"]
+    assert outbox.stats()["pending"] == 0
+
+
+def test_retries_stop_after_max_attempts(outbox, monkeypatch):
+    sent = deliver_with(monkeypatch, {"p1": ("retry", "HTTP 503")})
+    outbox.enqueue(item("p1", "alice"))
+    outbox.enqueue(item("r1", "alice", parent="p1"))
+
+    for _ in range(10):
+        wait = outbox.deliver_once()
+        if wait is None:
+            break
+        outbox.clock.now += wait
+
+    assert sent == ["p1", "p1", "p1", "r1"]
+    [rejected] = outbox.items_for("alice")
+    assert rejected["item_id"] == "p1"
+    assert rejected["status"] == "rejected"
+    assert rejected["attempts"] == 3
+    assert "HTTP 503" in rejected["last_error"]
@@ -0,0 +1,36 @@
+import utils.post_replica as post_replica
+from utils.post_replica import PostReplica
+
+
+def make_item(item_id, created_at, parent=None):
+    return {
+        "item_id": item_id,
+        "item_type": "reply" if parent else "post",
+        "parent_post_id": parent,
+        "author_username": "alice",
+        "content": f"content {item_id}",
+        "created_at": created_at,
+    }
+
+
+def test_mark_stale_makes_own_writes_visible_before_sync(tmp_path, monkeypatch):
+    monkeypatch.setattr(post_replica, "get_replies_mode", lambda: "full")
+    replica = PostReplica(str(tmp_path / "replica.sqlite3"), sync_interval=60)
+    replica.apply({"data": [make_item("p1", "2024-01-01 10:00:00")]}, full=True)
+
+    replica.mark_stale(make_item("p2", "2024-01-01 11:00:00"))
+    replica.mark_stale(make_item("r1", "2024-01-01 11:05:00", parent="p1"))
+
+    ok, data = replica.page()
+    assert ok
+    assert [post["id"] for post in data["posts"]] == ["p2", "p1"]
+    assert [reply["id"] for reply in data["posts"][1]["replies"]] == ["r1"]
+    # 同时唤醒后台线程，稍后的同步用后端数据覆盖
+    assert replica._wakeup.is_set()
+
+
+def test_mark_stale_without_item_only_wakes_sync(tmp_path):
+    replica = PostReplica(str(tmp_path / "replica.sqlite3"), sync_interval=60)
+    replica.mark_stale()
+    assert replica.is_empty()
+    assert replica._wakeup.is_set()
@@ -0,0 +1,51 @@
+import pytest
+
+import utils.post_replica as post_replica
+import utils.post_search as post_search
+import utils.post_sync as post_sync
+from utils.post_replica import PostReplica
+from utils.post_search import PostSearch
+from utils.post_sync import FeedMirror
+
+
+def item(item_id, content, parent=None):
+    return {"item_id": item_id, "item_type": "reply" if parent else "post", "parent_post_id": parent,
+            "author_username": "a", "content": content, "created_at": "2024-01-01 10:00:00"}
+
+
+@pytest.fixture
+def no_remote(monkeypatch):
+    # 本地镜像 / 副本模式下搜索不能自己请求后端
+    monkeypatch.setattr(post_search, "fetch_changes", lambda *a, **k: pytest.fail("搜索不应单独拉取数据"))
+    monkeypatch.setattr(post_search, "get_base_host", lambda: "http://backend.invalid")
+
+
+def test_sync_mode_indexes_the_feed_mirror(monkeypatch, no_remote):
+    mirror = FeedMirror(sync_interval=60)
+    responses = [(True, ({"data": [dict(item("p1", "胸部发育"), replies=[item("r1", "内衣选择")])]}, "e1"))]
+    monkeypatch.setattr(post_sync, "get_base_host", lambda: "http://backend.invalid")
+    monkeypatch.setattr(post_sync, "fetch_changes", lambda etag=None, watermark=None: responses.pop(0))
+    monkeypatch.setattr(post_sync, "get_feed_mirror", lambda: mirror)
+    monkeypatch.setattr(post_search, "get_feed_mode", lambda: "sync")
+
+    search = PostSearch(refresh_interval=60)
+    ok, results = search.search("内衣")
+    assert ok
+    assert [r["item_id"] for r in results] == ["r1"]
+    assert results[0]["parent_post_id"] == "p1"
+
+
+def test_replica_mode_follows_replica_version(tmp_path, monkeypatch, no_remote):
+    replica = PostReplica(str(tmp_path / "replica.sqlite3"), sync_interval=60)
+    replica.apply({"data": [item("p1", "胸部发育")]}, full=True)
+    monkeypatch.setattr(post_replica, "get_post_replica", lambda: replica)
+    monkeypatch.setattr(post_search, "get_feed_mode", lambda: "replica")
+
+    search = PostSearch(refresh_interval=60)
+    assert [r["item_id"] for r in search.search("发育")[1]] == ["p1"]
+
+    replica.mark_stale(item("r1", "发育阶段", parent="p1"))
+    assert {r["item_id"] for r in search.search("发育")[1]} == {"p1", "r1"}
+
+    replica.apply({"data": [], "deleted": ["p1"]}, full=False)
+    assert search.search("发育")[1] == []
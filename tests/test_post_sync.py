@@ -0,0 +1,154 @@
+import pytest
+
+import utils.post_sync as post_sync
+from utils.post_sync import FeedMirror
+
+
+def post(item_id, created_at, replies=None):
+    item = {"item_id": item_id, "item_type": "post", "author_username": "a", "content": item_id, "created_at": created_at}
+    if replies is not None:
+        item["replies"] = replies
+    return item
+
+
+def reply(item_id, parent_id, created_at):
+    return {"item_id": item_id, "item_type": "reply", "parent_post_id": parent_id,
+            "author_username": "b", "content": item_id, "created_at": created_at}
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    """按顺序返回预先准备的 fetch_changes 结果，并记录每次调用的 (etag, watermark)"""
+    responses = []
+    calls = []
+
+    def fetch_changes(etag=None, watermark=None):
+        calls.append((etag, watermark))
+        return responses.pop(0)
+
+    monkeypatch.setattr(post_sync, "get_base_host", lambda: "http://backend.invalid")
+    monkeypatch.setattr(post_sync, "fetch_changes", fetch_changes)
+    return responses, calls
+
+
+def ids(mirror):
+    return [item["item_id"] for item in mirror.items()]
+
+
+def test_full_then_delta_merge(backend):
+    responses, calls = backend
+    mirror = FeedMirror(sync_interval=60)
+    responses.append((True, ({"success": True, "watermark": "w1", "data": [
+        post("p1", "2025-01-01 00:00:01", [reply("r1", "p1", "2025-01-01 00:01:00")]),
+        post("p2", "2025-01-01 00:00:02", []),
+    ]}, "etag-1")))
+    assert mirror.sync() == (True, True)
+    assert ids(mirror) == ["p2", "p1"]
+
+    responses.append((True, ({"success": True, "watermark": "w2", "data": [
+        post("p3", "2025-01-01 00:00:03"),
+        reply("r2", "p1", "2025-01-01 00:02:00"),
+        # 增量里的帖子不带回复时保留已有回复
+        dict(post("p1", "2025-01-01 00:00:01"), content="edited"),
+    ]}, "etag-2")))
+    assert mirror.sync(force=True) == (True, True)
+    assert calls[-1] == ("etag-1", "w1")
+    assert ids(mirror) == ["p3", "p2", "p1"]
+    p1 = mirror.items()[-1]
+    assert p1["content"] == "edited"
+    assert [r["item_id"] for r in p1["replies"]] == ["r1", "r2"]
+    assert mirror.stats()["full_syncs"] == 1
+    assert mirror.stats()["delta_syncs"] == 1
+
+
+def test_published_snapshot_is_never_mutated(backend):
+    responses, _ = backend
+    mirror = FeedMirror(sync_interval=60)
+    responses.append((True, ({"success": True, "watermark": "w1", "data": [
+        post("p1", "2025-01-01 00:00:01", [reply("r1", "p1", "2025-01-01 00:01:00")]),
+    ]}, None)))
+    mirror.sync()
+    before = mirror.items()
+    replies_before = before[0]["replies"]
+
+    responses.append((True, ({"success": True, "watermark": "w2", "data": [reply("r2", "p1", "2025-01-01 00:02:00")],
+                              "deleted": ["r1"]}, None)))
+    mirror.sync(force=True)
+
+    assert [r["item_id"] for r in replies_before] == ["r1"]
+    assert [r["item_id"] for r in mirror.items()[0]["replies"]] == ["r2"]
+
+
+def test_orphan_reply_attached_when_parent_arrives(backend):
+    responses, _ = backend
+    mirror = FeedMirror(sync_interval=60)
+    responses.append((True, ({"success": True, "watermark": "w1", "data": []}, None)))
+    mirror.sync()
+    responses.append((True, ({"success": True, "watermark": "w2", "data": [reply("r1", "p1", "2025-01-01 00:01:00")]}, None)))
+    mirror.sync(force=True)
+    assert ids(mirror) == []
+
+    responses.append((True, ({"success": True, "watermark": "w3", "data": [post("p1", "2025-01-01 00:00:01")]}, None)))
+    mirror.sync(force=True)
+    assert [r["item_id"] for r in mirror.items()[0]["replies"]] == ["r1"]
+
+
+def test_deletions(backend):
+    responses, _ = backend
+    mirror = FeedMirror(sync_interval=60)
+    responses.append((True, ({"success": True, "watermark": "w1", "data": [
+        post("p1", "2025-01-01 00:00:01", [reply("r1", "p1", "2025-01-01 00:01:00"), reply("r2", "p1", "2025-01-01 00:02:00")]),
+        post("p2", "2025-01-01 00:00:02", [reply("r3", "p2", "2025-01-01 00:03:00")]),
+    ]}, None)))
+    mirror.sync()
+
+    responses.append((True, ({"success": True, "watermark": "w2", "data": [], "deleted": ["r1", "p2", "missing"]}, None)))
+    mirror.sync(force=True)
+    assert ids(mirror) == ["p1"]
+    assert [r["item_id"] for r in mirror.items()[0]["replies"]] == ["r2"]
+    # 被删除帖子的回复也从索引中移除
+    assert set(mirror._reply_parents) == {"r2"}
+
+
+def test_not_modified_and_interval(backend):
+    responses, calls = backend
+    mirror = FeedMirror(sync_interval=60)
+    responses.append((True, ({"success": True, "watermark": "w1", "data": [post("p1", "2025-01-01 00:00:01")]}, "e1")))
+    mirror.sync()
+
+    # 未到同步间隔：不请求
+    assert mirror.sync() == (True, False)
+    assert len(calls) == 1
+
+    mirror.mark_stale()
+    responses.append((True, None))
+    assert mirror.sync() == (True, False)
+    assert mirror.stats()["not_modified"] == 1
+
+
+def test_page_serves_stale_data_when_sync_fails(backend):
+    responses, _ = backend
+    mirror = FeedMirror(sync_interval=60)
+    responses.append((True, ({"success": True, "watermark": "w1", "data": [
+        post(f"p{i}", f"2025-01-01 00:00:0{i}") for i in range(5)
+    ]}, None)))
+    ok, data = mirror.page(limit=2)
+    assert ok and [p["id"] for p in data["posts"]] == ["p4", "p3"]
+    assert data["next_cursor"]
+
+    mirror.mark_stale()
+    responses.append((False, "获取帖子失败：远程服务异常"))
+    ok, data = mirror.page(data["next_cursor"], limit=2)
+    assert ok and data["stale"]
+    assert [p["id"] for p in data["posts"]] == ["p2", "p1"]
+
+    # 失败后仍然是过期状态，下次读取会再同步
+    responses.append((True, None))
+    mirror.sync()
+    assert not responses
+
+
+def test_first_sync_failure_is_reported(backend):
+    responses, _ = backend
+    responses.append((False, "获取帖子失败"))
+    assert FeedMirror(sync_interval=60).page() == (False, "获取帖子失败")
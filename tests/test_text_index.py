@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from utils.text_index import TextIndex, tokenize
+
+
+def test_tokenize_cjk_bigrams_and_words():
+    assert tokenize("胸部发育") == ["胸部", "部发", "发育"]
+    assert tokenize("我 OK 2025") == ["我", "ok", "2025"]
+    assert tokenize("") == []
+
+
+@pytest.fixture
+def index():
+    index = TextIndex(field_weights={"content": 1.0, "author": 2.0})
+    index.add("1", {"content": "今天天气很好，出去散步"})
+    index.add("2", {"content": "挑选内衣的注意事项"})
+    index.add("3", {"content": "内衣尺码怎么量", "author": "天气"})
+    return index
+
+
+def test_search_ranks_matching_documents(index):
+    results = index.search("内衣")
+    assert [doc_id for doc_id, _ in results][:2] in (["2", "3"], ["3", "2"])
+    assert all(score > 0 for _, score in results)
+
+
+def test_search_requires_all_terms_when_possible(index):
+    assert [doc_id for doc_id, _ in index.search("内衣 尺码")] == ["3"]
+    # 没有同时包含的文档时退回到包含任一查询词
+    assert {doc_id for doc_id, _ in index.search("散步 尺码")} == {"1", "3"}
+
+
+def test_single_character_query_matches_bigrams(index):
+    assert {doc_id for doc_id, _ in index.search("衣")} == {"2", "3"}
+
+
+def test_field_weights(index):
+    results = dict(index.search("天气"))
+    # author 字段权重为 2，命中作者的文档排在前面
+    assert results["3"] > results["1"] > 0
+
+
+def test_update_and_remove(index):
+    index.add("2", {"content": "散步的好处"})
+    assert "2" not in {doc_id for doc_id, _ in index.search("内衣")}
+    assert "2" in {doc_id for doc_id, _ in index.search("散步")}
+
+    index.remove("2")
+    assert "2" not in index
+    assert len(index) == 2
+    assert index.search("好处") == []
+
+
+def test_round_trip_through_json(index):
+    restored = TextIndex.from_dict(json.loads(json.dumps(index.to_dict())), field_weights=index.field_weights)
+    for query in ("内衣", "天气", "散步", "衣"):
+        assert restored.search(query) == pytest.approx(index.search(query))
+    assert restored.stats() == index.stats()
+
+    # 恢复后仍然可以增量更新
+    restored.remove("3")
+    assert {doc_id for doc_id, _ in restored.search("内衣")} == {"2"}
+
+
+def test_self_score_matches_identical_document():
+    index = TextIndex()
+    index.add("a", {"q": "胸部发育分几个阶段"})
+    index.add("b", {"q": "挑选内衣的注意事项"})
+    score = dict(index.search("胸部发育分几个阶段"))["a"]
+    assert index.self_score("胸部发育分几个阶段") == pytest.approx(score)
+    assert index.self_score("") == 0
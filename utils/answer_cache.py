@@ -0,0 +1,198 @@
+"""
+AI 问答的进程级答案缓存：
+- 以 (规范化后的问题, bot_id) 为键缓存 (answer, follow_ups)，所有会话共用
+- 超过 TTL（COZE_ANSWER_CACHE_TTL 秒，默认 6 小时，0 表示不缓存）后重新提问；
+  最多保留 COZE_ANSWER_CACHE_SIZE 条，按最近使用淘汰
+- 多个会话同时问同一个未缓存的问题时只向 Coze 提问一次，其余会话等待同一结果
+- 统计命中、未命中、过期和淘汰次数以及命中率
+- 进程内第一次运行页面时在后台预热默认的推荐问题：本地 FAQ（utils.faq）按当前 FAQ_MIN_CONFIDENCE
+  已经能回答的问题不需要预热（随语料的默认问题都是这样），只预热 FAQ 回答不了的
+"""
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from utils.config import get_int_setting
+from utils.faq import answer_from_faq
+
+# 每个会话初始显示的推荐问题，也是预热的问题
+DEFAULT_QUESTIONS = [
+    "挑选内衣的注意事项",
+    "胸部发育有哪些阶段",
+    "胸部发育过程会遇到哪些疾病",
+]
+
+DEFAULT_TTL = 6 * 3600
+DEFAULT_MAX_ENTRIES = 256
+
+_TRAILING_PUNCTUATION = "?？!！。.~～…"
+
+
+def normalize_question(text):
+    """全角转半角、小写、合并空白、去掉结尾的问号等标点，使措辞相同的问题命中同一条缓存"""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip(_TRAILING_PUNCTUATION + " ")
+
+
+class AnswerCache:
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        # (问题, bot_id) -> (过期时间, answer, follow_ups)
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(question, bot_id):
+        return normalize_question(question), bot_id
+
+    def _lookup(self, key):
+        """调用方持有 _lock；命中时返回 (answer, follow_ups)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            self.expired += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry[1], list(entry[2])
+
+    def get(self, question, bot_id):
+        """读取缓存，命中时返回 (answer, follow_ups)，否则返回 None（计入命中率）"""
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            result = self._lookup(self._key(question, bot_id))
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return result
+
+    def put(self, question, bot_id, answer, follow_ups):
+        """写入一条回答；空回答（失败或被取消）不缓存"""
+        if self.ttl <= 0 or not answer:
+            return
+        with self._lock:
+            key = self._key(question, bot_id)
+            self._entries[key] = (time.monotonic() + self.ttl, answer, list(follow_ups or []))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def ask(self, question, bot_id, ask):
+        """
+        未命中后提问：调用 ask(question) -> (answer, follow_ups) 并写入缓存，返回 (answer, follow_ups)；
+        其他会话已经问到的回答直接返回，同一个问题同时只调用一次 ask，其余调用等待同一结果
+        （ask 抛出的异常也会传给它们）；这里不计入命中率
+        """
+        if self.ttl <= 0:
+            return ask(question)
+
+        key = self._key(question, bot_id)
+        with self._lock:
+            result = self._lookup(key)
+            if result is not None:
+                return result
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not owner:
+            return future.result()
+
+        try:
+            answer, follow_ups = ask(question)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        self.put(question, bot_id, answer, follow_ups)
+        future.set_result((answer, follow_ups))
+        return answer, follow_ups
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expired": self.expired,
+                "evictions": self.evictions,
+            }
+
+
+_answer_cache = None
+_answer_cache_lock = threading.Lock()
+_prewarmed = False
+
+
+def get_answer_cache():
+    """获取进程级共享的答案缓存"""
+    global _answer_cache
+    if _answer_cache is None:
+        with _answer_cache_lock:
+            if _answer_cache is None:
+                _answer_cache = AnswerCache(
+                    get_int_setting("COZE_ANSWER_CACHE_TTL", DEFAULT_TTL),
+                    max(1, get_int_setting("COZE_ANSWER_CACHE_SIZE", DEFAULT_MAX_ENTRIES)),
+                )
+    return _answer_cache
+
+
+def questions_to_prewarm():
+    """默认问题中本地 FAQ 回答不了、需要向 Coze 提问预热的部分"""
+    return [question for question in DEFAULT_QUESTIONS if answer_from_faq(question) is None]
+
+
+def _prewarm():
+    questions = questions_to_prewarm()
+    if not questions:
+        # 默认问题都由本地 FAQ 直接回答，不需要向 Coze 提问
+        return
+
+    try:
+        import utils.coze_agent
+    except Exception as e:
+        # 未配置 Coze（例如缺少 COZE_API_KEY）时不预热，页面提问时会显示相应的错误
+        print(f"Answer cache prewarm skipped: {e}")
+        return
+
+    cache = get_answer_cache()
+    started = time.monotonic()
+    for question in questions:
+        try:
+            # 不传 chat_user：每个问题用一次性的新会话，回答不带任何上下文
+            cache.ask(question, utils.coze_agent.bot_id, utils.coze_agent.ask_coze)
+        except Exception as e:
+            print(f"Answer cache prewarm failed for {question!r}: {e}")
+    print(f"Answer cache prewarmed {len(questions)} questions in {time.monotonic() - started:.1f}s: {cache.stats()}")
+
+
+def prewarm_async():
+    """在后台线程预热默认问题的回答；每个进程只执行一次，缓存关闭时不执行"""
+    global _prewarmed
+    if _prewarmed or get_answer_cache().ttl <= 0:
+        return
+    with _answer_cache_lock:
+        if _prewarmed:
+            return
+        _prewarmed = True
+    threading.Thread(target=_prewarm, name="answer-cache-prewarm", daemon=True).start()
@@ -0,0 +1,281 @@
+"""
+DataBaseHOST 远程接口的进程级 HTTP 客户端：
+- 统一读取并规范化 st.secrets["DataBaseHOST"]
+- 所有页面共用一个带连接池的 requests.Session（keep-alive，避免每次请求都重新建立 TCP/TLS 连接）
+- 按接口设置超时（连接超时, 读取超时），并声明接受 gzip 压缩
+- 熔断器：统计最近一段时间的失败率，后端异常时直接快速失败，不再让每个会话都等满超时
+- 幂等的 GET 请求失败时有限次重试（指数退避 + 随机抖动）
+- 耗时预算：页面可以用 latency_budget() 限定一次 rerun 内远程调用的总耗时
+"""
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.config import get_float_setting, get_int_setting, get_setting
+
+# 连接池大小：Streamlit 每个会话在自己的线程里运行，并发请求数约等于同时在线的会话数
+DEFAULT_POOL_MAXSIZE = 20
+
+# 各接口的 (连接超时, 读取超时)，单位秒
+TIMEOUTS = {
+    "default": (3.05, 10),
+    "post_items_read": (3.05, 10),
+    "post_items_write": (3.05, 10),
+    "login": (3.05, 10),
+    # 注册可能带头像文件上传，读取超时放宽一些
+    "users": (3.05, 30),
+}
+
+# GET 重试次数和退避基数（秒）
+DEFAULT_GET_RETRIES = 2
+RETRY_BACKOFF_BASE = 0.2
+RETRY_BACKOFF_MAX = 2.0
+
+_session = None
+_session_lock = threading.Lock()
+
+# 当前线程（即当前会话这次 rerun）的耗时预算截止时间
+_budget = threading.local()
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """熔断器打开时直接抛出，不发出网络请求"""
+
+
+class LatencyBudgetExceeded(requests.exceptions.RequestException):
+    """本次 rerun 的远程调用耗时预算已用完"""
+
+
+class CircuitBreaker:
+    """
+    基于失败率的熔断器：
+    - closed：正常放行，记录最近 window 秒内每次请求的成败
+    - 请求数达到 min_requests 且失败率达到 failure_rate 时进入 open，cooldown 秒内全部快速失败
+    - cooldown 之后进入 half_open，只放行一个探测请求：成功则恢复 closed，失败则重新 open
+    """
+
+    def __init__(self, failure_rate=0.5, min_requests=5, window=30.0, cooldown=15.0):
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.window = window
+        self.cooldown = cooldown
+
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.short_circuited = 0
+        self._outcomes = deque()
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def _trim(self, now):
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            self._outcomes.popleft()
+
+    def allow(self):
+        """是否放行本次请求"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == "open":
+                if now - self.opened_at < self.cooldown:
+                    self.short_circuited += 1
+                    return False
+                self.state = "half_open"
+                self._probe_in_flight = False
+
+            if self.state == "half_open":
+                if self._probe_in_flight:
+                    self.short_circuited += 1
+                    return False
+                self._probe_in_flight = True
+            return True
+
+    def record(self, ok):
+        with self._lock:
+            now = time.monotonic()
+            if self.state == "half_open":
+                self._probe_in_flight = False
+                if ok:
+                    self.state = "closed"
+                    self._outcomes.clear()
+                else:
+                    self.state = "open"
+                    self.opened_at = now
+                return
+
+            self._outcomes.append((now, ok))
+            self._trim(now)
+            total = len(self._outcomes)
+            failures = sum(1 for _, success in self._outcomes if not success)
+            if total >= self.min_requests and failures / total >= self.failure_rate:
+                self.state = "open"
+                self.opened_at = now
+                print(f"API circuit breaker opened: {failures}/{total} failed in last {self.window:.0f}s")
+
+    def release(self):
+        """放行的请求没有得出结论（例如被耗时预算截断）：不计入统计，只归还半开状态的探测名额"""
+        with self._lock:
+            if self.state == "half_open":
+                self._probe_in_flight = False
+
+    def is_open(self):
+        with self._lock:
+            return self.state == "open" and time.monotonic() - self.opened_at < self.cooldown
+
+    def stats(self):
+        with self._lock:
+            total = len(self._outcomes)
+            failures = sum(1 for _, success in self._outcomes if not success)
+            return {
+                "state": self.state,
+                "recent_requests": total,
+                "recent_failures": failures,
+                "short_circuited": self.short_circuited,
+            }
+
+
+_breaker = CircuitBreaker(
+    failure_rate=get_float_setting("API_BREAKER_FAILURE_RATE", 0.5),
+    min_requests=get_int_setting("API_BREAKER_MIN_REQUESTS", 5),
+    window=get_float_setting("API_BREAKER_WINDOW", 30.0),
+    cooldown=get_float_setting("API_BREAKER_COOLDOWN", 15.0),
+)
+
+
+def get_circuit_breaker():
+    return _breaker
+
+
+@contextmanager
+def latency_budget(seconds):
+    """
+    限定代码块内所有远程调用的总耗时（包括重试和退避）：
+    每次请求的超时会被截短到剩余预算，预算用完后直接抛出 LatencyBudgetExceeded
+    """
+    previous = getattr(_budget, "deadline", None)
+    deadline = time.monotonic() + seconds
+    if previous is not None:
+        deadline = min(deadline, previous)
+    _budget.deadline = deadline
+    try:
+        yield
+    finally:
+        _budget.deadline = previous
+
+
+def _remaining_budget():
+    deadline = getattr(_budget, "deadline", None)
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def get_base_host():
+    """读取 DataBaseHOST，去掉首尾空白和结尾的 /，未配置时返回空字符串"""
+    return str(get_setting("DataBaseHOST", "")).strip().rstrip("/")
+
+
+def get_session():
+    """获取进程级共享的 requests.Session（线程安全的连接池，不使用 cookie）"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                pool_maxsize = get_int_setting("API_POOL_MAXSIZE", DEFAULT_POOL_MAXSIZE)
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_maxsize, max_retries=0)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update({
+                    "Accept": "application/json",
+                    "Accept-Encoding": "gzip, deflate",
+                    "Connection": "keep-alive",
+                })
+                _session = session
+    return _session
+
+
+def build_url(path):
+    return f"{get_base_host()}/{path.lstrip('/')}"
+
+
+def _is_failure(resp):
+    # 5xx 说明后端自身异常，计入熔断统计；4xx 属于业务错误，不算后端故障
+    return resp.status_code >= 500
+
+
+def _timeout_for(endpoint):
+    """返回 ((连接超时, 读取超时), 是否被耗时预算截短)"""
+    connect_timeout, read_timeout = TIMEOUTS.get(endpoint, TIMEOUTS["default"])
+    remaining = _remaining_budget()
+    if remaining is None:
+        return (connect_timeout, read_timeout), False
+    if remaining <= 0:
+        raise LatencyBudgetExceeded("本次请求耗时预算已用完")
+    limited = remaining < max(connect_timeout, read_timeout)
+    return (min(connect_timeout, remaining), min(read_timeout, remaining)), limited
+
+
+def _request(method, path, endpoint, retries, **kwargs):
+    attempt = 0
+    while True:
+        # 先检查预算再占用熔断器的探测名额，避免探测请求还没发出就被预算中断
+        timeout, budget_limited = _timeout_for(endpoint)
+        if not _breaker.allow():
+            raise CircuitOpenError("远程服务暂时不可用，请稍后再试")
+
+        error = None
+        try:
+            resp = get_session().request(method, build_url(path), timeout=timeout, **kwargs)
+        except requests.exceptions.Timeout as e:
+            if budget_limited:
+                # 超时是因为本次 rerun 的预算比接口超时还短，不能说明后端故障，不计入熔断统计
+                _breaker.release()
+                raise LatencyBudgetExceeded("本次请求耗时预算已用完") from e
+            _breaker.record(False)
+            failed, resp, error = True, None, e
+        except requests.exceptions.RequestException as e:
+            _breaker.record(False)
+            failed, resp, error = True, None, e
+        except Exception:
+            # 其他异常（例如 URL 无法解析、参数错误）也要记录结果，否则半开状态的探测名额永远不会释放
+            _breaker.record(False)
+            raise
+        else:
+            failed = _is_failure(resp)
+            _breaker.record(not failed)
+
+        if not failed:
+            return resp
+        if attempt >= retries:
+            if resp is not None:
+                return resp
+            raise error
+
+        # 指数退避 + 全抖动，且不超过剩余预算
+        attempt += 1
+        delay = random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * (2 ** attempt)))
+        remaining = _remaining_budget()
+        if remaining is not None and delay >= remaining:
+            if resp is not None:
+                return resp
+            raise LatencyBudgetExceeded("本次请求耗时预算已用完")
+        time.sleep(delay)
+
+
+def api_get(path, endpoint="default", params=None, headers=None):
+    """
+    GET DataBaseHOST 上的接口，返回 requests.Response
+    GET 是幂等的，网络异常或 5xx 时按 API_GET_RETRIES 重试；熔断或预算用完时抛出异常
+    """
+    retries = get_int_setting("API_GET_RETRIES", DEFAULT_GET_RETRIES)
+    return _request("GET", path, endpoint, retries, params=params, headers=headers)
+
+
+def api_post(path, endpoint="default", json=None, files=None):
+    """POST DataBaseHOST 上的接口，返回 requests.Response（不自动重试；网络异常原样抛出）"""
+    return _request("POST", path, endpoint, 0, json=json, files=files)
@@ -0,0 +1,181 @@
+"""
+浏览器端轮播组件：
+- 图片 URL 列表只随页面下发一次，翻页、自动播放都在浏览器内完成，不触发服务器 rerun
+- 只加载当前张，并预加载上一张/下一张，其余图片翻到附近时再加载
+- 支持响应式 srcset 和模糊占位图（见 utils.image_pyramid）
+"""
+import json
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+CAROUSEL_TEMPLATE = """
+<style>
+    body { margin: 0; font-family: sans-serif; }
+    .carousel { display: flex; align-items: center; gap: 8px; }
+    .image-box {
+        flex: 1;
+        background-color: #F9F0FF;
+        border-radius: 10px;
+        height: __BOX_HEIGHT__px;
+        display: flex;
+        align-items: center;
+        justify-content: center;
+        overflow: hidden;
+        padding: 10px;
+        box-sizing: border-box;
+    }
+    .image-box img {
+        max-width: 100%;
+        max-height: __IMAGE_HEIGHT__px;
+        object-fit: contain;
+        display: none;
+        background-size: cover;
+        background-position: center;
+    }
+    .image-box img.active { display: block; }
+    .arrow {
+        background-color: rgba(156, 106, 222, 0.7);
+        color: white;
+        border-radius: 50%;
+        width: 40px;
+        height: 40px;
+        border: none;
+        font-size: 20px;
+        cursor: pointer;
+        transition: all 0.3s;
+        flex-shrink: 0;
+    }
+    .arrow:hover { background-color: rgba(156, 106, 222, 0.9); transform: scale(1.1); }
+    .carousel-caption {
+        color: #9C6ADE;
+        font-style: italic;
+        margin-top: 10px;
+        text-align: center;
+    }
+</style>
+<div class="carousel" id="carousel" tabindex="0">
+    <button class="arrow" id="prev" aria-label="上一张">◀</button>
+    <div class="image-box" id="box"></div>
+    <button class="arrow" id="next" aria-label="下一张">▶</button>
+</div>
+<p class="carousel-caption" id="caption"></p>
+<script>
+(function () {
+    const items = __SLIDES__;
+    const autoplayMs = __AUTOPLAY_MS__;
+    const box = document.getElementById("box");
+    const caption = document.getElementById("caption");
+    const slides = items.map(function (item, i) {
+        const img = document.createElement("img");
+        img.alt = "图片 " + (i + 1);
+        img.decoding = "async";
+        img.dataset.index = i;
+        if (item.placeholder) {
+            // 模糊占位图是内联的，翻到这一张时立即可见
+            img.style.backgroundImage = "url('" + item.placeholder + "')";
+            img.addEventListener("load", function () { img.style.backgroundImage = "none"; });
+        }
+        box.appendChild(img);
+        return img;
+    });
+    let index = 0;
+    let timer = null;
+
+    function load(i) {
+        const j = (i + slides.length) % slides.length;
+        const img = slides[j];
+        const item = items[j];
+        if (img.dataset.loaded) { return; }
+        img.dataset.loaded = "1";
+        if (item.srcset) {
+            img.sizes = item.sizes || "100vw";
+            img.srcset = item.srcset;
+        }
+        img.src = item.src;
+    }
+
+    function show(i) {
+        index = (i + slides.length) % slides.length;
+        slides.forEach(function (img, j) { img.classList.toggle("active", j === index); });
+        load(index);
+        // 预加载相邻两张，下一次翻页时图片已在浏览器缓存中
+        load(index + 1);
+        load(index - 1);
+        caption.textContent = "图片 " + (index + 1) + "/" + slides.length;
+    }
+
+    function restartAutoplay() {
+        if (timer) { clearInterval(timer); timer = null; }
+        if (autoplayMs > 0 && slides.length > 1) {
+            timer = setInterval(function () { show(index + 1); }, autoplayMs);
+        }
+    }
+
+    document.getElementById("prev").addEventListener("click", function () { show(index - 1); restartAutoplay(); });
+    document.getElementById("next").addEventListener("click", function () { show(index + 1); restartAutoplay(); });
+
+    const root = document.getElementById("carousel");
+    root.addEventListener("keydown", function (e) {
+        if (e.key === "ArrowLeft") { show(index - 1); restartAutoplay(); }
+        if (e.key === "ArrowRight") { show(index + 1); restartAutoplay(); }
+    });
+    root.addEventListener("mouseenter", function () { if (timer) { clearInterval(timer); timer = null; } });
+    root.addEventListener("mouseleave", restartAutoplay);
+
+    // 触屏左右滑动翻页
+    let touchX = null;
+    box.addEventListener("touchstart", function (e) { touchX = e.touches[0].clientX; }, { passive: true });
+    box.addEventListener("touchend", function (e) {
+        if (touchX === null) { return; }
+        const dx = e.changedTouches[0].clientX - touchX;
+        if (Math.abs(dx) > 40) { show(dx > 0 ? index - 1 : index + 1); restartAutoplay(); }
+        touchX = null;
+    });
+
+    show(0);
+    restartAutoplay();
+})();
+</script>
+"""
+
+
+def render_carousel(images, image_height=380, autoplay_seconds=5, sizes="100vw"):
+    """
+    渲染浏览器端轮播组件
+    - images: 每张图片的地址（静态 URL 或 data URI），
+              或 utils.image_pyramid.build_pyramid 返回的 dict（src/srcset/placeholder）
+    - sizes: 使用 srcset 时传给浏览器的 sizes 属性
+    - image_height: 图片最大显示高度（像素）
+    - autoplay_seconds: 自动播放间隔，0 表示不自动播放
+    """
+    if not images:
+        return
+
+    slides = []
+    for image in images:
+        if isinstance(image, str):
+            slides.append({"src": image})
+        else:
+            slides.append({
+                "src": image["src"],
+                "srcset": image.get("srcset", ""),
+                "sizes": sizes,
+                "placeholder": image.get("placeholder", ""),
+            })
+
+    box_height = image_height + 20
+    html = (
+        CAROUSEL_TEMPLATE
+        .replace("__SLIDES__", json.dumps(slides))
+        .replace("__AUTOPLAY_MS__", str(int(autoplay_seconds * 1000)))
+        .replace("__BOX_HEIGHT__", str(box_height))
+        .replace("__IMAGE_HEIGHT__", str(image_height))
+    )
+    # 组件高度 = 图片框 + 标题
+    height = box_height + 50
+    if hasattr(st, "iframe"):
+        # 新版本 Streamlit 用 st.iframe 代替 components.html
+        st.iframe(html, height=height)
+    else:
+        components.html(html, height=height)
@@ -0,0 +1,39 @@
+import os
+
+import streamlit as st
+
+
+def get_setting(name, default=None):
+    """
+    读取配置项：
+    - 优先读取 st.secrets（.streamlit/secrets.toml）
+    - 其次读取同名环境变量
+    - 都没有时返回 default
+    """
+    try:
+        value = st.secrets.get(name)
+    except Exception:
+        value = None
+
+    if value is None or value == "":
+        value = os.getenv(name)
+
+    if value is None or value == "":
+        return default
+    return value
+
+
+def get_int_setting(name, default):
+    """读取整数配置项，格式错误时回退到默认值"""
+    try:
+        return int(get_setting(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def get_float_setting(name, default):
+    """读取浮点数配置项，格式错误时回退到默认值"""
+    try:
+        return float(get_setting(name, default))
+    except (TypeError, ValueError):
+        return default
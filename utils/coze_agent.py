@@ -1,9 +1,15 @@
 import os
+import threading
 import time
+import uuid
 import streamlit as st
 
 from cozepy import COZE_CN_BASE_URL
 from cozepy import Coze, TokenAuth, Message, ChatStatus, MessageContentType  # noqa
+from cozepy import ChatEventType
+
+from utils.config import get_float_setting, get_setting
+from utils.coze_conversations import DEFAULT_CONVERSATION_IDLE, ConversationStore
 
 coze_api_token = st.secrets["COZE_API_KEY"]  # 使用secrets中的API密钥
 coze_api_base = os.getenv("COZE_API_BASE") or COZE_CN_BASE_URL
@@ -11,33 +17,76 @@ coze_api_base = os.getenv("COZE_API_BASE") or COZE_CN_BASE_URL
 coze = Coze(auth=TokenAuth(token=coze_api_token), base_url=coze_api_base)
 
 bot_id = st.secrets["COZE_BOT_ID"]
-user_id = "macbook"
-
-def ask_coze(message_question: str) -> tuple[str, list]:
-    
-    chat = coze.chat.create(
-        bot_id=bot_id,
-        user_id=user_id,
-        additional_messages=[
-            # Message.build_user_question_text("Who are you?"),
-            # Message.build_assistant_answer("I am Bot by Coze."),
-            Message.build_user_question_text(message_question),
-        ],
-    )
-
-    start = int(time.time())
-    timeout = 600
-    while chat.status == ChatStatus.IN_PROGRESS:
-        if int(time.time()) - start > timeout:
-            # too long, cancel chat
-            coze.chat.cancel(conversation_id=chat.conversation_id, chat_id=chat.id)
-            break
-
-        time.sleep(1)
-        # Fetch the latest data through the retrieve interface
-        chat = coze.chat.retrieve(conversation_id=chat.conversation_id, chat_id=chat.id)
-
-    messages = coze.chat.messages.list(conversation_id=chat.conversation_id, chat_id=chat.id)
+# 不属于任何页面会话的提问使用的 user_id
+user_id = "st_pub-system"
+
+
+def get_chat_user_id():
+    """
+    当前提问者，同时作为 Coze 的 user_id（Coze 后台可以按用户区分流量）：
+    登录用户按用户名，未登录时每个浏览器会话一个随机 id
+    """
+    if "username" in st.session_state:
+        return f"user:{st.session_state.username}"
+    if "chat_session_id" not in st.session_state:
+        st.session_state.chat_session_id = uuid.uuid4().hex
+    return f"session:{st.session_state.chat_session_id}"
+
+
+_conversation_store = None
+_conversation_store_lock = threading.Lock()
+
+
+def get_conversation_store():
+    """获取进程级共享的会话表"""
+    global _conversation_store
+    if _conversation_store is None:
+        with _conversation_store_lock:
+            if _conversation_store is None:
+                _conversation_store = ConversationStore(
+                    get_float_setting("COZE_CONVERSATION_IDLE", DEFAULT_CONVERSATION_IDLE),
+                    delete=lambda conversation_id: coze.conversations.delete(conversation_id=conversation_id),
+                )
+    return _conversation_store
+
+
+def ask_coze(message_question: str, chat_user: str = None, turn: tuple = None) -> tuple[str, list]:
+    """
+    提问并等待回答；chat_user（见 get_chat_user_id）不为 None 时追加到该提问者的会话，
+    turn 为调用方已经 checkout 的 (conversation_id, owned)，省略时在这里 checkout
+    """
+    conversations = get_conversation_store()
+    conversation_id, owned = turn if turn is not None else conversations.checkout(chat_user)
+    chat = None
+    failed = True
+    try:
+        chat = coze.chat.create(
+            bot_id=bot_id,
+            user_id=chat_user or user_id,
+            conversation_id=conversation_id,
+            additional_messages=[
+                # Message.build_user_question_text("Who are you?"),
+                # Message.build_assistant_answer("I am Bot by Coze."),
+                Message.build_user_question_text(message_question),
+            ],
+        )
+
+        start = int(time.time())
+        timeout = 600
+        while chat.status == ChatStatus.IN_PROGRESS:
+            if int(time.time()) - start > timeout:
+                # too long, cancel chat
+                coze.chat.cancel(conversation_id=chat.conversation_id, chat_id=chat.id)
+                break
+
+            time.sleep(1)
+            # Fetch the latest data through the retrieve interface
+            chat = coze.chat.retrieve(conversation_id=chat.conversation_id, chat_id=chat.id)
+
+        messages = coze.chat.messages.list(conversation_id=chat.conversation_id, chat_id=chat.id)
+        failed = chat.status != ChatStatus.COMPLETED
+    finally:
+        conversations.checkin(chat_user, chat.conversation_id if chat else None, owned, failed=failed)
 
     message_answer = ""
     message_follow_up = []
@@ -54,6 +103,94 @@ def ask_coze(message_question: str) -> tuple[str, list]:
     return message_answer, message_follow_up
 
 
+def get_chat_mode():
+    """
+    问答模式（COZE_CHAT_MODE）：
+    - "poll"：创建对话后轮询状态，完成后一次性显示回答（默认）
+    - "stream"：流式接口，回答边生成边显示
+    - "async"：提问交给共享事件循环（utils.coze_async），等待期间不占用脚本线程
+    """
+    mode = str(get_setting("COZE_CHAT_MODE", "poll")).lower()
+    return mode if mode in ("poll", "stream", "async") else "poll"
+
+
+class AnswerStream:
+    """
+    流式回答：迭代时逐段产出回答文本（可以直接交给 st.write_stream），
+    迭代结束后 answer、follow_ups、ttft（首段到达用时，秒）和 elapsed（总用时，秒）可用；
+    chat_user 不为 None 时追加到该提问者的会话，fresh 表示这一轮是否开启了新会话（没有之前的上下文）；
+    turn 为调用方已经 checkout 的 (conversation_id, owned)，省略时开始提问时再 checkout
+    """
+
+    def __init__(self, message_question, chat_user=None, turn=None):
+        self.question = message_question
+        self.chat_user = chat_user
+        self.turn = turn
+        self.chat = None
+        self.fresh = True
+        self.answer = ""
+        self.follow_ups = []
+        self.ttft = None
+        self.elapsed = None
+
+    def handle_event(self, event, start):
+        """处理一个流式事件，返回新到达的回答片段（没有时返回 None）"""
+        if event.event == ChatEventType.CONVERSATION_CHAT_CREATED:
+            self.chat = event.chat
+        elif event.event == ChatEventType.CONVERSATION_MESSAGE_DELTA:
+            if event.message.type == "answer" and event.message.content:
+                if self.ttft is None:
+                    self.ttft = time.monotonic() - start
+                self.answer += event.message.content
+                return event.message.content
+        elif event.event == ChatEventType.CONVERSATION_MESSAGE_COMPLETED:
+            if event.message.type == "answer":
+                # 完成事件带有完整的回答，以它为准
+                self.answer = event.message.content
+            elif event.message.type == "follow_up":
+                self.follow_ups.append(event.message.content)
+        elif event.event == ChatEventType.CONVERSATION_CHAT_FAILED:
+            error = event.chat.last_error
+            raise RuntimeError(f"Coze 对话失败：{error.msg if error else '未知错误'}")
+        return None
+
+    def checkout(self, conversations):
+        """开始这一轮问答，返回 (conversation_id, owned)"""
+        conversation_id, owned = self.turn if self.turn is not None else conversations.checkout(self.chat_user)
+        self.fresh = conversation_id is None
+        return conversation_id, owned
+
+    def finish(self, start):
+        self.elapsed = time.monotonic() - start
+
+    def __iter__(self):
+        conversations = get_conversation_store()
+        conversation_id, owned = self.checkout(conversations)
+        start = time.monotonic()
+        failed = True
+        try:
+            events = coze.chat.stream(
+                bot_id=bot_id,
+                user_id=self.chat_user or user_id,
+                conversation_id=conversation_id,
+                additional_messages=[Message.build_user_question_text(self.question)],
+            )
+            for event in events:
+                chunk = self.handle_event(event, start)
+                if chunk:
+                    yield chunk
+            failed = False
+        finally:
+            conversations.checkin(
+                self.chat_user, self.chat.conversation_id if self.chat else None, owned, failed=failed
+            )
+            self.finish(start)
+
+
+def stream_coze(message_question: str, chat_user: str = None, turn: tuple = None) -> AnswerStream:
+    return AnswerStream(message_question, chat_user, turn)
+
+
 #ret_answer, ret_follow_up = ask_coze("煎牛排推荐用什么锅具？")
 
 #print(ret_answer)
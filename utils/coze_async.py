@@ -0,0 +1,180 @@
+"""
+共享事件循环上的异步 Coze 问答（COZE_CHAT_MODE = "async"）：
+- 进程内一个后台线程运行 asyncio 事件循环，所有会话的提问都在这个循环上用 AsyncCoze 的流式接口完成，
+  等待回答期间不占用 Streamlit 的脚本线程
+- 页面提交问题后拿到一个 ChatTask，之后由定时重跑的 fragment 读取进度（回答边生成边显示）
+- 页面每次读取进度都会刷新心跳；超过 COZE_ABANDON_SECONDS 秒没有读取的提问（页面已关闭）会被取消，
+  并调用 chat.cancel 通知 Coze 停止生成
+- 提问追加到提问者的 Coze 会话（见 utils.coze_conversations.ConversationStore）
+- 新会话第一轮完成的回答写入答案缓存（utils.answer_cache），已取消或失败的不写入
+- stats() 返回进行中、已完成、已取消和失败的提问数
+"""
+import asyncio
+import threading
+import time
+
+from cozepy import AsyncCoze, AsyncTokenAuth, Message
+
+from utils.answer_cache import get_answer_cache
+from utils.coze_agent import AnswerStream, bot_id, coze_api_base, coze_api_token, get_conversation_store, user_id
+from utils.config import get_float_setting
+
+# 多久没有读取进度就认为会话已经离开（秒），可通过 COZE_ABANDON_SECONDS 配置
+DEFAULT_ABANDON_SECONDS = 30.0
+
+REAP_INTERVAL = 5.0
+
+
+class ChatTask(AnswerStream):
+    """一次异步提问：answer 随生成进度增长，完成后 follow_ups 可用"""
+
+    def __init__(self, message_question, chat_user=None, turn=None):
+        super().__init__(message_question, chat_user, turn)
+        self.error = None
+        self.future = None
+        self.touched_at = time.monotonic()
+        self._claimed = False
+        self._claim_lock = threading.Lock()
+
+    def claim(self):
+        """
+        事件循环开始处理这个提问和提交前取消时的回调都会调用，只有第一次返回 True：
+        由先调用的一方使用或归还已经 checkout 的会话
+        """
+        with self._claim_lock:
+            claimed, self._claimed = self._claimed, True
+            return not claimed
+
+    def touch(self):
+        """页面读取进度时调用（心跳）"""
+        self.touched_at = time.monotonic()
+
+    def done(self):
+        return self.future.done()
+
+    def cancelled(self):
+        return self.future.cancelled()
+
+    def cancel(self):
+        self.future.cancel()
+
+    def result_text(self):
+        """完成后显示在聊天记录里的文字"""
+        if self.cancelled():
+            return (self.answer + "\n\n" if self.answer else "") + "（已停止回答）"
+        if self.error:
+            return f"获取回答失败：{self.error}"
+        return self.answer or "未获取到答复"
+
+
+class ChatLoop:
+    def __init__(self, abandon_after=DEFAULT_ABANDON_SECONDS):
+        self.abandon_after = abandon_after
+        self.completed = 0
+        self.cancelled = 0
+        self.failed = 0
+        self.abandoned = 0
+        # 进行中的提问；只在事件循环线程里修改
+        self._tasks = set()
+        self._client = None
+
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="coze-async-loop", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._reap(), self.loop)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, message_question, chat_user=None, turn=None):
+        """
+        提交一个问题，立即返回 ChatTask；chat_user 不为 None 时追加到该提问者的会话，
+        turn 为调用方已经 checkout 的 (conversation_id, owned)
+        """
+        task = ChatTask(message_question, chat_user, turn)
+        task.future = asyncio.run_coroutine_threadsafe(self._ask(task), self.loop)
+        if turn is not None:
+            # 事件循环开始处理之前就被取消时，在这里归还会话
+            task.future.add_done_callback(
+                lambda _: task.claim() and get_conversation_store().release(chat_user, *turn)
+            )
+        return task
+
+    async def _ask(self, task):
+        if self._client is None:
+            self._client = AsyncCoze(auth=AsyncTokenAuth(token=coze_api_token), base_url=coze_api_base)
+
+        if not task.claim():
+            return
+        conversations = get_conversation_store()
+        conversation_id, owned = task.checkout(conversations)
+        self._tasks.add(task)
+        start = time.monotonic()
+        failed = True
+        try:
+            events = self._client.chat.stream(
+                bot_id=bot_id,
+                user_id=task.chat_user or user_id,
+                conversation_id=conversation_id,
+                additional_messages=[Message.build_user_question_text(task.question)],
+            )
+            async for event in events:
+                task.handle_event(event, start)
+            self.completed += 1
+            failed = False
+            if task.fresh:
+                # 带有之前上下文的回答不一定适用于别人的同一个问题，只缓存新会话第一轮的回答
+                get_answer_cache().put(task.question, bot_id, task.answer, task.follow_ups)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            # 停止回答后会话仍然可用，保留上下文
+            failed = False
+            if task.chat is not None:
+                try:
+                    await self._client.chat.cancel(conversation_id=task.chat.conversation_id, chat_id=task.chat.id)
+                except Exception as e:
+                    print(f"Coze async cancel failed: {e}")
+            raise
+        except Exception as e:
+            self.failed += 1
+            task.error = str(e)
+        finally:
+            self._tasks.discard(task)
+            conversations.checkin(
+                task.chat_user, task.chat.conversation_id if task.chat else None, owned, failed=failed
+            )
+            task.finish(start)
+
+    async def _reap(self):
+        """取消页面已经不再读取进度的提问"""
+        while True:
+            await asyncio.sleep(REAP_INTERVAL)
+            now = time.monotonic()
+            for task in list(self._tasks):
+                if now - task.touched_at > self.abandon_after:
+                    self.abandoned += 1
+                    task.cancel()
+
+    def stats(self):
+        return {
+            "in_flight": len(self._tasks),
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "abandoned": self.abandoned,
+            "failed": self.failed,
+        }
+
+
+_chat_loop = None
+_chat_loop_lock = threading.Lock()
+
+
+def get_chat_loop():
+    """获取进程级共享的问答事件循环（第一次使用时启动）"""
+    global _chat_loop
+    if _chat_loop is None:
+        with _chat_loop_lock:
+            if _chat_loop is None:
+                _chat_loop = ChatLoop(get_float_setting("COZE_ABANDON_SECONDS", DEFAULT_ABANDON_SECONDS))
+    return _chat_loop
@@ -0,0 +1,142 @@
+"""
+Coze 多轮会话表（utils.coze_agent 使用）：记录每个提问者当前的 conversation_id，
+不依赖 Streamlit 和 Coze 客户端，删除会话的方法由调用方传入
+"""
+import threading
+import time
+
+# 会话空闲多久后过期（秒），可通过 COZE_CONVERSATION_IDLE 配置
+DEFAULT_CONVERSATION_IDLE = 1800.0
+
+# 检查过期会话的最短间隔（秒）
+SWEEP_INTERVAL = 60.0
+
+
+class ConversationStore:
+    """
+    每个提问者一个 Coze 会话：
+    - 同一提问者的多轮问答追加到同一个 conversation_id，后续提问沿用之前的上下文
+    - 空闲超过 idle_seconds 的会话过期，之后的提问开启新会话；过期的会话在后台从 Coze 删除
+    - 同一提问者同时只有一轮问答使用会话（例如登录用户开了两个页面），并发的那一轮用一次性的新会话，结束后删除
+    """
+
+    def __init__(self, idle_seconds=DEFAULT_CONVERSATION_IDLE, delete=None, sweep_interval=SWEEP_INTERVAL):
+        self.idle_seconds = idle_seconds
+        self.sweep_interval = sweep_interval
+        self._delete = delete
+        self.created = 0
+        self.reused = 0
+        self.expired = 0
+        # 提问者 -> [conversation_id（第一轮完成前为 None）, 最后使用时间, 是否有进行中的问答]
+        self._conversations = {}
+        self._swept_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _expired(self, entry, now):
+        return not entry[2] and now - entry[1] > self.idle_seconds
+
+    def _sweep(self, now):
+        """调用方持有 _lock；移除所有过期的会话，返回它们的 conversation_id"""
+        stale = [chat_user for chat_user, entry in self._conversations.items() if self._expired(entry, now)]
+        self.expired += len(stale)
+        return [self._conversations.pop(chat_user)[0] for chat_user in stale]
+
+    def _discard(self, conversation_ids):
+        """在后台从 Coze 删除不再使用的会话"""
+        conversation_ids = [c for c in conversation_ids if c]
+        if not conversation_ids or self._delete is None:
+            return
+
+        def delete_all():
+            for conversation_id in conversation_ids:
+                try:
+                    self._delete(conversation_id)
+                except Exception as e:
+                    print(f"Failed to delete Coze conversation {conversation_id}: {e}")
+
+        threading.Thread(target=delete_all, name="coze-conversation-cleanup", daemon=True).start()
+
+    def checkout(self, chat_user):
+        """
+        开始一轮问答，返回 (conversation_id, 是否使用提问者的会话)：
+        conversation_id 为 None 表示由 Coze 新建会话；chat_user 为 None 或提问者已有进行中的问答时，
+        这一轮使用一次性的新会话
+        """
+        if chat_user is None:
+            return None, False
+
+        now = time.monotonic()
+        with self._lock:
+            stale = []
+            if now - self._swept_at >= self.sweep_interval:
+                self._swept_at = now
+                stale = self._sweep(now)
+
+            entry = self._conversations.get(chat_user)
+            if entry is not None and entry[2]:
+                conversation_id, owned = None, False
+            else:
+                if entry is not None and self._expired(entry, now):
+                    self.expired += 1
+                    stale.append(entry[0])
+                    entry = None
+                if entry is None:
+                    entry = self._conversations[chat_user] = [None, now, True]
+                entry[2] = True
+                conversation_id, owned = entry[0], True
+
+        self._discard(stale)
+        return conversation_id, owned
+
+    def release(self, chat_user, conversation_id, owned):
+        """
+        checkout 之后没有向 Coze 提问（例如答案缓存命中）时调用：归还会话，不计入使用；
+        还没有完成过第一轮的提问者不保留空的会话
+        """
+        if not owned:
+            return
+
+        with self._lock:
+            entry = self._conversations.get(chat_user)
+            if entry is None:
+                return
+            if entry[0] is None:
+                del self._conversations[chat_user]
+            else:
+                entry[2] = False
+
+    def checkin(self, chat_user, conversation_id, owned, failed=False):
+        """
+        一轮问答结束（包括失败和取消），conversation_id 为这一轮实际使用的会话；
+        失败时丢弃提问者的会话（可能已经在 Coze 端失效），下一轮重新开始
+        """
+        if not owned:
+            self._discard([conversation_id])
+            return
+
+        with self._lock:
+            entry = self._conversations.get(chat_user)
+            if entry is None:
+                return
+            if failed or conversation_id is None:
+                del self._conversations[chat_user]
+                stale = [entry[0] or conversation_id]
+            else:
+                if entry[0] is None:
+                    self.created += 1
+                else:
+                    self.reused += 1
+                entry[0] = conversation_id
+                entry[1] = time.monotonic()
+                entry[2] = False
+                stale = []
+        self._discard(stale)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "conversations": len(self._conversations),
+                "created": self.created,
+                "reused": self.reused,
+                "expired": self.expired,
+            }
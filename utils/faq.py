@@ -0,0 +1,194 @@
+"""
+AI 问答前面的本地 FAQ 检索：
+- 常见问题整理在 data/faq/faq.json：每条有 id、若干种问法（questions）、回答（answer）和后续问题（follow_ups）
+- 每种问法作为一个文档建立 BM25 索引（中文按字二元组切分，见 utils.text_index）
+- 索引连同回答压缩保存到 data/cache/faq_index.json.gz；第一次提问时才加载，
+  语料文件的修改时间或大小变化后自动重建
+- 置信度 = 检索得分 / max(问题自身得分, 命中问法自身得分)，取值 0~1，两者措辞越接近越高；
+  不低于 FAQ_MIN_CONFIDENCE（默认 0.6）时直接用 FAQ 的回答，否则交给 Coze
+
+用法（查看问题命中哪一条以及置信度，便于调整阈值）：
+    python -m utils.faq [--rebuild] "胸部发育分几个阶段" ...
+"""
+import argparse
+import gzip
+import json
+import os
+import threading
+
+from utils.config import get_float_setting
+from utils.text_index import TextIndex
+
+DEFAULT_CORPUS = os.path.join("data", "faq", "faq.json")
+DEFAULT_INDEX = os.path.join("data", "cache", "faq_index.json.gz")
+
+DEFAULT_MIN_CONFIDENCE = 0.6
+
+# 索引文件格式变化时加一，旧文件会被重建
+INDEX_VERSION = 1
+
+
+def _corpus_signature(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+class FaqIndex:
+    def __init__(self, corpus_path=DEFAULT_CORPUS, index_path=DEFAULT_INDEX):
+        self.corpus_path = corpus_path
+        self.index_path = index_path
+        self.index = None
+        # faq id -> {"question", "answer", "follow_ups"}
+        self._entries = {}
+        # 文档 id（faq id#序号）-> (faq id, 该问法自身得分)
+        self._docs = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                signature = _corpus_signature(self.corpus_path)
+            except OSError as e:
+                print(f"FAQ corpus unavailable, FAQ answers disabled: {e}")
+                self._loaded = True
+                return
+
+            data = self._read_index(signature)
+            if data is None:
+                data = self._build(signature)
+            self.index = TextIndex.from_dict(data["index"])
+            self._entries = data["entries"]
+            self._docs = {doc_id: (faq_id, score) for doc_id, faq_id, score in data["docs"]}
+            self._loaded = True
+
+    def _read_index(self, signature):
+        """读取磁盘上的索引；不存在、格式不对或语料已经变化时返回 None"""
+        try:
+            with gzip.open(self.index_path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != INDEX_VERSION or data.get("corpus") != signature:
+            return None
+        return data
+
+    def _build(self, signature):
+        """从语料重建索引并写入磁盘"""
+        with open(self.corpus_path, encoding="utf-8") as f:
+            corpus = json.load(f)
+
+        index = TextIndex()
+        entries = {}
+        questions = []
+        for entry in corpus:
+            entries[entry["id"]] = {
+                "question": entry["questions"][0],
+                "answer": entry["answer"],
+                "follow_ups": entry.get("follow_ups", []),
+            }
+            for i, question in enumerate(entry["questions"]):
+                doc_id = f"{entry['id']}#{i}"
+                index.add(doc_id, {"question": question})
+                questions.append((doc_id, entry["id"], question))
+
+        # 自身得分依赖整个语料的统计，全部添加完之后再计算
+        data = {
+            "version": INDEX_VERSION,
+            "corpus": signature,
+            "entries": entries,
+            "docs": [[doc_id, faq_id, index.self_score(question)] for doc_id, faq_id, question in questions],
+            "index": index.to_dict(),
+        }
+
+        directory = os.path.dirname(self.index_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            # 写不进去也不影响本进程使用
+            print(f"Failed to save FAQ index {self.index_path}: {e}")
+        print(f"Built FAQ index: {len(entries)} entries, {len(questions)} questions, {index.stats()['tokens']} tokens")
+        return data
+
+    def match(self, question):
+        """返回最接近的一条 (faq id, 置信度)；没有任何相同的词时返回 None"""
+        self._ensure_loaded()
+        if self.index is None:
+            return None
+        hits = self.index.search(question, limit=1)
+        if not hits:
+            return None
+        doc_id, score = hits[0]
+        faq_id, doc_self_score = self._docs[doc_id]
+        ceiling = max(self.index.self_score(question), doc_self_score)
+        return faq_id, (score / ceiling if ceiling else 0.0)
+
+    def answer(self, question, min_confidence=DEFAULT_MIN_CONFIDENCE):
+        """置信度达到 min_confidence 时返回 (answer, follow_ups)，否则返回 None"""
+        result = self.match(question)
+        if result is None or result[1] < min_confidence:
+            return None
+        entry = self._entries[result[0]]
+        return entry["answer"], list(entry["follow_ups"])
+
+    def rebuild(self):
+        """忽略磁盘上的索引，从语料重建"""
+        with self._lock:
+            self._loaded = False
+            try:
+                os.remove(self.index_path)
+            except OSError:
+                pass
+        self._ensure_loaded()
+
+    def stats(self):
+        return {"entries": len(self._entries), "questions": len(self._docs)}
+
+
+_faq_index = None
+_faq_index_lock = threading.Lock()
+
+
+def get_faq_index():
+    """获取进程级共享的 FAQ 索引（第一次提问时才加载）"""
+    global _faq_index
+    if _faq_index is None:
+        with _faq_index_lock:
+            if _faq_index is None:
+                _faq_index = FaqIndex()
+    return _faq_index
+
+
+def answer_from_faq(question):
+    """FAQ 能回答时返回 (answer, follow_ups)，否则返回 None（交给 Coze）"""
+    return get_faq_index().answer(question, get_float_setting("FAQ_MIN_CONFIDENCE", DEFAULT_MIN_CONFIDENCE))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查看问题在本地 FAQ 中的匹配结果和置信度")
+    parser.add_argument("questions", nargs="*", help="要检索的问题")
+    parser.add_argument("--rebuild", action="store_true", help="从语料重建磁盘上的索引")
+    args = parser.parse_args()
+
+    faq = get_faq_index()
+    if args.rebuild:
+        faq.rebuild()
+    for question in args.questions:
+        result = faq.match(question)
+        if result is None:
+            print(f"{question}\t-\t0.00")
+        else:
+            print(f"{question}\t{result[0]}\t{result[1]:.2f}")
+
+
+if __name__ == "__main__":
+    main()
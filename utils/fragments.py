@@ -0,0 +1,39 @@
+"""
+局部重跑（st.fragment）的兼容封装：
+- fragment 装饰的函数内的按钮、表单等交互只重跑这个函数，不再重新执行整个页面脚本
+  （例如点击“回复”不会重新请求整面心语墙的数据）
+- 旧版本 Streamlit 没有 st.fragment 时退化为普通函数，行为与原来的整页 rerun 相同
+"""
+import streamlit as st
+from streamlit.errors import StreamlitAPIException
+
+if hasattr(st, "fragment"):
+    _fragment = st.fragment
+elif hasattr(st, "experimental_fragment"):
+    _fragment = st.experimental_fragment
+else:
+    _fragment = None
+
+
+def fragment(func=None, *, run_every=None):
+    """用法同 st.fragment：@fragment 或 @fragment(run_every=...)"""
+    if func is None:
+        return lambda f: fragment(f, run_every=run_every)
+    if _fragment is None:
+        return func
+    if run_every is None:
+        return _fragment(func)
+    return _fragment(func, run_every=run_every)
+
+
+def rerun_fragment():
+    """
+    只重跑当前 fragment；
+    在整页运行期间（或不支持局部重跑的版本）调用时改为 rerun 整个页面
+    """
+    if _fragment is not None:
+        try:
+            st.rerun(scope="fragment")
+        except (StreamlitAPIException, TypeError):
+            pass
+    st.rerun()
@@ -0,0 +1,183 @@
+"""
+把缩放后的图片发布为可缓存的静态 URL，代替内联 base64 data URI：
+- 文件名使用内容哈希（同样的内容永远是同一个 URL，内容变化 URL 随之变化）
+- 发布模式由 IMAGE_SERVE_MODE 配置：
+    * "static"（默认）：写入 static/ 目录，通过 Streamlit 静态文件服务访问
+                （需要 .streamlit/config.toml 中 server.enableStaticServing = true）；
+                Streamlit 的 app/static 不发送 Cache-Control，浏览器只能按 Last-Modified 启发式缓存或重新验证，
+                没有长期 immutable 缓存。保持为默认是因为它只用 Streamlit 自己的端口，任何部署方式都能访问
+    * "asset_server"：由本进程内的小型 HTTP 服务提供，带一年期 immutable 缓存头（需要长期浏览器缓存时使用）；
+                      默认只监听 127.0.0.1，监听其他地址时必须设置 IMAGE_ASSET_BASE_URL（浏览器访问的地址），
+                      部署时需要浏览器能访问这个端口（或由反向代理转发）
+    * "inline"：旧方式，返回 data URI
+- 发布目录总大小超过 IMAGE_ASSET_MAX_MB（默认 64MB）时按最近访问时间淘汰，与衍生图缓存相同
+"""
+import base64
+import errno
+import hashlib
+import os
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from utils.config import get_setting, get_int_setting
+from utils.image_cache import evict_lru, get_image_cache
+
+# Streamlit 静态文件服务的根目录（与 Home.py 同级的 static/）
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+ASSET_SUBDIR = "img"
+
+DEFAULT_ASSET_HOST = "127.0.0.1"
+DEFAULT_ASSET_PORT = 8502
+DEFAULT_MAX_MB = 64
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# 衍生图缓存路径 -> 已发布的文件名，避免每次 rerun 重新计算内容哈希
+_published = {}
+_publish_lock = threading.Lock()
+
+_asset_server = None
+
+
+def get_serve_mode():
+    mode = str(get_setting("IMAGE_SERVE_MODE", "static")).lower()
+    if mode not in ("static", "asset_server", "inline"):
+        mode = "static"
+    return mode
+
+
+class _ImmutableAssetHandler(SimpleHTTPRequestHandler):
+    """只读静态资源处理器：文件名带内容哈希，因此可以长期缓存"""
+
+    def end_headers(self):
+        self.send_header("Cache-Control", CACHE_CONTROL)
+        self.send_header("Access-Control-Allow-Origin", "*")
+        super().end_headers()
+
+    def list_directory(self, path):
+        self.send_error(404, "File not found")
+        return None
+
+    def log_message(self, format, *args):
+        # 静态资源请求较多，不输出访问日志
+        pass
+
+
+def _is_loopback(host):
+    return host in ("localhost", "::1") or host.startswith("127.")
+
+
+def _ensure_asset_server():
+    """启动进程内静态资源服务（只启动一次）"""
+    global _asset_server
+    with _publish_lock:
+        if _asset_server is not None:
+            return _asset_server
+
+        host = str(get_setting("IMAGE_ASSET_HOST", DEFAULT_ASSET_HOST))
+        port = get_int_setting("IMAGE_ASSET_PORT", DEFAULT_ASSET_PORT)
+        base_url = get_setting("IMAGE_ASSET_BASE_URL", "")
+        if not _is_loopback(host) and not base_url:
+            raise RuntimeError(
+                f"IMAGE_ASSET_HOST={host} 时必须设置 IMAGE_ASSET_BASE_URL（浏览器访问图片服务的地址）"
+            )
+
+        handler = partial(_ImmutableAssetHandler, directory=str(STATIC_DIR))
+        try:
+            server = ThreadingHTTPServer((host, port), handler)
+        except OSError as e:
+            if e.errno != errno.EADDRINUSE or base_url:
+                # 配置了 IMAGE_ASSET_BASE_URL 时端口是部署约定的一部分，换端口后地址就对不上了
+                raise
+            # 同一台机器上的另一个 Streamlit 进程已经占用了端口，改用系统分配的空闲端口
+            print(f"Image asset port {port} is in use, falling back to an ephemeral port")
+            server = ThreadingHTTPServer((host, 0), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="image-asset-server", daemon=True).start()
+        print(f"Image asset server listening on {host}:{server.server_address[1]}")
+        _asset_server = server
+        return server
+
+
+def _asset_base_url(mode):
+    if mode == "asset_server":
+        server = _ensure_asset_server()
+        default_base = f"http://{server.server_address[0]}:{server.server_address[1]}"
+        return str(get_setting("IMAGE_ASSET_BASE_URL", default_base)).rstrip("/")
+    # Streamlit 静态文件服务挂在 app/static 下，使用相对路径以兼容 baseUrlPath
+    return "app/static"
+
+
+def publish_file(cache_path, extension):
+    """把衍生图复制到静态目录，文件名为内容哈希，返回相对静态目录的路径"""
+    cache_path = Path(cache_path)
+    key = str(cache_path)
+    target_dir = STATIC_DIR / ASSET_SUBDIR
+
+    name = _published.get(key)
+    if name:
+        try:
+            # 刷新 mtime 作为最近访问时间，供淘汰使用
+            os.utime(target_dir / name)
+            return f"{ASSET_SUBDIR}/{name}"
+        except OSError:
+            # 已经被淘汰，重新发布
+            pass
+
+    # 边读边计算哈希边写临时文件，源文件只读一遍
+    target_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = target_dir / f"{cache_path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    sha = hashlib.sha256()
+    try:
+        with open(cache_path, "rb") as src, open(tmp_path, "wb") as dst:
+            for chunk in iter(lambda: src.read(1024 * 1024), b""):
+                sha.update(chunk)
+                dst.write(chunk)
+        name = f"{sha.hexdigest()[:20]}.{extension}"
+        os.replace(tmp_path, target_dir / name)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    evict_lru(target_dir, get_int_setting("IMAGE_ASSET_MAX_MB", DEFAULT_MAX_MB) * 1024 * 1024)
+
+    with _publish_lock:
+        _published[key] = name
+    return f"{ASSET_SUBDIR}/{name}"
+
+
+def touch_published(urls):
+    """
+    刷新 get_image_src 返回的文件的最近访问时间（供淘汰使用），返回这些文件是否都还在；
+    缓存了 URL 的调用方用它确认文件没有被淘汰（data URI 直接视为存在）
+    """
+    for url in urls:
+        if url.startswith("data:"):
+            continue
+        try:
+            os.utime(STATIC_DIR / ASSET_SUBDIR / url.rsplit("/", 1)[-1])
+        except OSError:
+            return False
+    return True
+
+
+def get_image_src(src_path, max_width=None, max_height=None, mode=None):
+    """
+    获取可直接放进 <img src="..."> 的地址：
+    - static / asset_server 模式返回带内容哈希的 URL
+    - inline 模式返回 data URI
+    """
+    image_cache = get_image_cache()
+    cache_path = image_cache.get_path(src_path, max_width=max_width, max_height=max_height)
+
+    mode = mode or get_serve_mode()
+    if mode == "inline":
+        encoded = base64.b64encode(cache_path.read_bytes()).decode()
+        return f"data:{image_cache.mime_type};base64,{encoded}"
+
+    relative = publish_file(cache_path, image_cache.extension)
+    return f"{_asset_base_url(mode)}/{relative}"
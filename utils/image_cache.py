@@ -0,0 +1,316 @@
+"""
+图片衍生图（缩放后的小图）磁盘缓存：
+- 以 源文件路径 + mtime + 目标尺寸 作为缓存键
+- 缩放结果以 WebP（不支持时退回 JPEG）保存在 data/cache/images 下
+- 命中时直接读取磁盘文件，不再重复解码、缩放、编码
+- 缓存总大小超过上限时，按最近访问时间淘汰
+- 支持启动时后台预热，或命令行预热：python -m utils.image_cache
+- 后台线程池预取相邻图片；同时进行的解码任务数有上限，避免大图占满 CPU
+"""
+import argparse
+import hashlib
+import io
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+from PIL import Image, features
+
+from utils.config import get_setting, get_int_setting
+from utils.photo_catalog import get_photo_catalog
+
+CACHE_DIR = Path("data") / "cache" / "images"
+
+# 默认缓存上限 64MB，可通过 IMAGE_CACHE_MAX_MB 配置
+DEFAULT_MAX_MB = 64
+DEFAULT_QUALITY = 80
+
+# 后台预取线程数、同时解码的图片数上限，可通过 IMAGE_PREFETCH_WORKERS / IMAGE_MAX_DECODES 配置
+DEFAULT_PREFETCH_WORKERS = 2
+DEFAULT_MAX_DECODES = 2
+
+# JPEG 不支持透明通道，透明部分使用的底色，与轮播图片框背景一致
+BACKGROUND_COLOR = (249, 240, 255)
+
+MIME_TYPES = {
+    "WEBP": "image/webp",
+    "JPEG": "image/jpeg",
+}
+
+
+def evict_lru(directory, max_bytes):
+    """
+    目录下文件总大小超过 max_bytes 时，按 mtime（最近访问时间）从旧到新删除，返回删除的文件数；
+    正在写入的 .tmp 文件不计入也不删除
+    """
+    entries = []
+    total = 0
+    for entry in os.scandir(directory):
+        if not entry.is_file() or entry.name.endswith(".tmp"):
+            continue
+        stat = entry.stat()
+        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total += stat.st_size
+
+    if total <= max_bytes:
+        return 0
+
+    removed = 0
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
+
+
+class ImageCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=None, image_format=None, quality=DEFAULT_QUALITY,
+                 max_decodes=None):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        if max_bytes is None:
+            max_bytes = get_int_setting("IMAGE_CACHE_MAX_MB", DEFAULT_MAX_MB) * 1024 * 1024
+        self.max_bytes = max_bytes
+
+        if image_format is None:
+            image_format = str(get_setting("IMAGE_CACHE_FORMAT", "WEBP")).upper()
+        if image_format == "WEBP" and not features.check("webp"):
+            image_format = "JPEG"
+        if image_format not in MIME_TYPES:
+            image_format = "JPEG"
+        self.image_format = image_format
+        self.quality = quality
+
+        if max_decodes is None:
+            max_decodes = get_int_setting("IMAGE_MAX_DECODES", DEFAULT_MAX_DECODES)
+        # 前台请求和后台预取共用的解码并发上限
+        self._decode_slots = threading.BoundedSemaphore(max(1, max_decodes))
+
+        # 正在生成中的衍生图：缓存键 -> Future，同一张图只生成一次
+        self._inflight = {}
+        # 已提交到线程池、尚未开始执行的预取任务
+        self._queued = set()
+        self._inflight_lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        self._executor = None
+
+    @property
+    def mime_type(self):
+        return MIME_TYPES[self.image_format]
+
+    @property
+    def extension(self):
+        return "webp" if self.image_format == "WEBP" else "jpg"
+
+    def _cache_key(self, src_path, max_width, max_height):
+        """源文件绝对路径 + mtime + 目标尺寸 + 输出格式 -> 缓存文件名"""
+        src_path = os.path.abspath(src_path)
+        mtime_ns = os.stat(src_path).st_mtime_ns
+        raw = f"{src_path}|{mtime_ns}|{max_width}x{max_height}|{self.image_format}|{self.quality}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _render(self, src_path, max_width, max_height):
+        """解码源图并按比例缩小到目标尺寸以内，返回编码后的字节"""
+        with Image.open(src_path) as img:
+            img.load()
+            width, height = img.size
+            ratio = 1.0
+            if max_height and height > max_height:
+                ratio = min(ratio, max_height / height)
+            if max_width and width > max_width:
+                ratio = min(ratio, max_width / width)
+            if ratio < 1.0:
+                new_size = (max(1, int(width * ratio)), max(1, int(height * ratio)))
+                img = img.resize(new_size, Image.LANCZOS)
+
+            has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+            if self.image_format == "WEBP":
+                img = img.convert("RGBA" if has_alpha else "RGB")
+            else:
+                # JPEG 不支持透明通道，贴到与图片框一致的背景色上
+                if has_alpha:
+                    rgba = img.convert("RGBA")
+                    img = Image.new("RGB", rgba.size, BACKGROUND_COLOR)
+                    img.paste(rgba, mask=rgba.split()[-1])
+                else:
+                    img = img.convert("RGB")
+
+            buffer = io.BytesIO()
+            if self.image_format == "WEBP":
+                img.save(buffer, format="WEBP", quality=self.quality, method=4)
+            else:
+                img.save(buffer, format="JPEG", quality=self.quality, optimize=True)
+            return buffer.getvalue()
+
+    def _locate(self, src_path, max_width, max_height):
+        key = self._cache_key(src_path, max_width, max_height)
+        return key, self.cache_dir / f"{key}.{self.extension}"
+
+    def is_cached(self, src_path, max_width=None, max_height=None):
+        """衍生图是否已经在磁盘上"""
+        _, cache_path = self._locate(src_path, max_width, max_height)
+        return cache_path.exists()
+
+    def _build(self, key, cache_path, src_path, max_width, max_height):
+        """生成衍生图；若其他线程正在生成同一张图，则等待其结果"""
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not owner:
+            return future.result()
+
+        try:
+            if not cache_path.exists():
+                with self._decode_slots:
+                    data = self._render(src_path, max_width, max_height)
+
+                # 先写临时文件再原子替换，避免并发会话读到半个文件
+                tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, cache_path)
+
+                self.evict()
+            future.set_result(cache_path)
+            return cache_path
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def get_path(self, src_path, max_width=None, max_height=None):
+        """获取衍生图的磁盘路径，缓存未命中时生成"""
+        key, cache_path = self._locate(src_path, max_width, max_height)
+
+        if cache_path.exists():
+            # 命中：刷新 mtime 作为最近访问时间，供淘汰使用
+            try:
+                os.utime(cache_path)
+            except OSError:
+                pass
+            return cache_path
+
+        return self._build(key, cache_path, src_path, max_width, max_height)
+
+    def _get_executor(self):
+        with self._inflight_lock:
+            if self._executor is None:
+                workers = max(1, get_int_setting("IMAGE_PREFETCH_WORKERS", DEFAULT_PREFETCH_WORKERS))
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-prefetch")
+            return self._executor
+
+    def prefetch(self, src_paths, max_width=None, max_height=None):
+        """
+        在后台线程池中预先生成衍生图：
+        - 已缓存或正在生成的图片直接跳过
+        - 返回本次提交的任务数
+        """
+        submitted = 0
+        for src_path in src_paths:
+            try:
+                key, cache_path = self._locate(src_path, max_width, max_height)
+            except OSError as e:
+                print(f"Error prefetching {src_path}: {e}")
+                continue
+            if cache_path.exists():
+                continue
+            with self._inflight_lock:
+                if key in self._inflight or key in self._queued:
+                    continue
+                self._queued.add(key)
+            self._get_executor().submit(self._prefetch_one, key, cache_path, src_path, max_width, max_height)
+            submitted += 1
+        return submitted
+
+    def _prefetch_one(self, key, cache_path, src_path, max_width, max_height):
+        try:
+            self._build(key, cache_path, src_path, max_width, max_height)
+        except Exception as e:
+            print(f"Error prefetching {src_path}: {e}")
+        finally:
+            with self._inflight_lock:
+                self._queued.discard(key)
+
+    def get_bytes(self, src_path, max_width=None, max_height=None):
+        """获取衍生图的字节内容"""
+        return self.get_path(src_path, max_width, max_height).read_bytes()
+
+    def evict(self):
+        """缓存总大小超过上限时，按最近访问时间从旧到新删除"""
+        with self._evict_lock:
+            return evict_lru(self.cache_dir, self.max_bytes)
+
+    def warm(self, folder, max_width=None, max_height=None):
+        """在当前线程中生成目录下所有图片的衍生图，返回生成/命中的数量"""
+        count = 0
+        for src_path in get_photo_catalog(folder).paths():
+            try:
+                self.get_path(src_path, max_width, max_height)
+                count += 1
+            except Exception as e:
+                print(f"Error warming image cache for {src_path}: {e}")
+        return count
+
+
+# 进程级单例，所有会话共享
+_cache = None
+_cache_lock = threading.Lock()
+_warmed = set()
+
+
+def get_image_cache():
+    """获取进程级共享的 ImageCache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ImageCache()
+    return _cache
+
+
+def warm_up_async(folder, max_width=None, max_height=None):
+    """通过后台预取线程池预热整个目录，每个进程每种尺寸只执行一次"""
+    key = (os.path.abspath(folder), max_width, max_height)
+    with _cache_lock:
+        if key in _warmed:
+            return
+        _warmed.add(key)
+
+    count = get_image_cache().prefetch(get_photo_catalog(folder).paths(), max_width, max_height)
+    if count:
+        print(f"Image cache warm-up: {count} images queued from {folder}")
+
+
+def main():
+    # 默认尺寸与首页响应式金字塔请求的一致，预热的缓存键页面才用得到（image_pyramid 依赖本模块，这里再导入）
+    from utils.image_pyramid import DEFAULT_MAX_HEIGHT, DEFAULT_WIDTHS
+
+    parser = argparse.ArgumentParser(description="预热图片衍生图缓存")
+    parser.add_argument("--folder", default="photos", help="源图片目录")
+    parser.add_argument("--widths", type=int, nargs="+", default=list(DEFAULT_WIDTHS), help="要生成的宽度（像素）")
+    parser.add_argument("--max-height", type=int, default=DEFAULT_MAX_HEIGHT, help="最大高度（像素）")
+    args = parser.parse_args()
+
+    start = time.time()
+    cache = get_image_cache()
+    count = sum(cache.warm(args.folder, width, args.max_height) for width in args.widths)
+    print(f"Warmed {count} images into {cache.cache_dir} ({cache.image_format}) in {time.time() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
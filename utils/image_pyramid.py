@@ -0,0 +1,144 @@
+"""
+响应式图片金字塔：
+- 为每张源图生成多个宽度的 WebP 衍生图（复用磁盘衍生图缓存和静态 URL 发布）
+- 额外生成一张极小的模糊占位图（内联 data URI），图片加载完成前先显示占位
+- 页面输出 srcset/sizes，由浏览器按显示宽度和像素密度选择合适的文件
+"""
+import base64
+import html
+import io
+import os
+import threading
+
+from PIL import Image, ImageFilter
+
+from utils.image_assets import get_image_src, get_serve_mode, touch_published
+from utils.image_cache import get_image_cache
+
+DEFAULT_WIDTHS = (320, 640, 960, 1280)
+# 高度上限：轮播显示高度 380px 的 2 倍，高分屏也能清晰显示
+DEFAULT_MAX_HEIGHT = 760
+
+PLACEHOLDER_WIDTH = 24
+PLACEHOLDER_BLUR_RADIUS = 2
+
+# (源文件, mtime, 宽度列表, 最大高度, 发布模式) -> (金字塔信息, 其中的图片 URL)
+_pyramids = {}
+# 最小衍生图路径 -> 占位图 data URI
+_placeholders = {}
+_lock = threading.Lock()
+
+
+def _output_size(source_size, max_width, max_height):
+    """与 ImageCache 相同的缩放规则：只缩小不放大，保持比例"""
+    width, height = source_size
+    ratio = 1.0
+    if max_height and height > max_height:
+        ratio = min(ratio, max_height / height)
+    if max_width and width > max_width:
+        ratio = min(ratio, max_width / width)
+    return max(1, int(width * ratio)), max(1, int(height * ratio))
+
+
+def get_placeholder(cache_path):
+    """由（已缓存的）最小衍生图生成模糊占位图，返回 data URI"""
+    key = str(cache_path)
+    placeholder = _placeholders.get(key)
+    if placeholder:
+        return placeholder
+
+    with Image.open(cache_path) as img:
+        img = img.convert("RGB")
+        height = max(1, round(img.height * PLACEHOLDER_WIDTH / img.width))
+        img = img.resize((PLACEHOLDER_WIDTH, height), Image.BILINEAR)
+        img = img.filter(ImageFilter.GaussianBlur(PLACEHOLDER_BLUR_RADIUS))
+        buffer = io.BytesIO()
+        # 与衍生图使用同一种格式（WebP 时占位图只有一两百字节）
+        image_cache = get_image_cache()
+        img.save(buffer, format=image_cache.image_format, quality=30)
+
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    placeholder = f"data:{image_cache.mime_type};base64,{encoded}"
+    with _lock:
+        _placeholders[key] = placeholder
+    return placeholder
+
+
+def build_pyramid(src_path, widths=DEFAULT_WIDTHS, max_height=None):
+    """
+    生成图片金字塔，返回 dict：
+    - src: 默认地址（不支持 srcset 的浏览器使用）
+    - srcset: "url 320w, url 640w, ..."（inline 模式下为空，避免把所有尺寸都内联进页面）
+    - placeholder: 模糊占位图 data URI
+    - width / height: 最大一档的像素尺寸，用于预留布局空间
+    """
+    mode = get_serve_mode()
+    widths = tuple(sorted(set(widths)))
+    key = (os.path.abspath(src_path), os.stat(src_path).st_mtime_ns, widths, max_height, mode)
+    cached = _pyramids.get(key)
+    # 已发布的文件可能被发布目录的容量上限淘汰，文件还在时才使用缓存的 URL（同时刷新最近访问时间）
+    if cached and touch_published(cached[1]):
+        return cached[0]
+
+    with Image.open(src_path) as img:
+        source_size = img.size
+
+    image_cache = get_image_cache()
+    smallest = image_cache.get_path(src_path, max_width=widths[0], max_height=max_height)
+    placeholder = get_placeholder(smallest)
+
+    if mode == "inline":
+        # 内联模式下只内联一个尺寸
+        width, height = _output_size(source_size, widths[-1], max_height)
+        pyramid = {
+            "src": get_image_src(src_path, max_width=widths[-1], max_height=max_height),
+            "srcset": "",
+            "placeholder": placeholder,
+            "width": width,
+            "height": height,
+        }
+    else:
+        variants = []
+        seen_widths = set()
+        for max_width in widths:
+            width, height = _output_size(source_size, max_width, max_height)
+            # 原图或高度限制使多档宽度相同时只保留一档
+            if width in seen_widths:
+                continue
+            seen_widths.add(width)
+            url = get_image_src(src_path, max_width=max_width, max_height=max_height)
+            variants.append((width, height, url))
+
+        middle = variants[len(variants) // 2]
+        pyramid = {
+            "src": middle[2],
+            "srcset": ", ".join(f"{url} {width}w" for width, _, url in variants),
+            "placeholder": placeholder,
+            "width": variants[-1][0],
+            "height": variants[-1][1],
+        }
+
+    urls = [pyramid["src"]] + [entry.rsplit(" ", 1)[0] for entry in pyramid["srcset"].split(", ") if entry]
+    with _lock:
+        _pyramids[key] = (pyramid, urls)
+    return pyramid
+
+
+def img_tag(pyramid, sizes, alt="", style=""):
+    """根据金字塔信息生成 <img> 标签：带 srcset/sizes，加载前显示模糊占位背景"""
+    placeholder_style = (
+        f"background-image: url('{pyramid['placeholder']}'); "
+        "background-size: cover; background-position: center;"
+    )
+    attrs = [
+        f'src="{html.escape(pyramid["src"])}"',
+        f'alt="{html.escape(alt)}"',
+        'decoding="async"',
+        f'style="{html.escape(placeholder_style + " " + style)}"',
+        # 加载完成后去掉占位背景，避免透明图片边缘露出模糊底图
+        "onload=\"this.style.backgroundImage='none'\"",
+    ]
+    if pyramid["srcset"]:
+        attrs.append(f'srcset="{html.escape(pyramid["srcset"])}"')
+        attrs.append(f'sizes="{html.escape(sizes)}"')
+    return f"<img {' '.join(attrs)}>"
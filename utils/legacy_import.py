@@ -0,0 +1,293 @@
+"""
+旧版本地帖子目录（posts/）批量导入到 /api/post_items：
+- 逐个目录惰性遍历和解析，不会一次性把整个目录树读进内存
+  posts/<uuid>/content.txt            帖子（作者:/时间:/内容: 格式）
+  posts/<uuid>/replies/<unix_ts>.txt  回复
+- 帖子沿用目录名作为 item_id，回复用 uuid5(帖子 id + 文件名) 生成固定的 item_id，重复导入是幂等的
+- 每批包含若干个完整的帖子（帖子先于它的回复发送），多批并发发送，并发数有上限
+- 每个帖子连同回复全部发送成功后写入检查点文件，中断后重新运行会跳过已完成的帖子；
+  有回复文件解析失败的帖子不写检查点，修正文件后重新运行会再次导入（已发送的条目幂等）
+- 定期输出吞吐量；--dry-run 只解析、校验和计数，不发送也不写检查点
+
+用法：
+    python -m utils.legacy_import [posts] [--batch-size 20] [--concurrency 4]
+                                  [--checkpoint data/legacy_import.checkpoint] [--dry-run]
+"""
+import argparse
+import datetime
+import os
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.post_outbox import deliver_item
+
+DEFAULT_CHECKPOINT = os.path.join("data", "legacy_import.checkpoint")
+
+# 回复 item_id 的命名空间（固定值，保证多次导入生成相同的 id）
+REPLY_NAMESPACE = uuid.UUID("6f1c4a52-3b7e-4d0a-9a57-2f0d8e1b5c33")
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# 单条发送遇到暂时性错误时的重试次数和退避
+MAX_ATTEMPTS = 5
+RETRY_BACKOFF_BASE = 0.5
+RETRY_BACKOFF_MAX = 10.0
+
+REPORT_INTERVAL = 5.0
+
+
+class LegacyFormatError(ValueError):
+    """旧格式文件无法解析"""
+
+
+def parse_legacy_file(path):
+    """解析 作者:/时间:/内容: 格式的文件，返回 (作者, 时间, 内容)"""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+
+    header, sep, content = text.partition("内容:")
+    if not sep:
+        raise LegacyFormatError("缺少“内容:”")
+
+    fields = {}
+    for line in header.splitlines():
+        key, colon, value = line.partition(":")
+        if colon:
+            fields[key.strip()] = value.strip()
+
+    author = fields.get("作者")
+    created_at = fields.get("时间")
+    if not author:
+        raise LegacyFormatError("缺少作者")
+    try:
+        datetime.datetime.strptime(created_at or "", TIME_FORMAT)
+    except ValueError:
+        raise LegacyFormatError(f"时间格式错误：{created_at!r}")
+
+    content = content.lstrip("\n").rstrip()
+    if not content:
+        raise LegacyFormatError("内容为空")
+    return author, created_at, content
+
+
+def read_legacy_post(post_dir):
+    """
+    读取一个帖子目录，返回 (条目列表, 错误列表)
+    条目列表第一条是帖子，后面是按时间排序的回复；帖子本身无法解析时条目列表为空
+    """
+    post_id = os.path.basename(post_dir)
+    errors = []
+    try:
+        author, created_at, content = parse_legacy_file(os.path.join(post_dir, "content.txt"))
+    except (OSError, UnicodeDecodeError, LegacyFormatError) as e:
+        return [], [f"{post_dir}: {e}"]
+
+    items = [{
+        "item_id": post_id,
+        "item_type": "post",
+        "parent_post_id": None,
+        "author_username": author,
+        "content": content,
+        "created_at": created_at,
+    }]
+
+    replies = []
+    replies_dir = os.path.join(post_dir, "replies")
+    if os.path.isdir(replies_dir):
+        for entry in os.scandir(replies_dir):
+            if not entry.is_file() or not entry.name.endswith(".txt"):
+                continue
+            try:
+                reply_author, reply_time, reply_content = parse_legacy_file(entry.path)
+            except (OSError, UnicodeDecodeError, LegacyFormatError) as e:
+                errors.append(f"{entry.path}: {e}")
+                continue
+            replies.append({
+                "item_id": str(uuid.uuid5(REPLY_NAMESPACE, f"{post_id}/{entry.name}")),
+                "item_type": "reply",
+                "parent_post_id": post_id,
+                "author_username": reply_author,
+                "content": reply_content,
+                "created_at": reply_time,
+            })
+
+    replies.sort(key=lambda r: r["created_at"])
+    return items + replies, errors
+
+
+def iter_post_dirs(root):
+    """惰性遍历 posts/ 下的帖子目录"""
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir() and os.path.isfile(os.path.join(entry.path, "content.txt")):
+                yield entry.path
+
+
+class Checkpoint:
+    """已完成的帖子 id，每行一个；追加写入并立即落盘"""
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.done = {line.strip() for line in f if line.strip()}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def mark_done(self, post_id):
+        with self._lock:
+            self._file.write(post_id + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.done.add(post_id)
+
+    def close(self):
+        self._file.close()
+
+
+class ImportStats:
+    def __init__(self):
+        self.posts = 0
+        self.replies = 0
+        self.skipped_posts = 0
+        self.sent = 0
+        self.failed_posts = 0
+        self.incomplete_posts = 0
+        self.invalid_files = 0
+        self.started_at = time.monotonic()
+        self._reported_at = self.started_at
+        self._lock = threading.Lock()
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def summary(self):
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        return (
+            f"posts={self.posts} replies={self.replies} skipped={self.skipped_posts} "
+            f"sent={self.sent} failed_posts={self.failed_posts} incomplete_posts={self.incomplete_posts} "
+            f"invalid_files={self.invalid_files} "
+            f"elapsed={elapsed:.1f}s read={(self.posts + self.replies) / elapsed:.1f} items/s "
+            f"send={self.sent / elapsed:.1f} items/s"
+        )
+
+    def maybe_report(self):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._reported_at < REPORT_INTERVAL:
+                return
+            self._reported_at = now
+        print(self.summary(), flush=True)
+
+
+def send_with_retry(payload):
+    """发送一条，暂时性错误按指数退避重试，返回 (是否成功, 错误信息)"""
+    error = None
+    for attempt in range(MAX_ATTEMPTS):
+        outcome, error = deliver_item(payload)
+        if outcome == "delivered":
+            return True, None
+        if outcome == "rejected":
+            return False, error
+        time.sleep(random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * (2 ** attempt))))
+    return False, error
+
+
+def send_batch(batch, checkpoint, stats):
+    """
+    发送一批帖子：每个帖子先发帖子再发回复，全部成功后写检查点；
+    有回复文件解析失败的帖子发送后不写检查点，下次运行时重新导入
+    """
+    for post_id, items, complete in batch:
+        for item in items:
+            ok, error = send_with_retry(item)
+            if not ok:
+                print(f"Failed to import {item['item_type']} {item['item_id']} of post {post_id}: {error}", flush=True)
+                stats.add(failed_posts=1)
+                break
+            stats.add(sent=1)
+        else:
+            if complete:
+                checkpoint.mark_done(post_id)
+            else:
+                stats.add(incomplete_posts=1)
+        stats.maybe_report()
+
+
+def iter_batches(root, batch_size, skip, stats):
+    """逐个读取帖子目录，凑满 batch_size 个帖子产出一批，每项为 (帖子 id, 条目列表, 回复是否全部解析成功)"""
+    batch = []
+    for post_dir in iter_post_dirs(root):
+        post_id = os.path.basename(post_dir)
+        if post_id in skip:
+            stats.add(skipped_posts=1)
+            continue
+        items, errors = read_legacy_post(post_dir)
+        for error in errors:
+            print(f"Invalid legacy file {error}", flush=True)
+        stats.add(invalid_files=len(errors))
+        if not items:
+            continue
+        stats.add(posts=1, replies=len(items) - 1)
+        batch.append((post_id, items, not errors))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def run_import(root, batch_size=20, concurrency=4, checkpoint_path=DEFAULT_CHECKPOINT, dry_run=False):
+    stats = ImportStats()
+
+    if dry_run:
+        for _ in iter_batches(root, batch_size, set(), stats):
+            stats.maybe_report()
+        print(f"Dry run: {stats.summary()}", flush=True)
+        return stats
+
+    checkpoint = Checkpoint(checkpoint_path)
+    # 同时在途的批次数有上限，目录遍历不会远远跑在发送前面
+    in_flight = threading.BoundedSemaphore(concurrency * 2)
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="legacy-import") as executor:
+            for batch in iter_batches(root, batch_size, checkpoint.done, stats):
+                in_flight.acquire()
+                future = executor.submit(send_batch, batch, checkpoint, stats)
+                future.add_done_callback(lambda _: in_flight.release())
+    finally:
+        checkpoint.close()
+
+    print(f"Done: {stats.summary()}", flush=True)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把旧版 posts/ 目录导入到 DataBaseHOST 的 /api/post_items")
+    parser.add_argument("root", nargs="?", default="posts", help="旧帖子目录（默认 posts）")
+    parser.add_argument("--batch-size", type=int, default=20, help="每批包含的帖子数")
+    parser.add_argument("--concurrency", type=int, default=4, help="同时发送的批次数")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="检查点文件路径")
+    parser.add_argument("--dry-run", action="store_true", help="只解析、校验和计数，不发送")
+    args = parser.parse_args()
+
+    run_import(
+        args.root,
+        batch_size=max(1, args.batch_size),
+        concurrency=max(1, args.concurrency),
+        checkpoint_path=args.checkpoint,
+        dry_run=args.dry_run,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,546 @@
+"""
+Streamlit 页面并发压测：
+- 用无界面的 websocket 客户端模拟浏览器会话（协议与前端相同：BackMsg.rerun_script / ForwardMsg），
+  每次交互记录从发出 rerun 到脚本运行结束（script_finished）的时间
+- 虚拟用户按权重随机执行脚本化的用户旅程，每次旅程是一个新会话：
+    feed      打开心语墙，加载更多两次
+    expand    打开心语墙，展开第一个帖子的全部回复（需要 POST_REPLIES_MODE = "lazy"）
+    reply     登录演示账号，打开心语墙，回复第一个帖子
+    carousel  打开首页，轮播图下一张三次（需要 CAROUSEL_MODE = "server"）
+    chat      打开 AI 问答，点击第一个推荐问题
+- 按步骤输出每次 rerun 的 p50/p95/p99、吞吐量、错误数，以及 Streamlit 服务进程的 RSS（读取 /proc）
+- 默认自动启动本地替身后端（utils.local_backend，含 Coze 替身）和一个 Streamlit 服务，
+  配置通过临时 secrets 文件传入，不会读取 .streamlit/secrets.toml，也不会访问真实的 DataBaseHOST；
+  也可以用 --url 压测已经在运行的服务（--server-pid 指定进程以采集 RSS）
+- reply 旅程会像真实登录一样在 data/users.json 中记录演示账号 demo
+
+用法：
+    python -m utils.load_test --users 50 --duration 60
+    python -m utils.load_test --users 500 --duration 120 --ramp-up 30 --mix feed=4,expand=2,carousel=2,chat=1,reply=1 \\
+        --seed-posts 100000 --latency-ms 30 --setting POST_RENDER_MODE=batched
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+import requests
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MIX = "feed=3,expand=2,reply=1,carousel=2,chat=1"
+
+# 自动启动服务时的默认配置，可用 --setting 覆盖
+DEFAULT_SETTINGS = {
+    "CAROUSEL_MODE": "server",
+    "POST_REPLIES_MODE": "lazy",
+    "COZE_API_KEY": "local",
+    "COZE_BOT_ID": "local-bot",
+}
+
+RERUN_TIMEOUT = 60.0
+RSS_SAMPLE_INTERVAL = 0.5
+
+FINISHED_SUCCESSFULLY = ForwardMsg.ScriptFinishedStatus.FINISHED_SUCCESSFULLY
+FINISHED_FRAGMENT_RUN_SUCCESSFULLY = ForwardMsg.ScriptFinishedStatus.FINISHED_FRAGMENT_RUN_SUCCESSFULLY
+FINISHED_WITH_COMPILE_ERROR = ForwardMsg.ScriptFinishedStatus.FINISHED_WITH_COMPILE_ERROR
+
+
+class JourneyError(Exception):
+    """旅程无法继续（页面异常、找不到控件、超时）"""
+
+
+def percentile(values, p):
+    """values 已排序；最近秩法"""
+    if not values:
+        return None
+    index = max(0, min(len(values) - 1, math.ceil(p / 100 * len(values)) - 1))
+    return values[index]
+
+
+def read_rss(pid):
+    """进程的常驻内存（字节），无法读取时返回 None（只支持 Linux 的 /proc）"""
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _widget_key(widget_id):
+    """控件 id 形如 $$ID-<hash>-<key>，取出用户指定的 key（没有 key 时返回 None）"""
+    parts = widget_id.split("-", 2)
+    return parts[2] if len(parts) == 3 else None
+
+
+class AppSession:
+    """一个模拟的浏览器会话"""
+
+    def __init__(self, url, recorder):
+        self.ws_url = url.replace("http://", "ws://").replace("https://", "wss://").rstrip("/") + "/_stcore/stream"
+        self.recorder = recorder
+        self.page_name = ""
+        self.page_script_hash = ""
+        self._ws = None
+        # delta_path -> (控件类型, 控件 proto, fragment_id)
+        self._elements = {}
+        # 控件 id -> WidgetState（会话内保持，每次 rerun 全部带上，和前端一样）
+        self._values = {}
+        # 定时重跑的 fragment：fragment_id -> 间隔（秒）；和前端一样由客户端按间隔发起 rerun
+        self._auto_reruns = {}
+
+    async def __aenter__(self):
+        self._ws = await websockets.connect(self.ws_url, subprotocols=["streamlit"], max_size=None)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._ws.close()
+
+    def _find(self, key=None, key_prefix=None, label=None, kind=None):
+        for element_kind, widget, fragment_id in self._elements.values():
+            if kind and element_kind != kind:
+                continue
+            widget_key = _widget_key(widget.id) or ""
+            if key is not None and widget_key != key:
+                continue
+            if key_prefix is not None and not widget_key.startswith(key_prefix):
+                continue
+            if label is not None and getattr(widget, "label", None) != label:
+                continue
+            return element_kind, widget, fragment_id
+        return None
+
+    def has(self, **query):
+        return self._find(**query) is not None
+
+    def widget_key(self, **query):
+        found = self._find(**query)
+        return _widget_key(found[1].id) if found else None
+
+    async def _rerun(self, step, triggers=(), fragment_id="", auto=False):
+        msg = BackMsg()
+        client_state = msg.rerun_script
+        client_state.query_string = ""
+        client_state.page_name = self.page_name
+        client_state.page_script_hash = self.page_script_hash
+        client_state.fragment_id = fragment_id
+        client_state.is_auto_rerun = auto
+        for state in list(self._values.values()) + list(triggers):
+            client_state.widget_states.widgets.add().CopyFrom(state)
+
+        started = time.perf_counter()
+        await self._ws.send(msg.SerializeToString())
+        try:
+            error = await asyncio.wait_for(self._receive_run(), RERUN_TIMEOUT)
+        except asyncio.TimeoutError:
+            error = "timeout"
+        self.recorder.record(step, time.perf_counter() - started, error)
+        if error:
+            raise JourneyError(f"{step}: {error}")
+
+    async def _receive_run(self):
+        """读取 ForwardMsg 直到脚本运行结束，返回错误信息（没有错误时为 None）"""
+        error = None
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(await self._ws.recv())
+            kind = forward.WhichOneof("type")
+            if kind == "new_session":
+                if not forward.new_session.fragment_ids_this_run:
+                    self._elements = {}
+                    self._auto_reruns = {}
+            elif kind == "navigation":
+                # 和前端一样记住当前页面，之后的 rerun 都带上
+                self.page_script_hash = forward.navigation.page_script_hash
+            elif kind == "auto_rerun":
+                self._auto_reruns[forward.auto_rerun.fragment_id] = forward.auto_rerun.interval
+            elif kind == "stop_auto_rerun":
+                for fragment_id in forward.stop_auto_rerun.fragment_ids:
+                    self._auto_reruns.pop(fragment_id, None)
+            elif kind == "delta":
+                element = forward.delta.new_element
+                element_kind = element.WhichOneof("type")
+                if element_kind == "exception":
+                    error = error or f"exception: {element.exception.message}"
+                elif element_kind:
+                    widget = getattr(element, element_kind)
+                    if "id" in widget.DESCRIPTOR.fields_by_name and widget.id:
+                        self._elements[tuple(forward.metadata.delta_path)] = (
+                            element_kind, widget, forward.delta.fragment_id,
+                        )
+            elif kind == "script_finished":
+                status = forward.script_finished
+                if status in (FINISHED_SUCCESSFULLY, FINISHED_FRAGMENT_RUN_SUCCESSFULLY):
+                    return error
+                if status == FINISHED_WITH_COMPILE_ERROR:
+                    return error or "compile error"
+                # FINISHED_EARLY_FOR_RERUN：脚本调用了 st.rerun，等待下一次运行结束
+
+    async def open(self, page_name, step):
+        """打开页面（""为首页，其余为 url_pathname，如 "Post"）"""
+        self.page_name = page_name
+        self.page_script_hash = ""
+        self._values = {}
+        await self._rerun(step)
+
+    async def click(self, step, **query):
+        found = self._find(**query)
+        if not found:
+            raise JourneyError(f"{step}: button not found {query}")
+        _, widget, fragment_id = found
+        trigger = self._state(widget.id)
+        trigger.trigger_value = True
+        await self._rerun(step, [trigger], fragment_id)
+
+    def fill(self, value, **query):
+        """设置文本框的值（表单内的控件在提交时一起发送）"""
+        found = self._find(**query)
+        if not found:
+            raise JourneyError(f"input not found {query}")
+        state = self._state(found[1].id)
+        state.string_value = value
+        self._values[state.id] = state
+
+    async def toggle(self, step, value=True, **query):
+        found = self._find(**query)
+        if not found:
+            raise JourneyError(f"{step}: toggle not found {query}")
+        _, widget, fragment_id = found
+        state = self._state(widget.id)
+        state.bool_value = value
+        self._values[state.id] = state
+        await self._rerun(step, fragment_id=fragment_id)
+
+    async def wait_for(self, step, predicate, timeout=RERUN_TIMEOUT):
+        """
+        按定时重跑的间隔发起 rerun，直到 predicate() 为真；
+        每次定时 rerun 记为 <step>.poll，从开始等待到满足条件的总时间记为 step
+        """
+        started = time.perf_counter()
+        while not predicate():
+            if not self._auto_reruns:
+                raise JourneyError(f"{step}: nothing to wait for (no auto rerun)")
+            if time.perf_counter() - started > timeout:
+                self.recorder.record(step, time.perf_counter() - started, "timeout", wait=True)
+                raise JourneyError(f"{step}: timeout")
+            fragment_id, interval = next(iter(self._auto_reruns.items()))
+            await asyncio.sleep(interval)
+            await self._rerun(f"{step}.poll", fragment_id=fragment_id, auto=True)
+        self.recorder.record(step, time.perf_counter() - started, wait=True)
+
+    @staticmethod
+    def _state(widget_id):
+        return WidgetState(id=widget_id)
+
+
+async def journey_feed(session):
+    await session.open("Post", "post.open")
+    for _ in range(2):
+        if not session.has(key="load_more_posts"):
+            break
+        await session.click("post.load_more", key="load_more_posts")
+
+
+async def journey_expand(session):
+    await session.open("Post", "post.open")
+    if session.has(key_prefix="expand_replies_"):
+        await session.toggle("post.expand", key_prefix="expand_replies_")
+
+
+async def journey_reply(session):
+    await session.open("Login", "login.open")
+    session.fill("demo", label="用户名")
+    session.fill("demo", label="密码")
+    await session.click("login.submit", label="登录", kind="button")
+    await session.open("Post", "post.open")
+    reply_key = session.widget_key(key_prefix="reply_btn_")
+    if not reply_key:
+        raise JourneyError("post.reply_open: no reply button (not logged in?)")
+    post_id = reply_key[len("reply_btn_"):]
+    await session.click("post.reply_open", key=reply_key)
+    session.fill(f"压测回复 {time.time():.3f}", key=f"reply_input_{post_id}")
+    await session.click("post.reply_send", label="发送", kind="button")
+
+
+async def journey_carousel(session):
+    await session.open("", "home.open")
+    for _ in range(3):
+        await session.click("home.next", key="next_arrow")
+
+
+async def journey_chat(session):
+    await session.open("AI_chat", "chat.open")
+    await session.click("chat.ask", key="followup_0")
+    if session.has(key="cancel_chat"):
+        # COZE_CHAT_MODE = "async"：提问后问答区域定时重跑，直到回答完成
+        await session.wait_for("chat.answer", lambda: not session.has(key="cancel_chat"))
+
+
+JOURNEYS = {
+    "feed": journey_feed,
+    "expand": journey_expand,
+    "reply": journey_reply,
+    "carousel": journey_carousel,
+    "chat": journey_chat,
+}
+
+
+class Recorder:
+    def __init__(self):
+        # 每次 rerun 的耗时（按步骤）
+        self.samples = defaultdict(list)
+        # 跨多次 rerun 的等待（例如等待异步回答完成），不计入 rerun 统计
+        self.waits = defaultdict(list)
+        self.errors = Counter()
+        self.journeys = Counter()
+        self.failed_journeys = Counter()
+        self.rss = []
+
+    def record(self, step, seconds, error=None, wait=False):
+        (self.waits if wait else self.samples)[step].append(seconds)
+        if error:
+            self.errors[f"{step}: {error[:80]}"] += 1
+
+    def report(self, elapsed):
+        lines = [f"{'step':<18}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+
+        def row(name, values):
+            values = sorted(values)
+            ms = [percentile(values, p) * 1000 for p in (50, 95, 99)] + [values[-1] * 1000]
+            return f"{name:<18}{len(values):>8}" + "".join(f"{v:>10.1f}" for v in ms)
+
+        everything = []
+        for step in sorted(self.samples):
+            lines.append(row(step, self.samples[step]))
+            everything.extend(self.samples[step])
+        if everything:
+            lines.append(row("all reruns", everything))
+        for step in sorted(self.waits):
+            lines.append(row(f"{step} (wait)", self.waits[step]))
+
+        lines.append(
+            f"elapsed={elapsed:.1f}s reruns={len(everything)} throughput={len(everything) / elapsed:.1f} reruns/s "
+            f"journeys={sum(self.journeys.values())} ({sum(self.journeys.values()) / elapsed:.2f}/s) "
+            f"failed_journeys={sum(self.failed_journeys.values())}"
+        )
+        lines.append("journeys: " + ", ".join(f"{name}={count}" for name, count in sorted(self.journeys.items())))
+        rss = [value for value in self.rss if value]
+        if rss:
+            lines.append(
+                f"server RSS: start={rss[0] / 2**20:.0f}MB peak={max(rss) / 2**20:.0f}MB end={rss[-1] / 2**20:.0f}MB"
+            )
+        for error, count in self.errors.most_common(10):
+            lines.append(f"error x{count}: {error}")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _summaries(samples):
+        summaries = {}
+        for step, values in samples.items():
+            values = sorted(values)
+            summaries[step] = {
+                "count": len(values),
+                **{f"p{p}_ms": percentile(values, p) * 1000 for p in (50, 95, 99)},
+                "max_ms": values[-1] * 1000,
+            }
+        return summaries
+
+    def to_dict(self, elapsed):
+        reruns = sum(len(values) for values in self.samples.values())
+        return {
+            "elapsed": elapsed,
+            "reruns": reruns,
+            "reruns_per_second": reruns / elapsed,
+            "journeys": dict(self.journeys),
+            "failed_journeys": dict(self.failed_journeys),
+            "steps": self._summaries(self.samples),
+            "waits": self._summaries(self.waits),
+            "errors": dict(self.errors),
+            "rss_peak_bytes": max((value for value in self.rss if value), default=None),
+        }
+
+
+def parse_mix(text):
+    weights = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in JOURNEYS:
+            raise argparse.ArgumentTypeError(f"未知的旅程：{name}（可选 {', '.join(JOURNEYS)}）")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+async def virtual_user(url, recorder, weights, deadline, start_delay, rng, think_time):
+    await asyncio.sleep(start_delay)
+    names = list(weights)
+    while time.monotonic() < deadline:
+        name = rng.choices(names, weights=[weights[n] for n in names])[0]
+        try:
+            async with AppSession(url, recorder) as session:
+                await JOURNEYS[name](session)
+            recorder.journeys[name] += 1
+        except (JourneyError, OSError, websockets.WebSocketException) as e:
+            recorder.failed_journeys[name] += 1
+            if not isinstance(e, JourneyError):
+                recorder.errors[f"{name}: {type(e).__name__}: {str(e)[:80]}"] += 1
+        if think_time:
+            await asyncio.sleep(rng.uniform(0, think_time))
+
+
+async def sample_rss(pid, recorder, stop):
+    while not stop.is_set():
+        recorder.rss.append(read_rss(pid))
+        try:
+            await asyncio.wait_for(stop.wait(), RSS_SAMPLE_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_load(url, users, duration, weights, ramp_up=0.0, server_pid=None, seed=0, think_time=0.0):
+    recorder = Recorder()
+    rng = random.Random(seed)
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_rss(server_pid, recorder, stop)) if server_pid else None
+
+    started = time.monotonic()
+    deadline = started + ramp_up + duration
+    await asyncio.gather(*(
+        virtual_user(url, recorder, weights, deadline, ramp_up * i / max(users, 1),
+                     random.Random(rng.random()), think_time)
+        for i in range(users)
+    ))
+    elapsed = time.monotonic() - started
+
+    stop.set()
+    if sampler:
+        await sampler
+    return recorder, elapsed
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for(url, proc, timeout=120.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"进程提前退出：{' '.join(proc.args)}")
+        try:
+            if requests.get(url, timeout=1).status_code < 500:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"等待 {url} 超时")
+
+
+def start_stack(args, settings, workdir):
+    """启动本地替身后端和 Streamlit 服务，返回 (Streamlit 地址, 进程列表)"""
+    backend_port = _free_port()
+    backend_url = f"http://127.0.0.1:{backend_port}"
+    backend = subprocess.Popen(
+        [sys.executable, "-m", "utils.local_backend", "--port", str(backend_port),
+         "--seed-posts", str(args.seed_posts), "--seed", str(args.seed),
+         "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+         "--error-rate", str(args.error_rate), "--coze-answer-ms", str(args.coze_answer_ms)],
+        cwd=ROOT, stdout=subprocess.DEVNULL,
+    )
+    processes = [backend]
+    _wait_for(f"{backend_url}/api/post_items?limit=1", backend)
+
+    secrets_path = os.path.join(workdir, "secrets.toml")
+    with open(secrets_path, "w", encoding="utf-8") as f:
+        for name, value in dict(settings, DataBaseHOST=backend_url).items():
+            f.write(f"{name} = {json.dumps(str(value), ensure_ascii=False)}\n")
+
+    app_port = _free_port()
+    env = dict(os.environ, COZE_API_BASE=backend_url)
+    app = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", os.path.join(ROOT, "Home.py"),
+         "--server.headless", "true", "--server.port", str(app_port),
+         "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false",
+         "--secrets.files", secrets_path],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=open(os.path.join(workdir, "streamlit.log"), "w"),
+    )
+    processes.append(app)
+    app_url = f"http://127.0.0.1:{app_port}"
+    _wait_for(f"{app_url}/_stcore/health", app)
+    return app_url, processes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streamlit 页面并发压测")
+    parser.add_argument("--users", type=int, default=50, help="并发虚拟用户数")
+    parser.add_argument("--duration", type=float, default=60.0, help="全部用户启动后持续的秒数")
+    parser.add_argument("--ramp-up", type=float, default=None, help="用户逐步启动的秒数（默认每个用户 0.05 秒，最多 10 秒）")
+    parser.add_argument("--think-time", type=float, default=0.0, help="两次旅程之间的随机等待上限（秒）")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"旅程权重（默认 {DEFAULT_MIX}）")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子（旅程选择和数据集）")
+    parser.add_argument("--json", metavar="PATH", help="把结果另存为 JSON")
+    parser.add_argument("--url", help="压测已在运行的 Streamlit 服务（不自动启动服务）")
+    parser.add_argument("--server-pid", type=int, help="配合 --url：采集这个进程的 RSS")
+    parser.add_argument("--setting", action="append", default=[], metavar="KEY=VALUE",
+                        help="自动启动时传给页面的配置（可重复）")
+    parser.add_argument("--seed-posts", type=int, default=10000, help="本地后端生成的帖子数")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="本地后端注入的延迟（毫秒）")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="本地后端延迟的随机抖动（毫秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="本地后端返回 503 的比例")
+    parser.add_argument("--coze-answer-ms", type=float, default=1500.0, help="Coze 替身的回答时间（毫秒）")
+    args = parser.parse_args()
+
+    ramp_up = args.ramp_up if args.ramp_up is not None else min(args.users * 0.05, 10.0)
+    settings = dict(DEFAULT_SETTINGS)
+    for item in args.setting:
+        name, _, value = item.partition("=")
+        settings[name.strip()] = value
+
+    processes = []
+    with tempfile.TemporaryDirectory(prefix="load_test_") as workdir:
+        try:
+            if args.url:
+                url, server_pid = args.url, args.server_pid
+            else:
+                url, processes = start_stack(args, settings, workdir)
+                server_pid = processes[-1].pid
+                print(f"Started local backend and Streamlit at {url}", flush=True)
+
+            print(f"Running {args.users} users for {args.duration:.0f}s (ramp-up {ramp_up:.0f}s) ...", flush=True)
+            recorder, elapsed = asyncio.run(run_load(
+                url, args.users, args.duration, args.mix,
+                ramp_up=ramp_up, server_pid=server_pid, seed=args.seed, think_time=args.think_time,
+            ))
+        finally:
+            for proc in reversed(processes):
+                proc.terminate()
+                try:
+                    proc.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+
+    print(recorder.report(elapsed))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(recorder.to_dict(elapsed), f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
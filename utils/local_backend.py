@@ -0,0 +1,707 @@
+"""
+DataBaseHOST 接口的本地替身服务（用于离线开发、性能测试和压测）：
+- 实现 docs/backend_api.md 中的全部接口：/api/users（multipart 注册，可带头像）、/api/login、
+  /api/avatar/<文件>、/api/post_items（发布、游标分页、回复预览、ETag/since 增量同步，含 deleted）、
+  /api/post_items/<id>/replies；另有 DELETE /api/post_items/<id>，用于验证客户端对删除的处理
+- 数据保存在 SQLite（默认内存，也可以指定文件以便重复使用同一份数据）
+- 可注入延迟（均值 + 抖动）、错误率（返回 503）和响应体填充（模拟大响应）
+- 可按随机种子生成 1 万到 100 万条帖子的固定数据集
+- 客户端声明接受 gzip 时压缩较大的响应
+- 另带一个最简的 Coze 对话接口替身（/v3/chat（含 stream 流式、conversation_id 多轮会话）、/v3/chat/retrieve、
+  /v3/chat/cancel、/v3/chat/message/list、DELETE /v1/conversations/<id>），
+  把 COZE_API_BASE 指向本服务即可在本地跑 AI 问答页面，回答在 --coze-answer-ms 之后完成
+
+用法：
+    python -m utils.local_backend --port 8800 --seed-posts 100000 --replies-per-post 3 \\
+        --latency-ms 50 --jitter-ms 20 --error-rate 0.01 --pad-bytes 0
+然后在 .streamlit/secrets.toml 或环境变量中设置 DataBaseHOST = "http://127.0.0.1:8800"
+（AI 问答页面另设环境变量 COZE_API_BASE=http://127.0.0.1:8800）
+内置演示账号：demo / demo
+"""
+import argparse
+import datetime
+import email.parser
+import email.policy
+import gzip
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# 超过这个大小且客户端接受 gzip 时压缩响应
+GZIP_MIN_BYTES = 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS post_items (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    item_id TEXT NOT NULL UNIQUE,
+    item_type TEXT NOT NULL,
+    parent_post_id TEXT,
+    author_username TEXT,
+    content TEXT,
+    created_at TEXT,
+    modified_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_items_feed ON post_items (item_type, created_at, item_id);
+CREATE INDEX IF NOT EXISTS idx_items_parent ON post_items (parent_post_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_items_modified ON post_items (modified_at);
+CREATE TABLE IF NOT EXISTS deleted_items (
+    item_id TEXT PRIMARY KEY,
+    deleted_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_deleted_at ON deleted_items (deleted_at);
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    user_id TEXT,
+    password_hash TEXT NOT NULL,
+    email TEXT,
+    gender TEXT,
+    avatar_path TEXT,
+    created_at TEXT
+);
+"""
+
+ITEM_COLUMNS = ("item_id", "item_type", "parent_post_id", "author_username", "content", "created_at")
+
+SEED_PHRASES = (
+    "今天心情很好", "有点紧张", "第一次来这里", "谢谢大家的鼓励", "想分享一件小事",
+    "最近身体有些变化", "不知道该问谁", "妈妈说这很正常", "和朋友聊了很久", "学校里发生的事",
+    "慢慢就会习惯", "有没有人和我一样", "运动之后感觉好多了", "挑内衣好难", "加油",
+)
+
+
+def _now():
+    return datetime.datetime.now().strftime(TIME_FORMAT)
+
+
+def _modified_now():
+    # 修改时间带微秒，水位线（since）之后的重叠尽量少
+    return datetime.datetime.now().strftime(TIME_FORMAT + ".%f")
+
+
+def _password_key(password):
+    return hashlib.sha256(password.encode("utf-8")).hexdigest()
+
+
+class LocalBackend:
+    """接口的数据层：一个 SQLite 连接，所有访问串行（作为参考实现，语义正确比并发更重要）"""
+
+    def __init__(self, db_path=":memory:", avatar_dir=None):
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        if db_path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self.avatar_dir = avatar_dir or os.path.join("data", "local_backend_avatars")
+        # 每次写入加一，作为 ETag
+        self.version = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM post_items").fetchone()[0]
+
+        if not self._conn.execute("SELECT 1 FROM users WHERE username = 'demo'").fetchone():
+            self._conn.execute(
+                "INSERT INTO users (username, user_id, password_hash, avatar_path, created_at) VALUES (?, ?, ?, ?, ?)",
+                ("demo", str(uuid.uuid4()), _password_key("demo"), "default", _now()),
+            )
+
+    # ---------- 数据集 ----------
+
+    def seed(self, posts, replies_per_post=3, seed=0, authors=1000, days=730, chunk=50000):
+        """生成固定的随机数据集：posts 条帖子，每条平均 replies_per_post 条回复"""
+        rng = random.Random(seed)
+        start = datetime.datetime(2024, 1, 1)
+        span = days * 86400
+
+        def rows():
+            for i in range(posts):
+                post_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+                post_time = (start + datetime.timedelta(seconds=rng.randrange(span))).strftime(TIME_FORMAT)
+                yield (post_id, "post", None, f"user{rng.randrange(authors)}",
+                       "，".join(rng.sample(SEED_PHRASES, rng.randint(1, 4))) + f"（#{i}）",
+                       post_time, post_time)
+                for _ in range(rng.randint(0, replies_per_post * 2)):
+                    reply_time = (
+                        datetime.datetime.strptime(post_time, TIME_FORMAT)
+                        + datetime.timedelta(seconds=rng.randrange(1, 7 * 86400))
+                    ).strftime(TIME_FORMAT)
+                    yield (str(uuid.UUID(int=rng.getrandbits(128), version=4)), "reply", post_id,
+                           f"user{rng.randrange(authors)}", rng.choice(SEED_PHRASES),
+                           reply_time, reply_time)
+
+        insert = (
+            f"INSERT OR IGNORE INTO post_items ({', '.join(ITEM_COLUMNS)}, modified_at) "
+            f"VALUES ({', '.join('?' * (len(ITEM_COLUMNS) + 1))})"
+        )
+        with self._lock:
+            batch = []
+            self._conn.execute("BEGIN")
+            for row in rows():
+                batch.append(row)
+                if len(batch) >= chunk:
+                    self._conn.executemany(insert, batch)
+                    batch = []
+            if batch:
+                self._conn.executemany(insert, batch)
+            self._conn.execute("COMMIT")
+            self.version += 1
+
+    def counts(self):
+        with self._lock:
+            return dict(self._conn.execute("SELECT item_type, COUNT(*) FROM post_items GROUP BY item_type").fetchall())
+
+    # ---------- 用户 ----------
+
+    def create_user(self, data, avatar=None):
+        username = data.get("username")
+        if not username or not data.get("password_hash"):
+            return 400, {"success": False, "message": "缺少用户名或密码"}
+
+        avatar_path = "default"
+        if avatar is not None:
+            filename, content = avatar
+            ext = os.path.splitext(filename or "")[1].lower() or ".png"
+            os.makedirs(self.avatar_dir, exist_ok=True)
+            stored = f"{data.get('user_id') or uuid.uuid4()}{ext}"
+            with open(os.path.join(self.avatar_dir, stored), "wb") as f:
+                f.write(content)
+            avatar_path = f"/api/avatar/{stored}"
+
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM users WHERE username = ?", (username,)).fetchone():
+                return 409, {"success": False, "message": "用户名已存在"}
+            if data.get("email") and self._conn.execute(
+                "SELECT 1 FROM users WHERE email = ?", (data["email"],)
+            ).fetchone():
+                return 409, {"success": False, "message": "该邮箱已被注册"}
+            self._conn.execute(
+                "INSERT INTO users (username, user_id, password_hash, email, gender, avatar_path, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (username, data.get("user_id"), data["password_hash"], data.get("email"),
+                 data.get("gender"), avatar_path, data.get("created_at") or _now()),
+            )
+        return 200, {"success": True, "message": "注册成功"}
+
+    def login(self, data):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT password_hash, avatar_path FROM users WHERE username = ?", (data.get("username"),)
+            ).fetchone()
+        if not row or row["password_hash"] != data.get("password_hash"):
+            return 200, {"success": False, "message": "用户名或密码错误"}
+        return 200, {"success": True, "message": "登录成功", "avatar_path": row["avatar_path"] or "default"}
+
+    # ---------- 帖子 ----------
+
+    def add_item(self, data):
+        missing = [name for name in ("item_id", "item_type", "author_username", "content") if not data.get(name)]
+        if missing:
+            return 400, {"success": False, "message": f"缺少字段：{', '.join(missing)}"}
+        if data["item_type"] not in ("post", "reply"):
+            return 400, {"success": False, "message": "item_type 只能是 post 或 reply"}
+
+        with self._lock:
+            if data["item_type"] == "reply" and not self._conn.execute(
+                "SELECT 1 FROM post_items WHERE item_id = ? AND item_type = 'post'", (data.get("parent_post_id"),)
+            ).fetchone():
+                return 400, {"success": False, "message": "回复的帖子不存在"}
+            cursor = self._conn.execute(
+                f"INSERT OR IGNORE INTO post_items ({', '.join(ITEM_COLUMNS)}, modified_at) "
+                f"VALUES ({', '.join('?' * (len(ITEM_COLUMNS) + 1))})",
+                tuple(data.get(column) for column in ITEM_COLUMNS[:-1])
+                + (data.get("created_at") or _now(), _modified_now()),
+            )
+            if cursor.rowcount == 0:
+                # item_id 已存在：幂等，按成功返回
+                return 200, {"success": True, "message": "已存在"}
+            # 删除后用同一 item_id 重新发布：不再出现在 deleted 里
+            self._conn.execute("DELETE FROM deleted_items WHERE item_id = ?", (data["item_id"],))
+            self.version += 1
+        return 200, {"success": True, "message": "发布成功"}
+
+    def delete_item(self, item_id):
+        """删除帖子（连同它的回复）或回复，记录删除时间，增量同步时在 deleted 中返回"""
+        with self._lock:
+            ids = [row["item_id"] for row in self._conn.execute(
+                "SELECT item_id FROM post_items WHERE item_id = ? OR parent_post_id = ?", (item_id, item_id)
+            )]
+            if not ids:
+                return 404, {"success": False, "message": "内容不存在"}
+            deleted_at = _modified_now()
+            self._conn.execute("BEGIN")
+            self._conn.executemany("DELETE FROM post_items WHERE item_id = ?", [(i,) for i in ids])
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO deleted_items (item_id, deleted_at) VALUES (?, ?)",
+                [(i, deleted_at) for i in ids],
+            )
+            self._conn.execute("COMMIT")
+            self.version += 1
+        return 200, {"success": True, "message": "删除成功"}
+
+    @staticmethod
+    def _item(row):
+        return {column: row[column] for column in ITEM_COLUMNS}
+
+    def _replies_for(self, post_ids):
+        replies = {}
+        if not post_ids:
+            return replies
+        placeholders = ", ".join("?" * len(post_ids))
+        for row in self._conn.execute(
+            f"SELECT * FROM post_items WHERE item_type = 'reply' AND parent_post_id IN ({placeholders}) "
+            "ORDER BY created_at",
+            post_ids,
+        ):
+            replies.setdefault(row["parent_post_id"], []).append(self._item(row))
+        return replies
+
+    def _watermark(self):
+        return self._conn.execute(
+            "SELECT MAX(t) FROM (SELECT MAX(modified_at) AS t FROM post_items "
+            "UNION ALL SELECT MAX(deleted_at) FROM deleted_items)"
+        ).fetchone()[0] or _now()
+
+    def list_items(self, params):
+        """GET /api/post_items：分页、回复预览、增量同步或完整快照"""
+        since = params.get("since")
+        limit = params.get("limit")
+        preview = params.get("replies") == "preview"
+
+        with self._lock:
+            if since:
+                rows = self._conn.execute(
+                    "SELECT * FROM post_items WHERE modified_at >= ? ORDER BY seq", (since,)
+                ).fetchall()
+                deleted = [row["item_id"] for row in self._conn.execute(
+                    "SELECT item_id FROM deleted_items WHERE deleted_at >= ?", (since,)
+                )]
+                return {
+                    "success": True,
+                    "data": [self._item(row) for row in rows],
+                    "deleted": deleted,
+                    "watermark": self._watermark(),
+                }
+
+            if limit:
+                limit = max(1, min(int(limit), 500))
+                before_created_at = params.get("before_created_at")
+                if before_created_at is not None:
+                    rows = self._conn.execute(
+                        "SELECT * FROM post_items WHERE item_type = 'post' AND (created_at, item_id) < (?, ?) "
+                        "ORDER BY created_at DESC, item_id DESC LIMIT ?",
+                        (before_created_at, params.get("before_item_id") or "", limit + 1),
+                    ).fetchall()
+                else:
+                    rows = self._conn.execute(
+                        "SELECT * FROM post_items WHERE item_type = 'post' "
+                        "ORDER BY created_at DESC, item_id DESC LIMIT ?",
+                        (limit + 1,),
+                    ).fetchall()
+                has_more = len(rows) > limit
+                rows = rows[:limit]
+            else:
+                rows = self._conn.execute(
+                    "SELECT * FROM post_items WHERE item_type = 'post' ORDER BY created_at DESC, item_id DESC"
+                ).fetchall()
+                has_more = False
+
+            posts = [self._item(row) for row in rows]
+            replies = self._replies_for([post["item_id"] for post in posts])
+            for post in posts:
+                post_replies = replies.get(post["item_id"], [])
+                if preview:
+                    post["reply_count"] = len(post_replies)
+                    post["latest_reply"] = post_replies[-1] if post_replies else None
+                else:
+                    post["replies"] = post_replies
+
+            data = {"success": True, "data": posts}
+            if limit:
+                last = posts[-1] if posts and has_more else None
+                data["next_cursor"] = {"created_at": last["created_at"], "item_id": last["item_id"]} if last else None
+            else:
+                data["watermark"] = self._watermark()
+            return data
+
+    def list_replies(self, post_id):
+        with self._lock:
+            return {"success": True, "data": self._replies_for([post_id]).get(post_id, [])}
+
+
+class FakeCoze:
+    """
+    Coze 对话接口的替身：创建后经过 answer_ms 毫秒对话完成，回答是固定格式的文本（带有会话中的轮次）；
+    同一会话同时只能有一个进行中的对话，和 Coze 一样返回错误码 4016
+    """
+
+    FOLLOW_UPS = ("挑选内衣的注意事项", "胸部发育有哪些阶段", "胸部发育过程会遇到哪些疾病")
+    MAX_CHATS = 10000
+
+    def __init__(self, answer_ms=1500.0):
+        self.answer_ms = answer_ms
+        # chat_id -> (对话信息, 回答, 完成时间)
+        self._chats = {}
+        # conversation_id -> {"user_id", "turns", "chat_id"（最近一次对话）, "used_at"}
+        self.conversations = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _reply(data):
+        return {"code": 0, "msg": "", "data": data}
+
+    def _chat(self, chat_id):
+        chat, _, completes_at = self._chats[chat_id]
+        if time.monotonic() >= completes_at:
+            return dict(chat, status="completed", completed_at=int(time.time()))
+        return dict(chat)
+
+    def create(self, data, params=None):
+        """创建对话；params 为查询参数，其中的 conversation_id 表示追加到已有会话"""
+        question = ""
+        for message in data.get("additional_messages") or []:
+            if message.get("role") == "user":
+                question = message.get("content") or ""
+        conversation_id = (params or {}).get("conversation_id")
+        now = time.monotonic()
+        with self._lock:
+            if len(self._chats) >= self.MAX_CHATS:
+                # 压测时对话数会一直增长，清掉早已完成的对话和早已不用的会话
+                for chat_id in [k for k, (_, _, done) in self._chats.items() if done < now - 600]:
+                    del self._chats[chat_id]
+                for key in [k for k, c in self.conversations.items() if c["used_at"] < now - 600]:
+                    del self.conversations[key]
+
+            if conversation_id is None:
+                conversation_id = uuid.uuid4().hex
+                self.conversations[conversation_id] = {"user_id": data.get("user_id"), "turns": 0, "chat_id": None}
+            conversation = self.conversations.get(conversation_id)
+            if conversation is None:
+                return {"code": 4101, "msg": "conversation not found"}
+            running = self._chats.get(conversation["chat_id"])
+            if running is not None and running[2] > now:
+                return {"code": 4016, "msg": "conversation has a chat in progress"}
+
+            conversation["turns"] += 1
+            chat = {
+                "id": uuid.uuid4().hex,
+                "conversation_id": conversation_id,
+                "bot_id": data.get("bot_id"),
+                "created_at": int(time.time()),
+                "status": "in_progress",
+            }
+            conversation["chat_id"] = chat["id"]
+            conversation["used_at"] = now
+            self._chats[chat["id"]] = (chat, self._answer(question, conversation["turns"]), now + self.answer_ms / 1000)
+        return self._reply(chat)
+
+    def delete_conversation(self, conversation_id):
+        with self._lock:
+            if self.conversations.pop(conversation_id, None) is None:
+                return {"code": 4101, "msg": "conversation not found"}
+        return self._reply({})
+
+    def retrieve(self, params):
+        with self._lock:
+            if params.get("chat_id") not in self._chats:
+                return {"code": 4000, "msg": "chat not found"}
+            return self._reply(self._chat(params["chat_id"]))
+
+    def cancel(self, data):
+        with self._lock:
+            if data.get("chat_id") not in self._chats:
+                return {"code": 4000, "msg": "chat not found"}
+            chat, answer, _ = self._chats[data["chat_id"]]
+            chat = dict(chat, status="canceled")
+            # 已取消的对话不再完成，但也不再占用会话
+            self._chats[chat["id"]] = (chat, answer, float("inf"))
+            conversation = self.conversations.get(chat["conversation_id"])
+            if conversation is not None and conversation["chat_id"] == chat["id"]:
+                conversation["chat_id"] = None
+        return self._reply(chat)
+
+    @staticmethod
+    def _message(chat, message_type, content):
+        return {
+            "id": uuid.uuid4().hex, "conversation_id": chat["conversation_id"], "bot_id": chat["bot_id"],
+            "chat_id": chat["id"], "role": "assistant", "type": message_type,
+            "content": content, "content_type": "text",
+        }
+
+    @staticmethod
+    def _answer(question, turn=1):
+        return f"（本地模拟回答，第 {turn} 轮）关于“{question}”，建议多和家人或校医沟通，每个人的发育节奏都不一样。"
+
+    def messages(self, params):
+        with self._lock:
+            if params.get("chat_id") not in self._chats:
+                return {"code": 4000, "msg": "chat not found"}
+            chat, answer, _ = self._chats[params["chat_id"]]
+        return self._reply(
+            [self._message(chat, "answer", answer)]
+            + [self._message(chat, "follow_up", q) for q in self.FOLLOW_UPS]
+        )
+
+    def stream(self, data, params=None):
+        """
+        流式对话：产出 (事件名, 数据) 并在事件之间等待，模拟逐段生成；
+        第一段回答在 answer_ms 的三分之一时到达，其余分段均匀到达
+        """
+        reply = self.create(data, params)
+        if reply["code"]:
+            yield "conversation.chat.failed", {
+                "id": "", "conversation_id": (params or {}).get("conversation_id") or "", "bot_id": data.get("bot_id"),
+                "status": "failed", "last_error": {"code": reply["code"], "msg": reply["msg"]},
+            }
+            yield "done", "[DONE]"
+            return
+        chat = reply["data"]
+        answer = self._chats[chat["id"]][1]
+        chunks = [answer[i:i + 4] for i in range(0, len(answer), 4)]
+        first_delay = self.answer_ms / 3000
+        chunk_delay = (self.answer_ms / 1000 - first_delay) / max(len(chunks), 1)
+
+        yield "conversation.chat.created", chat
+        yield "conversation.chat.in_progress", chat
+        time.sleep(first_delay)
+        for chunk in chunks:
+            yield "conversation.message.delta", self._message(chat, "answer", chunk)
+            time.sleep(chunk_delay)
+        yield "conversation.message.completed", self._message(chat, "answer", answer)
+        for follow_up in self.FOLLOW_UPS:
+            yield "conversation.message.completed", self._message(chat, "follow_up", follow_up)
+        yield "conversation.chat.completed", dict(chat, status="completed", completed_at=int(time.time()))
+        yield "done", "[DONE]"
+
+
+def _parse_multipart(content_type, body):
+    """解析 multipart/form-data，返回 {字段名: (文件名, 内容 bytes)}"""
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + body
+    )
+    parts = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        if name:
+            parts[name] = (part.get_filename(), part.get_payload(decode=True) or b"")
+    return parts
+
+
+class Handler(BaseHTTPRequestHandler):
+    backend = None
+    coze = None
+    latency_ms = 0.0
+    jitter_ms = 0.0
+    error_rate = 0.0
+    pad_bytes = 0
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _inject(self):
+        """注入延迟和错误，返回 True 表示本次请求按错误处理"""
+        delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        if self.error_rate and random.random() < self.error_rate:
+            self._send_json(503, {"success": False, "message": "注入的错误"})
+            return True
+        return False
+
+    def _send(self, status, body, content_type, headers=None):
+        if len(body) >= GZIP_MIN_BYTES and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=5)
+            headers = dict(headers or {}, **{"Content-Encoding": "gzip"})
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, data, headers=None):
+        if self.pad_bytes and isinstance(data, dict):
+            data = dict(data, _padding="x" * self.pad_bytes)
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self._send(status, body, "application/json; charset=utf-8", headers)
+
+    def _send_events(self, events):
+        """以 text/event-stream 逐个发送事件，发送完关闭连接"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            for event, data in events:
+                if not isinstance(data, str):
+                    data = json.dumps(data, ensure_ascii=False)
+                self.wfile.write(f"event:{event}\ndata:{data}\n\n".encode("utf-8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端中途断开（例如取消了对话）
+            pass
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def do_GET(self):
+        if self._inject():
+            return
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        if url.path == "/api/post_items":
+            etag = f'"v{self.backend.version}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            try:
+                data = self.backend.list_items(params)
+            except ValueError as e:
+                self._send_json(400, {"success": False, "message": str(e)})
+                return
+            self._send_json(200, data, {"ETag": etag})
+            return
+
+        if url.path == "/v3/chat/message/list":
+            self._send_json(200, self.coze.messages(params))
+            return
+
+        match = re.fullmatch(r"/api/post_items/([^/]+)/replies", url.path)
+        if match:
+            self._send_json(200, self.backend.list_replies(unquote(match.group(1))))
+            return
+
+        match = re.fullmatch(r"/api/avatar/([\w.-]+)", url.path)
+        if match:
+            path = os.path.join(self.backend.avatar_dir, match.group(1))
+            if os.path.isfile(path):
+                with open(path, "rb") as f:
+                    content = f.read()
+                content_type = "image/png" if path.endswith(".png") else "image/jpeg"
+                self._send(200, content, content_type, {"Cache-Control": "public, max-age=86400"})
+                return
+
+        self._send_json(404, {"success": False, "message": "接口不存在"})
+
+    def do_POST(self):
+        body = self._read_body()
+        if self._inject():
+            return
+        url = urlparse(self.path)
+        path = url.path
+
+        try:
+            if path == "/v3/chat":
+                request = json.loads(body or b"{}")
+                params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                if request.get("stream"):
+                    self._send_events(self.coze.stream(request, params))
+                    return
+                status, data = 200, self.coze.create(request, params)
+            elif path == "/v3/chat/cancel":
+                status, data = 200, self.coze.cancel(json.loads(body or b"{}"))
+            elif path == "/v3/chat/retrieve":
+                status, data = 200, self.coze.retrieve({k: v[-1] for k, v in parse_qs(url.query).items()})
+            elif path == "/api/post_items":
+                status, data = self.backend.add_item(json.loads(body or b"{}"))
+            elif path == "/api/login":
+                status, data = self.backend.login(json.loads(body or b"{}"))
+            elif path == "/api/users":
+                parts = _parse_multipart(self.headers.get("Content-Type", ""), body)
+                if "data" not in parts:
+                    status, data = 400, {"success": False, "message": "缺少 data 字段"}
+                else:
+                    status, data = self.backend.create_user(
+                        json.loads(parts["data"][1].decode("utf-8")), parts.get("avatar")
+                    )
+            else:
+                status, data = 404, {"success": False, "message": "接口不存在"}
+        except (ValueError, UnicodeDecodeError) as e:
+            status, data = 400, {"success": False, "message": f"请求格式错误：{e}"}
+
+        self._send_json(status, data)
+
+    def do_DELETE(self):
+        if self._inject():
+            return
+        path = urlparse(self.path).path
+        match = re.fullmatch(r"/v1/conversations/([^/]+)", path)
+        if match:
+            self._send_json(200, self.coze.delete_conversation(unquote(match.group(1))))
+            return
+        match = re.fullmatch(r"/api/post_items/([^/]+)", path)
+        if match:
+            self._send_json(*self.backend.delete_item(unquote(match.group(1))))
+            return
+        self._send_json(404, {"success": False, "message": "接口不存在"})
+
+
+def make_server(backend, host="127.0.0.1", port=8800, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, pad_bytes=0,
+                coze=None):
+    """创建（但不启动）服务；每个服务有自己的处理类，便于在同一进程里开多个不同配置的服务"""
+    handler = type("LocalBackendHandler", (Handler,), {
+        "backend": backend,
+        "coze": coze or FakeCoze(),
+        "latency_ms": latency_ms,
+        "jitter_ms": jitter_ms,
+        "error_rate": error_rate,
+        "pad_bytes": pad_bytes,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DataBaseHOST 接口的本地替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--db", default=":memory:", help="SQLite 文件路径（默认内存）")
+    parser.add_argument("--seed-posts", type=int, default=0, help="生成的帖子数（例如 10000 到 1000000）")
+    parser.add_argument("--replies-per-post", type=int, default=3, help="每个帖子的平均回复数")
+    parser.add_argument("--seed", type=int, default=0, help="数据集随机种子")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="每个请求的平均延迟（毫秒）")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="延迟的随机抖动（毫秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 503 的比例（0~1）")
+    parser.add_argument("--pad-bytes", type=int, default=0, help="每个 JSON 响应额外填充的字节数")
+    parser.add_argument("--coze-answer-ms", type=float, default=1500.0, help="Coze 替身完成一次回答所需的时间（毫秒）")
+    args = parser.parse_args()
+
+    backend = LocalBackend(args.db)
+    if args.seed_posts:
+        started = time.monotonic()
+        backend.seed(args.seed_posts, args.replies_per_post, seed=args.seed)
+        print(f"Seeded {backend.counts()} in {time.monotonic() - started:.1f}s", flush=True)
+
+    server = make_server(
+        backend, args.host, args.port,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate, pad_bytes=args.pad_bytes,
+        coze=FakeCoze(args.coze_answer_ms),
+    )
+    print(f"Local backend listening on http://{args.host}:{args.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
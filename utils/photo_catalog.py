@@ -0,0 +1,122 @@
+"""
+进程级图片目录清单（photos/ 等）：
+- 每个目录只完整扫描一次，得到按文件名排序的清单（尺寸、大小、mtime、内容哈希）
+- 之后每隔 TTL 秒用 mtime/大小 检查一次变化，只对新增或修改过的文件重新读取尺寸和计算哈希
+- 所有会话共享同一份清单，轮播和之后的图库都从这里读取，不再每次 rerun 都 os.listdir
+"""
+import hashlib
+import os
+import threading
+import time
+
+from PIL import Image
+
+from utils.config import get_float_setting
+
+IMAGE_EXTENSIONS = ('jpg', 'jpeg', 'png', 'gif')
+
+# 变化检查间隔（秒），可通过 PHOTO_CATALOG_TTL 配置
+DEFAULT_TTL = 10.0
+
+
+def _file_sha256(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class PhotoCatalog:
+    def __init__(self, folder, ttl=None):
+        self.folder = folder
+        if ttl is None:
+            ttl = get_float_setting("PHOTO_CATALOG_TTL", DEFAULT_TTL)
+        self.ttl = ttl
+
+        # 文件名 -> 清单条目
+        self._entries = {}
+        self._manifest = []
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _describe(self, entry, stat):
+        """读取单个文件的尺寸和内容哈希，生成清单条目"""
+        try:
+            with Image.open(entry.path) as img:
+                width, height = img.size
+        except Exception as e:
+            print(f"Error reading image size for {entry.path}: {e}")
+            width, height = None, None
+
+        return {
+            "name": entry.name,
+            "path": os.path.join(self.folder, entry.name),
+            "width": width,
+            "height": height,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": _file_sha256(entry.path),
+        }
+
+    def refresh(self, force=False):
+        """检查目录变化并增量更新清单，返回是否有变化"""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._checked_at and now - self._checked_at < self.ttl:
+                return False
+            self._checked_at = now
+
+            if not os.path.isdir(self.folder):
+                changed = bool(self._entries)
+                self._entries = {}
+                self._manifest = []
+                return changed
+
+            changed = False
+            seen = set()
+            for entry in os.scandir(self.folder):
+                if not entry.is_file() or not entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                seen.add(entry.name)
+                stat = entry.stat()
+                old = self._entries.get(entry.name)
+                if old and old["mtime_ns"] == stat.st_mtime_ns and old["size"] == stat.st_size:
+                    continue
+                try:
+                    self._entries[entry.name] = self._describe(entry, stat)
+                    changed = True
+                except OSError as e:
+                    print(f"Error cataloging {entry.path}: {e}")
+
+            for name in list(self._entries):
+                if name not in seen:
+                    del self._entries[name]
+                    changed = True
+
+            if changed or not self._manifest:
+                self._manifest = [self._entries[name] for name in sorted(self._entries)]
+            return changed
+
+    def entries(self):
+        """返回按文件名排序的清单（条目为 dict，调用方不要修改）"""
+        self.refresh()
+        return self._manifest
+
+    def paths(self):
+        return [entry["path"] for entry in self.entries()]
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_photo_catalog(folder='photos'):
+    """获取目录对应的进程级共享清单"""
+    key = os.path.abspath(folder)
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None:
+            catalog = PhotoCatalog(folder)
+            _catalogs[key] = catalog
+        return catalog
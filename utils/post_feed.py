@@ -0,0 +1,357 @@
+"""
+心语墙（/api/post_items）数据层：
+- 按 (created_at, item_id) 游标分页读取帖子，每次只取正在浏览的一页
+- 把远程返回的数据统一转换成页面使用的 post/reply 结构
+- 进程级共享的短 TTL 缓存：所有会话共用同一份结果，本进程发帖/回复成功后立即失效
+- POST_REPLIES_MODE = "lazy" 时帖子只带回复数和最新一条回复，展开时再按帖子读取并缓存完整回复
+- POST_FEED_MODE 选择读取方式："page"（默认，远程分页 + 缓存）、"sync"（增量同步的内存镜像，见 utils.post_sync）
+  或 "replica"（增量同步的本地 SQLite 副本，见 utils.post_replica）
+接口约定见 docs/backend_api.md
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from urllib.parse import quote
+
+from utils.api_client import api_get, get_base_host
+from utils.config import get_float_setting, get_setting
+
+# 每页帖子数，可通过 POST_PAGE_SIZE 配置
+DEFAULT_PAGE_SIZE = 20
+
+# 帖子缓存有效期（秒），可通过 POST_FEED_CACHE_TTL 配置，0 表示不缓存
+DEFAULT_CACHE_TTL = 5.0
+
+# 懒加载模式下最多缓存多少个帖子的回复列表
+MAX_CACHED_REPLY_LISTS = 500
+
+
+def encode_cursor(created_at, item_id):
+    """游标 = 本页最后一条的 created_at 和 item_id"""
+    return f"{created_at or ''}|{item_id or ''}"
+
+
+def decode_cursor(cursor):
+    created_at, _, item_id = (cursor or "").partition("|")
+    return created_at, item_id
+
+
+def _sort_key(item):
+    # 与后端约定的排序：created_at 倒序，相同时按 item_id 倒序
+    return (item.get("created_at") or "", item.get("item_id") or "")
+
+
+def normalize_reply(r):
+    return {
+        "id": r.get("item_id"),
+        "author": r.get("author_username"),
+        "time": r.get("created_at"),
+        "content": r.get("content", "")
+    }
+
+
+def normalize_post(item):
+    """
+    转换帖子结构：
+    - 带完整回复时 replies 为回复列表
+    - 懒加载预览（只有 reply_count/latest_reply）时 replies 为 None，需要时用 get_post_replies 读取
+    """
+    post = {
+        "id": item.get("item_id"),
+        "author": item.get("author_username"),
+        "time": item.get("created_at"),
+        "content": item.get("content", ""),
+    }
+    if "replies" in item or "reply_count" not in item:
+        post["replies"] = [normalize_reply(r) for r in item.get("replies") or []]
+        post["reply_count"] = len(post["replies"])
+        post["latest_reply"] = post["replies"][-1] if post["replies"] else None
+    else:
+        latest = item.get("latest_reply")
+        post["replies"] = None
+        post["reply_count"] = item.get("reply_count") or 0
+        post["latest_reply"] = normalize_reply(latest) if latest else None
+    return post
+
+
+def get_replies_mode():
+    mode = str(get_setting("POST_REPLIES_MODE", "full")).lower()
+    return mode if mode in ("full", "lazy") else "full"
+
+
+def _slice_locally(items, cursor, limit):
+    """
+    兼容尚未支持分页参数的后端：返回了全部帖子时，在本地按游标截取一页
+    （仍会下载全部数据，只是页面只渲染当前这一页）
+    """
+    items = sorted(items, key=_sort_key, reverse=True)
+    if cursor:
+        boundary = decode_cursor(cursor)
+        items = [item for item in items if _sort_key(item) < boundary]
+    page = items[:limit]
+    has_more = len(items) > limit
+    return page, has_more
+
+
+def fetch_post_page(cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    读取一页帖子：
+    - cursor 为 None 表示第一页，否则为上一页返回的 next_cursor
+    - 返回 (True, {"posts": [...], "next_cursor": str 或 None}) 或 (False, 错误信息)
+    - 经过缓存读取时，降级结果还带有 "stale": True 和 "error": 错误信息
+    """
+    if not get_base_host():
+        return False, "服务器配置错误：未找到 DataBaseHOST，无法加载帖子"
+
+    params = {"limit": limit}
+    if get_replies_mode() == "lazy":
+        # 只要回复数和最新一条回复，完整回复在展开时再读取
+        params["replies"] = "preview"
+    if cursor:
+        before_created_at, before_item_id = decode_cursor(cursor)
+        params["before_created_at"] = before_created_at
+        params["before_item_id"] = before_item_id
+
+    try:
+        resp = api_get("/api/post_items", "post_items_read", params=params)
+        data = resp.json()
+    except Exception as e:
+        return False, f"获取帖子失败：远程服务异常（{e}）"
+
+    if not isinstance(data, dict) or not data.get("success"):
+        msg = data.get("message", "未知错误") if isinstance(data, dict) else "服务返回格式错误"
+        return False, f"获取帖子失败：{msg}"
+
+    items = data.get("data") or []
+
+    if "next_cursor" in data:
+        # 后端已支持分页
+        page = sorted(items, key=_sort_key, reverse=True)
+        raw_cursor = data.get("next_cursor")
+        next_cursor = None
+        if isinstance(raw_cursor, dict):
+            next_cursor = encode_cursor(raw_cursor.get("created_at"), raw_cursor.get("item_id"))
+    else:
+        page, has_more = _slice_locally(items, cursor, limit)
+        next_cursor = None
+        if has_more and page:
+            next_cursor = encode_cursor(page[-1].get("created_at"), page[-1].get("item_id"))
+
+    return True, {
+        "posts": [normalize_post(item) for item in page],
+        "next_cursor": next_cursor,
+    }
+
+
+def fetch_post_replies(post_id):
+    """读取单个帖子的全部回复，返回 (True, [reply, ...]) 或 (False, 错误信息)"""
+    if not get_base_host():
+        return False, "服务器配置错误：未找到 DataBaseHOST，无法加载回复"
+
+    try:
+        resp = api_get(f"/api/post_items/{quote(str(post_id), safe='')}/replies", "post_items_read")
+        data = resp.json()
+    except Exception as e:
+        return False, f"获取回复失败：远程服务异常（{e}）"
+
+    if not isinstance(data, dict) or not data.get("success"):
+        msg = data.get("message", "未知错误") if isinstance(data, dict) else "服务返回格式错误"
+        return False, f"获取回复失败：{msg}"
+
+    replies = sorted(data.get("data") or [], key=lambda r: r.get("created_at") or "")
+    return True, [normalize_reply(r) for r in replies]
+
+
+class ReplyCache:
+    """
+    进程级回复列表缓存（懒加载模式）：
+    - 只有用户展开某个帖子的回复时才读取并缓存该帖子的回复
+    - 超过 TTL 后重新读取，读取失败时继续使用旧数据
+    - 最多保留 MAX_CACHED_REPLY_LISTS 个帖子，按最近使用淘汰
+    """
+
+    def __init__(self, ttl, max_entries=MAX_CACHED_REPLY_LISTS):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, post_id):
+        with self._lock:
+            entry = self._entries.get(post_id)
+            if entry:
+                self._entries.move_to_end(post_id)
+                if entry[0] > time.monotonic():
+                    return True, entry[1]
+
+        ok, result = fetch_post_replies(post_id)
+        if not ok:
+            return (True, entry[1]) if entry else (False, result)
+
+        with self._lock:
+            self._entries[post_id] = (time.monotonic() + self.ttl, result)
+            self._entries.move_to_end(post_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return True, result
+
+    def invalidate(self, post_id):
+        with self._lock:
+            self._entries.pop(post_id, None)
+
+
+class FeedCache:
+    """
+    进程级帖子缓存：
+    - 以 (cursor, limit) 为键缓存 fetch_post_page 的成功结果，TTL 到期后重新获取
+    - 多个会话同时未命中同一页时只请求一次后端，其余会话等待同一结果
+    - invalidate() 清空全部缓存，在本进程写入成功后调用
+    - 获取失败时返回该页最近一次成功的结果（带 stale=True），供页面降级显示
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.stale_served = 0
+        self._entries = {}
+        # 每页最近一次成功的结果，不随失效清除，后端不可用时用于降级显示
+        self._last_good = {}
+        self._inflight = {}
+        # 每次失效加一，防止失效前发出的请求把旧数据写回缓存
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_page(self, cursor=None, limit=DEFAULT_PAGE_SIZE):
+        key = (cursor, limit)
+        with self._lock:
+            entry = self._entries.get(key)
+            if self.ttl > 0 and entry and entry[0] > time.monotonic():
+                self.hits += 1
+                return True, entry[1]
+
+            self.misses += 1
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+            generation = self._generation
+
+        if owner:
+            try:
+                result = fetch_post_page(cursor, limit)
+                future.set_result(result)
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+        else:
+            result = future.result()
+
+        ok, data = result
+        if ok:
+            with self._lock:
+                self._last_good[key] = data
+                if self.ttl > 0 and generation == self._generation:
+                    self._entries[key] = (time.monotonic() + self.ttl, data)
+            return result
+
+        # 后端不可用（熔断、超时、报错）时退回到最近一次成功的结果，页面降级显示而不是报错
+        with self._lock:
+            last_good = self._last_good.get(key)
+            if last_good is None:
+                return result
+            self.stale_served += 1
+        return True, dict(last_good, stale=True, error=data)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "invalidations": self.invalidations,
+                "stale_served": self.stale_served,
+                "entries": len(self._entries),
+            }
+
+
+_feed_cache = None
+_reply_cache = None
+_feed_cache_lock = threading.Lock()
+
+
+def get_feed_cache():
+    """获取进程级共享的帖子缓存"""
+    global _feed_cache
+    if _feed_cache is None:
+        with _feed_cache_lock:
+            if _feed_cache is None:
+                _feed_cache = FeedCache(get_float_setting("POST_FEED_CACHE_TTL", DEFAULT_CACHE_TTL))
+    return _feed_cache
+
+
+def get_reply_cache():
+    """获取进程级共享的回复列表缓存"""
+    global _reply_cache
+    if _reply_cache is None:
+        with _feed_cache_lock:
+            if _reply_cache is None:
+                _reply_cache = ReplyCache(get_float_setting("POST_FEED_CACHE_TTL", DEFAULT_CACHE_TTL))
+    return _reply_cache
+
+
+def get_post_replies(post_id):
+    """读取（并缓存）单个帖子的全部回复，返回 (True, [reply, ...]) 或 (False, 错误信息)"""
+    if get_feed_mode() == "replica":
+        from utils.post_replica import get_post_replica
+        return get_post_replica().replies(post_id)
+    return get_reply_cache().get(post_id)
+
+
+def get_feed_mode():
+    mode = str(get_setting("POST_FEED_MODE", "page")).lower()
+    return mode if mode in ("page", "sync", "replica") else "page"
+
+
+def get_post_page(cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """按 POST_FEED_MODE 读取一页帖子，返回值同 fetch_post_page"""
+    mode = get_feed_mode()
+    if mode == "sync":
+        from utils.post_sync import get_feed_mirror
+        return get_feed_mirror().page(cursor, limit)
+    if mode == "replica":
+        from utils.post_replica import get_post_replica
+        return get_post_replica().page(cursor, limit)
+    return get_feed_cache().get_page(cursor, limit)
+
+
+def invalidate_feed_cache(post_id=None, item=None):
+    """
+    本进程发帖/回复成功后调用，让作者立即看到自己的内容；回复时传入所属帖子 id，
+    item 为刚写入的帖子/回复（POST /api/post_items 的请求体），副本模式下直接写入本地副本
+    """
+    get_feed_cache().invalidate()
+    if post_id is not None:
+        get_reply_cache().invalidate(post_id)
+    from utils.post_search import mark_search_stale
+    mark_search_stale()
+    mode = get_feed_mode()
+    if mode == "sync":
+        from utils.post_sync import get_feed_mirror
+        get_feed_mirror().mark_stale()
+    elif mode == "replica":
+        from utils.post_replica import get_post_replica
+        get_post_replica().mark_stale(item)
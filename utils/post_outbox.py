@@ -0,0 +1,272 @@
+"""
+发帖/回复的本地发件箱（POST_WRITE_MODE = "outbox" 时使用）：
+- 提交时只把内容写入本地 SQLite（事务提交即落盘），页面立即返回并先显示这条内容
+- 后台线程逐条发送到 /api/post_items：同一作者在同一个帖子下的内容（帖子本身和它的回复）按提交顺序发送，
+  保证帖子先于它的回复送达；不同作者、不同帖子之间互不等待
+- 网络异常、5xx、熔断时按指数退避重试，连续 POST_OUTBOX_MAX_ATTEMPTS 次（默认 10 次）仍未成功时标记为 rejected
+- 以 item_id 保证幂等：重复提交被忽略；后端对已存在的 item_id 返回成功或 409 时都算发送成功
+- 后端明确拒绝（其他 4xx 或 success=false）的内容标记为 rejected，留给作者查看或丢弃，不会丢失
+- 进程重启后继续发送上次没发完的内容
+接口约定见 docs/backend_api.md
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from utils.api_client import api_post, get_base_host
+from utils.config import get_int_setting, get_setting
+from utils.post_feed import invalidate_feed_cache
+
+DEFAULT_OUTBOX_PATH = os.path.join("data", "outbox.sqlite3")
+
+# 重试退避（秒）
+RETRY_BACKOFF_BASE = 2.0
+RETRY_BACKOFF_MAX = 300.0
+
+# 暂时性错误的最多尝试次数（按上面的退避约 20 分钟），可通过 POST_OUTBOX_MAX_ATTEMPTS 配置
+DEFAULT_MAX_ATTEMPTS = 10
+
+# 待发送且可以发送的内容：同一作者、同一帖子下没有更早的待发送内容（帖子的回复以 parent_post_id 归到该帖子）
+NEXT_DUE_SQL = """
+SELECT * FROM outbox AS o
+WHERE status = 'pending' AND NOT EXISTS (
+    SELECT 1 FROM outbox AS e
+    WHERE e.status = 'pending'
+      AND e.author_username IS o.author_username
+      AND COALESCE(e.parent_post_id, e.item_id) = COALESCE(o.parent_post_id, o.item_id)
+      AND e.queued_at < o.queued_at
+)
+ORDER BY next_attempt_at, queued_at
+LIMIT 1
+"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    item_id TEXT PRIMARY KEY,
+    item_type TEXT NOT NULL,
+    parent_post_id TEXT,
+    author_username TEXT,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    queued_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_status ON outbox (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS idx_outbox_author ON outbox (author_username);
+"""
+
+
+def deliver_item(payload):
+    """
+    发送一条帖子/回复（幂等，可以用同一 item_id 重发），返回 (结果, 错误信息)：
+    - "delivered"：写入成功，或该 item_id 已经存在
+    - "retry"：网络异常、5xx、熔断等暂时性错误，稍后重试
+    - "rejected"：后端明确拒绝（409 以外的 4xx，或 success=false），重试也不会成功
+    """
+    if not get_base_host():
+        return "retry", "未找到 DataBaseHOST"
+    try:
+        resp = api_post("/api/post_items", "post_items_write", json=payload)
+    except Exception as e:
+        return "retry", f"远程服务异常（{e}）"
+
+    if resp.status_code == 409:
+        # 同一 item_id 已经写入过（例如上次发送成功但没收到响应）
+        return "delivered", None
+    if resp.status_code >= 500:
+        return "retry", f"HTTP {resp.status_code}"
+
+    try:
+        data = resp.json()
+    except Exception:
+        data = None
+
+    if resp.status_code >= 400:
+        # 其他 4xx 一律是明确拒绝（响应体可能是代理或旧后端返回的 HTML），重试也不会成功
+        msg = data.get("message") if isinstance(data, dict) else None
+        return "rejected", msg or f"HTTP {resp.status_code}"
+    if data is None:
+        # 2xx 但不是 JSON：不确定是否写入成功，用同一 item_id 重发是安全的
+        return "retry", f"远程服务返回异常：HTTP {resp.status_code}"
+    if isinstance(data, dict) and data.get("success"):
+        return "delivered", None
+    msg = data.get("message", "未知错误") if isinstance(data, dict) else "服务返回格式错误"
+    return "rejected", msg
+
+
+class PostOutbox:
+    def __init__(self, path, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.delivered = 0
+        self.retried = 0
+        self.rejected = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # 每次提交都同步到磁盘，进程或机器崩溃也不丢内容
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+        self._wakeup = threading.Event()
+        self._worker = None
+
+    def enqueue(self, payload):
+        """保存一条待发送的帖子/回复（payload 与 POST /api/post_items 的请求体相同），同一 item_id 只保存一次"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO outbox "
+                "(item_id, item_type, parent_post_id, author_username, payload, queued_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    payload["item_id"],
+                    payload.get("item_type", "post"),
+                    payload.get("parent_post_id"),
+                    payload.get("author_username"),
+                    json.dumps(payload, ensure_ascii=False),
+                    time.time(),
+                ),
+            )
+        self.start()
+        self._wakeup.set()
+
+    def items_for(self, author_username):
+        """作者尚未发送成功的内容（pending / rejected），按提交顺序返回"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM outbox WHERE author_username = ? ORDER BY queued_at",
+                (author_username,),
+            ).fetchall()
+        return [self._row_to_item(row) for row in rows]
+
+    def discard(self, item_id):
+        """作者放弃一条被拒绝的内容"""
+        with self._lock:
+            self._conn.execute("DELETE FROM outbox WHERE item_id = ? AND status = 'rejected'", (item_id,))
+
+    def stats(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+        counts = {status: count for status, count in rows}
+        return {
+            "pending": counts.get("pending", 0),
+            "rejected_waiting": counts.get("rejected", 0),
+            "delivered": self.delivered,
+            "retried": self.retried,
+            "rejected": self.rejected,
+        }
+
+    @staticmethod
+    def _row_to_item(row):
+        item = json.loads(row["payload"])
+        item["status"] = row["status"]
+        item["attempts"] = row["attempts"]
+        item["last_error"] = row["last_error"]
+        return item
+
+    def _next_due(self):
+        with self._lock:
+            return self._conn.execute(NEXT_DUE_SQL).fetchone()
+
+    def deliver_once(self):
+        """
+        发送最早到期的一条待发送内容，返回下次需要等待的秒数（没有待发送内容时返回 None）
+        同一作者在同一个帖子下按提交顺序发送，一条内容重试时只挡住它后面的同组内容
+        """
+        row = self._next_due()
+        if row is None:
+            return None
+        wait = row["next_attempt_at"] - time.time()
+        if wait > 0:
+            return wait
+
+        payload = json.loads(row["payload"])
+        outcome, error = deliver_item(payload)
+
+        with self._lock:
+            if outcome == "delivered":
+                self._conn.execute("DELETE FROM outbox WHERE item_id = ?", (row["item_id"],))
+                self.delivered += 1
+            elif outcome == "rejected":
+                self._conn.execute(
+                    "UPDATE outbox SET status = 'rejected', attempts = attempts + 1, last_error = ? WHERE item_id = ?",
+                    (error, row["item_id"]),
+                )
+                self.rejected += 1
+            elif row["attempts"] + 1 >= self.max_attempts:
+                # 一直失败的内容不再重试，交给作者查看或丢弃
+                outcome = "rejected"
+                error = f"重试 {row['attempts'] + 1} 次仍未发送成功：{error}"
+                self._conn.execute(
+                    "UPDATE outbox SET status = 'rejected', attempts = attempts + 1, last_error = ? WHERE item_id = ?",
+                    (error, row["item_id"]),
+                )
+                self.rejected += 1
+            else:
+                attempts = row["attempts"] + 1
+                delay = min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * (2 ** (attempts - 1)))
+                self._conn.execute(
+                    "UPDATE outbox SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE item_id = ?",
+                    (attempts, time.time() + delay, error, row["item_id"]),
+                )
+                self.retried += 1
+
+        if outcome == "delivered":
+            invalidate_feed_cache(payload.get("parent_post_id"), item=payload)
+        elif outcome == "rejected":
+            print(f"Outbox item {row['item_id']} rejected: {error}")
+        return 0
+
+    def _run(self):
+        while True:
+            try:
+                wait = self.deliver_once()
+            except Exception as e:
+                print(f"Outbox worker error: {e}")
+                wait = RETRY_BACKOFF_BASE
+            if wait == 0:
+                continue
+            self._wakeup.wait(wait)
+            self._wakeup.clear()
+
+    def start(self):
+        """启动后台发送线程（每个进程一个）"""
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="post-outbox", daemon=True)
+                self._worker.start()
+
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+
+def get_write_mode():
+    mode = str(get_setting("POST_WRITE_MODE", "direct")).lower()
+    return mode if mode in ("direct", "outbox") else "direct"
+
+
+def get_outbox():
+    """获取进程级共享的发件箱，首次获取时启动后台发送线程（继续发送上次遗留的内容）"""
+    global _outbox
+    if _outbox is None:
+        with _outbox_lock:
+            if _outbox is None:
+                outbox = PostOutbox(
+                    get_setting("POST_OUTBOX_PATH", DEFAULT_OUTBOX_PATH),
+                    max(1, get_int_setting("POST_OUTBOX_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS)),
+                )
+                outbox.start()
+                _outbox = outbox
+    return _outbox
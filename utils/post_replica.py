@@ -0,0 +1,324 @@
+"""
+心语墙本地只读副本（POST_FEED_MODE = "replica" 时使用）：
+- 帖子和回复保存在本地 SQLite（WAL 模式，按 (created_at, item_id) 和 parent_post_id 建索引）
+- 后台线程按增量同步约定（ETag + since，见 utils.post_sync.fetch_changes）定期从 /api/post_items 更新副本
+- 页面的分页和回复读取都是本地查询，不经过网络；后端不可用时继续提供副本中已有的数据
+- 没有配置 DataBaseHOST 时只读运行：可以用 POST_REPLICA_FIXTURE 或命令行导入本地数据
+接口约定见 docs/backend_api.md
+
+命令行：
+    python -m utils.post_replica --load fixture.json   # 导入本地数据（格式同 GET /api/post_items 的响应）
+    python -m utils.post_replica --sync                # 立即同步一次
+    python -m utils.post_replica --stats
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from utils.api_client import get_base_host
+from utils.config import get_float_setting, get_setting
+from utils.post_feed import (
+    DEFAULT_PAGE_SIZE,
+    decode_cursor,
+    encode_cursor,
+    get_replies_mode,
+    normalize_post,
+    normalize_reply,
+)
+from utils.post_sync import DEFAULT_SYNC_INTERVAL, fetch_changes, flatten_items
+
+DEFAULT_REPLICA_PATH = os.path.join("data", "post_replica.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS post_items (
+    item_id TEXT PRIMARY KEY,
+    item_type TEXT NOT NULL,
+    parent_post_id TEXT,
+    author_username TEXT,
+    content TEXT,
+    created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_post_items_created ON post_items (item_type, created_at, item_id);
+CREATE INDEX IF NOT EXISTS idx_post_items_parent ON post_items (parent_post_id, created_at);
+CREATE TABLE IF NOT EXISTS replica_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+COLUMNS = ("item_id", "item_type", "parent_post_id", "author_username", "content", "created_at")
+
+
+class PostReplica:
+    def __init__(self, path, sync_interval):
+        self.path = path
+        self.sync_interval = sync_interval
+
+        self.full_syncs = 0
+        self.delta_syncs = 0
+        self.not_modified = 0
+        self.last_error = None
+        self._synced_at = 0.0
+        # 副本内容每变化一次加一，搜索索引据此判断是否需要更新
+        self.version = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # 读连接每个线程一个（WAL 模式下读不阻塞写），写入只在持有 _write_lock 时进行
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        # 同一时间只进行一次同步（后台线程和写入后的立即同步）
+        self._sync_lock = threading.Lock()
+        # 写入后唤醒后台线程立即同步
+        self._wakeup = threading.Event()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+
+        self._worker = None
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _get_meta(self, key):
+        row = self._conn().execute("SELECT value FROM replica_meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def is_empty(self):
+        return self._conn().execute("SELECT 1 FROM post_items LIMIT 1").fetchone() is None
+
+    def apply(self, data, full):
+        """把一次同步（或导入）的数据写入副本，整个过程在一个事务中完成"""
+        rows = [tuple(item.get(column) for column in COLUMNS) for item in flatten_items(data.get("data") or [])]
+        deleted = [(item_id,) for item_id in data.get("deleted") or []]
+
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if full:
+                    conn.execute("DELETE FROM post_items")
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO post_items ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                    rows,
+                )
+                if deleted:
+                    conn.executemany("DELETE FROM post_items WHERE item_id = ?", deleted)
+                    conn.executemany("DELETE FROM post_items WHERE parent_post_id = ?", deleted)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self.version += 1
+
+    def _set_sync_state(self, etag, watermark):
+        with self._write_lock:
+            self._conn().executemany(
+                "INSERT OR REPLACE INTO replica_meta (key, value) VALUES (?, ?)",
+                [("etag", etag), ("watermark", watermark)],
+            )
+
+    def sync(self):
+        """与后端同步一次，返回 (True, 是否有变化) 或 (False, 错误信息)"""
+        if not get_base_host():
+            return False, "未配置 DataBaseHOST，副本只读"
+
+        with self._sync_lock:
+            return self._sync()
+
+    def _sync(self):
+        watermark = self._get_meta("watermark")
+        ok, result = fetch_changes(self._get_meta("etag"), watermark)
+        if not ok:
+            self.last_error = result
+            return False, result
+
+        self.last_error = None
+        self._synced_at = time.monotonic()
+        if result is None:
+            self.not_modified += 1
+            return True, False
+
+        data, etag = result
+        supports_delta = "watermark" in data
+        full = not (supports_delta and watermark)
+        self.apply(data, full=full)
+        self._set_sync_state(etag, data.get("watermark") if supports_delta else None)
+        if full:
+            self.full_syncs += 1
+        else:
+            self.delta_syncs += 1
+        return True, True
+
+    def load_fixture(self, path):
+        """导入本地数据文件（格式同 GET /api/post_items 的响应），替换副本中的全部内容"""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            data = {"data": data}
+        self.apply(data, full=True)
+        # 导入的数据不是后端的快照，清掉同步状态，下次同步时重新拉取完整快照
+        self._set_sync_state(None, None)
+
+    def mark_stale(self, item=None):
+        """
+        本进程写入后调用：
+        - item 为刚写入成功的帖子/回复时先写入副本，作者紧接着的 rerun 就能看到（之后的同步会用后端的数据覆盖）
+        - 唤醒后台线程立即做一次增量同步，不在调用方（页面脚本线程、发件箱线程）里等待网络；
+          同步失败时后台线程按间隔重试
+        """
+        if item is not None:
+            self.apply({"data": [item]}, full=False)
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            # 先清除再同步：同步期间到达的唤醒不会丢失，同步完立即再来一次
+            self._wakeup.clear()
+            try:
+                self.sync()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Post replica sync error: {e}")
+            self._wakeup.wait(self.sync_interval)
+
+    def start(self):
+        """启动后台同步线程（每个进程一个；未配置 DataBaseHOST 时不启动）"""
+        if self._worker is not None or not get_base_host():
+            return
+        with self._write_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="post-replica-sync", daemon=True)
+                self._worker.start()
+
+    def _reply_rows(self, post_ids):
+        placeholders = ", ".join("?" * len(post_ids))
+        return self._conn().execute(
+            f"SELECT * FROM post_items WHERE item_type = 'reply' AND parent_post_id IN ({placeholders}) "
+            "ORDER BY created_at",
+            post_ids,
+        ).fetchall()
+
+    def page(self, cursor=None, limit=DEFAULT_PAGE_SIZE):
+        """从副本按游标读取一页，返回值同 utils.post_feed.fetch_post_page"""
+        if cursor:
+            before_created_at, before_item_id = decode_cursor(cursor)
+            rows = self._conn().execute(
+                "SELECT * FROM post_items WHERE item_type = 'post' AND (created_at, item_id) < (?, ?) "
+                "ORDER BY created_at DESC, item_id DESC LIMIT ?",
+                (before_created_at, before_item_id, limit + 1),
+            ).fetchall()
+        else:
+            rows = self._conn().execute(
+                "SELECT * FROM post_items WHERE item_type = 'post' "
+                "ORDER BY created_at DESC, item_id DESC LIMIT ?",
+                (limit + 1,),
+            ).fetchall()
+
+        page = [dict(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit and page:
+            next_cursor = encode_cursor(page[-1]["created_at"], page[-1]["item_id"])
+
+        replies_by_post = {}
+        if page:
+            for row in self._reply_rows([post["item_id"] for post in page]):
+                replies_by_post.setdefault(row["parent_post_id"], []).append(dict(row))
+
+        lazy = get_replies_mode() == "lazy"
+        for post in page:
+            replies = replies_by_post.get(post["item_id"], [])
+            if lazy:
+                post["reply_count"] = len(replies)
+                post["latest_reply"] = replies[-1] if replies else None
+            else:
+                post["replies"] = replies
+
+        data = {
+            "posts": [normalize_post(post) for post in page],
+            "next_cursor": next_cursor,
+        }
+        if self.last_error and get_base_host():
+            data["stale"] = True
+            data["error"] = self.last_error
+        return True, data
+
+    def items(self):
+        """副本中的全部帖子和回复（扁平记录，与增量同步的数据格式相同）"""
+        return [dict(row) for row in self._conn().execute("SELECT * FROM post_items").fetchall()]
+
+    def replies(self, post_id):
+        """读取单个帖子的全部回复，返回值同 utils.post_feed.fetch_post_replies"""
+        return True, [normalize_reply(dict(row)) for row in self._reply_rows([post_id])]
+
+    def stats(self):
+        counts = dict(self._conn().execute(
+            "SELECT item_type, COUNT(*) FROM post_items GROUP BY item_type"
+        ).fetchall())
+        return {
+            "posts": counts.get("post", 0),
+            "replies": counts.get("reply", 0),
+            "full_syncs": self.full_syncs,
+            "delta_syncs": self.delta_syncs,
+            "not_modified": self.not_modified,
+            "watermark": self._get_meta("watermark"),
+            "last_error": self.last_error,
+        }
+
+
+_replica = None
+_replica_lock = threading.Lock()
+
+
+def get_post_replica():
+    """
+    获取进程级共享的本地副本：
+    - 副本为空时先导入 POST_REPLICA_FIXTURE（如有），再同步一次，首次访问不会看到空白的墙
+    - 之后由后台线程每 POST_SYNC_INTERVAL 秒同步一次
+    """
+    global _replica
+    if _replica is None:
+        with _replica_lock:
+            if _replica is None:
+                interval = get_float_setting("POST_SYNC_INTERVAL", DEFAULT_SYNC_INTERVAL)
+                replica = PostReplica(get_setting("POST_REPLICA_PATH", DEFAULT_REPLICA_PATH), interval)
+
+                fixture = get_setting("POST_REPLICA_FIXTURE", "")
+                if fixture and replica.is_empty():
+                    replica.load_fixture(fixture)
+                if replica.is_empty():
+                    replica.sync()
+                replica.start()
+                _replica = replica
+    return _replica
+
+
+def main():
+    parser = argparse.ArgumentParser(description="心语墙本地只读副本")
+    parser.add_argument("--load", metavar="JSON", help="导入本地数据文件，替换副本内容")
+    parser.add_argument("--sync", action="store_true", help="立即与后端同步一次")
+    parser.add_argument("--stats", action="store_true", help="显示副本统计")
+    parser.add_argument("--path", default=None, help="副本数据库路径（默认 POST_REPLICA_PATH）")
+    args = parser.parse_args()
+
+    replica = PostReplica(args.path or get_setting("POST_REPLICA_PATH", DEFAULT_REPLICA_PATH), DEFAULT_SYNC_INTERVAL)
+    if args.load:
+        replica.load_fixture(args.load)
+        print(f"Loaded {args.load}")
+    if args.sync:
+        print(replica.sync())
+    if args.stats or not (args.load or args.sync):
+        print(json.dumps(replica.stats(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+心语墙全文搜索：
+- 帖子和回复的正文、作者名建立倒排索引（中文按字二元组切分，见 utils.text_index）
+- 数据来源跟随 POST_FEED_MODE：
+    * "sync" / "replica"：直接使用心语墙已有的本地镜像 / 副本，快照变化时才更新索引，不再单独请求后端
+    * 其他模式：按增量同步约定（ETag + since，见 utils.post_sync.fetch_changes）定期拉取变化
+- 只重新切分新增或修改的条目，删除的条目从索引中移除
+- 结果按 BM25 相关度排序，并按发布时间加权（越新越靠前）
+- 进程级共享，所有会话共用一份索引；搜索时最多每 POST_SEARCH_REFRESH 秒检查一次变化
+"""
+import datetime
+import threading
+import time
+
+from utils.api_client import get_base_host
+from utils.config import get_float_setting
+from utils.post_feed import get_feed_mode
+from utils.post_sync import fetch_changes, flatten_items
+from utils.text_index import TextIndex
+
+# 检查变化的最短间隔（秒），可通过 POST_SEARCH_REFRESH 配置
+DEFAULT_REFRESH_INTERVAL = 10.0
+
+# 作者名命中比正文命中更重要
+FIELD_WEIGHTS = {"content": 1.0, "author": 2.0}
+
+# 时间加权比例和半衰期：30 天前的内容时间分减半
+DEFAULT_RECENCY_WEIGHT = 0.3
+RECENCY_HALF_LIFE = 30 * 86400
+
+
+def _timestamp(created_at):
+    try:
+        return datetime.datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S").timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class PostSearch:
+    def __init__(self, refresh_interval, recency_weight=DEFAULT_RECENCY_WEIGHT):
+        self.refresh_interval = refresh_interval
+        self.index = TextIndex(FIELD_WEIGHTS, recency_weight=recency_weight, recency_half_life=RECENCY_HALF_LIFE)
+
+        # item_id -> 条目（item_type, parent_post_id, author, time, content）
+        self._items = {}
+        self._etag = None
+        self._watermark = None
+        self._refreshed_at = 0.0
+        self._stale = True
+        # 本地镜像 / 副本模式下上次建立索引时的快照版本
+        self._source_version = None
+        self.last_error = None
+        self._refresh_lock = threading.Lock()
+
+    def mark_stale(self):
+        """本进程写入后调用，下次搜索时立即检查变化"""
+        self._stale = True
+
+    def _index_item(self, item):
+        item_id = item.get("item_id")
+        entry = {
+            "item_id": item_id,
+            "item_type": item.get("item_type") or "post",
+            "parent_post_id": item.get("parent_post_id"),
+            "author": item.get("author_username"),
+            "time": item.get("created_at"),
+            "content": item.get("content") or "",
+        }
+        old = self._items.get(item_id)
+        self._items[item_id] = entry
+        # 内容和作者都没变时不用重新切分
+        if old and old["content"] == entry["content"] and old["author"] == entry["author"]:
+            return
+        self.index.add(
+            item_id,
+            {"content": entry["content"], "author": entry["author"] or ""},
+            timestamp=_timestamp(entry["time"]),
+        )
+
+    def _remove_item(self, item_id):
+        self._items.pop(item_id, None)
+        self.index.remove(item_id)
+
+    def apply(self, data, full):
+        items = list(flatten_items(data.get("data") or []))
+        if full:
+            # 完整快照：删除快照里已经没有的条目，其余按内容是否变化增量更新
+            current = {item.get("item_id") for item in items}
+            for item_id in [item_id for item_id in self._items if item_id not in current]:
+                self._remove_item(item_id)
+        for item in items:
+            self._index_item(item)
+
+        deleted = set(data.get("deleted") or [])
+        if deleted:
+            # 删除帖子时连同它的回复一起删除
+            orphans = [item_id for item_id, entry in self._items.items() if entry["parent_post_id"] in deleted]
+            for item_id in deleted.union(orphans):
+                self._remove_item(item_id)
+
+    def _refresh_from_local(self, mode):
+        """从心语墙的本地镜像（sync）或副本（replica）更新索引，快照没有变化时什么也不做"""
+        if mode == "sync":
+            from utils.post_sync import get_feed_mirror
+            source = get_feed_mirror()
+            # 镜像自己按同步间隔决定是否请求后端；失败时继续使用已有的快照
+            ok, result = source.sync()
+            self.last_error = None if ok else result
+        else:
+            from utils.post_replica import get_post_replica
+            source = get_post_replica()
+            self.last_error = source.last_error if get_base_host() else None
+
+        version = source.version
+        if version == self._source_version:
+            return
+        with self._refresh_lock:
+            if version == self._source_version:
+                return
+            self.apply({"data": source.items()}, full=True)
+            self._source_version = version
+            self._stale = False
+
+    def refresh(self, force=False):
+        """检查并应用变化；其他线程正在刷新时直接使用当前索引"""
+        mode = get_feed_mode()
+        if mode in ("sync", "replica"):
+            self._refresh_from_local(mode)
+            return
+        if not force and not self._stale and time.monotonic() - self._refreshed_at < self.refresh_interval:
+            return
+        if not get_base_host():
+            self.last_error = "服务器配置错误：未找到 DataBaseHOST，无法搜索"
+            return
+        if not self._refresh_lock.acquire(blocking=not self._items):
+            return
+        try:
+            ok, result = fetch_changes(self._etag, self._watermark)
+            self._refreshed_at = time.monotonic()
+            if not ok:
+                self.last_error = result
+                return
+            self.last_error = None
+            self._stale = False
+            if result is None:
+                return
+
+            data, etag = result
+            supports_delta = "watermark" in data
+            self.apply(data, full=not (supports_delta and self._watermark))
+            self._etag = etag
+            self._watermark = data.get("watermark") if supports_delta else None
+        finally:
+            self._refresh_lock.release()
+
+    def search(self, query, limit=20):
+        """
+        搜索帖子和回复，返回 (True, [条目 + score, ...]) 或 (False, 错误信息)
+        刷新失败但索引中已有数据时仍返回结果
+        """
+        self.refresh()
+        if self.last_error and not self._items:
+            return False, self.last_error
+
+        results = []
+        for item_id, score in self.index.search(query, limit=limit):
+            entry = self._items.get(item_id)
+            if entry:
+                results.append(dict(entry, score=score))
+        return True, results
+
+    def stats(self):
+        stats = self.index.stats()
+        stats.update({"watermark": self._watermark, "last_error": self.last_error})
+        return stats
+
+
+_search = None
+_search_lock = threading.Lock()
+
+
+def get_post_search():
+    """获取进程级共享的搜索索引"""
+    global _search
+    if _search is None:
+        with _search_lock:
+            if _search is None:
+                _search = PostSearch(
+                    get_float_setting("POST_SEARCH_REFRESH", DEFAULT_REFRESH_INTERVAL),
+                    get_float_setting("POST_SEARCH_RECENCY_WEIGHT", DEFAULT_RECENCY_WEIGHT),
+                )
+    return _search
+
+
+def mark_search_stale():
+    """写入后调用；索引还没有建立时什么也不做"""
+    if _search is not None:
+        _search.mark_stale()
@@ -0,0 +1,305 @@
+"""
+心语墙增量同步（POST_FEED_MODE = "sync" 时使用）：
+- 进程内保存一份完整的帖子镜像，所有会话共享
+- 同步时带上 If-None-Match（上次的 ETag）和 since（上次的水位线），
+  后端只返回新增或修改过的帖子/回复，没有变化时返回 304
+- 新数据按 item_id 合并进本地镜像，页面从镜像中按游标分页读取
+接口约定见 docs/backend_api.md
+"""
+import threading
+import time
+
+from utils.api_client import api_get, get_base_host
+from utils.config import get_float_setting
+from utils.post_feed import (
+    DEFAULT_PAGE_SIZE,
+    _sort_key,
+    decode_cursor,
+    encode_cursor,
+    normalize_post,
+)
+
+# 两次同步之间的最短间隔（秒），可通过 POST_SYNC_INTERVAL 配置
+DEFAULT_SYNC_INTERVAL = 5.0
+
+
+def flatten_items(items):
+    """把完整快照里内嵌的 replies 展开成与增量数据相同的扁平记录"""
+    for item in items:
+        if item.get("item_type") == "reply":
+            yield item
+            continue
+        yield dict(item, item_type="post", parent_post_id=None)
+        for reply in item.get("replies") or []:
+            yield dict(reply, item_type="reply", parent_post_id=item.get("item_id"))
+
+
+def fetch_changes(etag=None, watermark=None):
+    """
+    按增量同步约定读取变化：
+    - 返回 (True, None) 表示没有变化（304）
+    - 返回 (True, (响应数据, 新的 ETag))
+    - 返回 (False, 错误信息)
+    """
+    headers = {}
+    params = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if watermark:
+        params["since"] = watermark
+
+    try:
+        resp = api_get("/api/post_items", "post_items_read", params=params, headers=headers)
+    except Exception as e:
+        return False, f"获取帖子失败：远程服务异常（{e}）"
+
+    if resp.status_code == 304:
+        return True, None
+
+    try:
+        data = resp.json()
+    except Exception:
+        return False, f"获取帖子失败：远程服务返回异常：HTTP {resp.status_code}"
+
+    if not isinstance(data, dict) or not data.get("success"):
+        msg = data.get("message", "未知错误") if isinstance(data, dict) else "服务返回格式错误"
+        return False, f"获取帖子失败：{msg}"
+
+    return True, (data, resp.headers.get("ETag"))
+
+
+class FeedMirror:
+    """
+    读者拿到的是不可变的快照：同步时先在锁外读取变化，再在当前快照的副本上合并（copy-on-write），
+    最后整体替换；已经发布出去的帖子、回复列表和排序结果都不会再被修改，页面线程读取时不需要加锁
+    """
+
+    def __init__(self, sync_interval):
+        self.sync_interval = sync_interval
+
+        # 当前快照：item_id -> 帖子原始数据（replies 为回复列表）
+        self._posts = {}
+        # 回复 item_id -> 所属帖子 item_id（包括父帖子尚未同步到的回复），按 id 删除回复时使用
+        self._reply_parents = {}
+        # 父帖子尚未同步到的回复：parent_post_id -> {item_id: reply}
+        self._orphan_replies = {}
+        self._ordered = ()
+        self._etag = None
+        self._watermark = None
+        self._synced_at = 0.0
+        self._stale = True
+
+        self.full_syncs = 0
+        self.delta_syncs = 0
+        self.not_modified = 0
+        # 快照每替换一次加一，搜索索引据此判断是否需要更新
+        self.version = 0
+
+        # 保护同步状态（ETag、水位线、过期标记、快照的替换）
+        self._lock = threading.Lock()
+        # 同一时间只进行一次同步；网络请求期间只持有这把锁
+        self._sync_lock = threading.Lock()
+
+    def mark_stale(self):
+        """本进程写入后调用，下次读取时立即同步（增量同步代价很小）"""
+        with self._lock:
+            self._stale = True
+
+    def _is_due(self, now):
+        return self._stale or now - self._synced_at >= self.sync_interval
+
+    def _merge(self, data, full):
+        """
+        在当前快照的副本上合并一次同步的数据，返回新的 (posts, reply_parents, orphan_replies)；
+        当前快照保持不变（只有持有 _sync_lock 的线程会调用）
+        """
+        if full:
+            posts, reply_parents, orphans = {}, {}, {}
+        else:
+            posts = dict(self._posts)
+            reply_parents = dict(self._reply_parents)
+            orphans = {parent_id: dict(replies) for parent_id, replies in self._orphan_replies.items()}
+        # 本次合并中新建的帖子对象，可以就地修改；其余帖子要先复制
+        owned = set()
+
+        def writable(post_id):
+            if post_id not in owned:
+                post = posts[post_id]
+                posts[post_id] = dict(post, replies=list(post.get("replies") or []))
+                owned.add(post_id)
+            return posts[post_id]
+
+        def merge_reply(reply):
+            reply_id = reply.get("item_id")
+            parent_id = reply.get("parent_post_id")
+            reply_parents[reply_id] = parent_id
+            if parent_id not in posts:
+                orphans.setdefault(parent_id, {})[reply_id] = reply
+                return
+
+            replies = writable(parent_id)["replies"]
+            for i, existing in enumerate(replies):
+                if existing.get("item_id") == reply_id:
+                    replies[i] = reply
+                    break
+            else:
+                replies.append(reply)
+                replies.sort(key=lambda r: r.get("created_at") or "")
+
+        def merge_post(item):
+            item_id = item.get("item_id")
+            existing = posts.get(item_id)
+            new_post = dict(item)
+            if existing is not None and not item.get("replies"):
+                # 增量数据里的帖子不一定带回复，保留已有回复
+                new_post["replies"] = list(existing.get("replies") or [])
+            else:
+                new_post["replies"] = list(item.get("replies") or [])
+                for reply in new_post["replies"]:
+                    reply_parents[reply.get("item_id")] = item_id
+            posts[item_id] = new_post
+            owned.add(item_id)
+
+            for reply in orphans.pop(item_id, {}).values():
+                merge_reply(reply)
+
+        for item in data.get("data") or []:
+            if item.get("item_type") == "reply":
+                merge_reply(item)
+            else:
+                merge_post(item)
+
+        for item_id in data.get("deleted") or []:
+            post = posts.pop(item_id, None)
+            if post is not None:
+                for reply in post.get("replies") or []:
+                    reply_parents.pop(reply.get("item_id"), None)
+                for reply_id in orphans.pop(item_id, {}):
+                    reply_parents.pop(reply_id, None)
+                continue
+
+            parent_id = reply_parents.pop(item_id, None)
+            if parent_id in posts:
+                post = writable(parent_id)
+                post["replies"] = [r for r in post["replies"] if r.get("item_id") != item_id]
+            elif parent_id in orphans:
+                orphans[parent_id].pop(item_id, None)
+
+        return posts, reply_parents, orphans
+
+    def sync(self, force=False):
+        """
+        与后端同步一次，返回 (True, 是否有变化) 或 (False, 错误信息)
+        未到同步间隔且没有被标记为过期时直接返回；已有数据时不等待其他线程正在进行的同步
+        """
+        with self._lock:
+            if not force and not self._is_due(time.monotonic()):
+                return True, False
+
+        if not get_base_host():
+            return False, "服务器配置错误：未找到 DataBaseHOST，无法加载帖子"
+
+        # 还没有任何数据时只能等待；否则直接读当前快照，由正在同步的线程更新
+        if not self._sync_lock.acquire(blocking=not self._synced_at):
+            return True, False
+        try:
+            with self._lock:
+                now = time.monotonic()
+                # 等锁期间其他线程可能刚同步完
+                if not force and not self._is_due(now):
+                    return True, False
+                etag, watermark = self._etag, self._watermark
+                # 同步期间再有写入会重新标记过期，下次读取时再同步
+                was_stale, self._stale = self._stale, False
+
+            ok, result = fetch_changes(etag, watermark)
+            if not ok:
+                with self._lock:
+                    self._stale = self._stale or was_stale
+                return False, result
+
+            if result is None:
+                with self._lock:
+                    self.not_modified += 1
+                    self._synced_at = now
+                return True, False
+
+            data, new_etag = result
+            # 后端返回了 watermark 说明支持增量；否则本次结果是完整快照
+            supports_delta = "watermark" in data
+            full = not (supports_delta and watermark)
+            posts, reply_parents, orphans = self._merge(data, full)
+            ordered = tuple(sorted(posts.values(), key=_sort_key, reverse=True))
+
+            with self._lock:
+                self._posts = posts
+                self._reply_parents = reply_parents
+                self._orphan_replies = orphans
+                self._ordered = ordered
+                self.version += 1
+                if full:
+                    self.full_syncs += 1
+                else:
+                    self.delta_syncs += 1
+                self._etag = new_etag
+                self._watermark = data.get("watermark") if supports_delta else None
+                self._synced_at = now
+            return True, True
+        finally:
+            self._sync_lock.release()
+
+    def page(self, cursor=None, limit=DEFAULT_PAGE_SIZE):
+        """从本地镜像按游标读取一页，返回值同 utils.post_feed.fetch_post_page"""
+        ok, result = self.sync()
+        stale = False
+        if not ok:
+            # 同步失败（熔断、超时等）时，只要镜像里已有数据就继续提供，页面降级显示
+            if not self._synced_at:
+                return False, result
+            stale = True
+
+        ordered = self._ordered
+        if cursor:
+            boundary = decode_cursor(cursor)
+            ordered = [item for item in ordered if _sort_key(item) < boundary]
+
+        page = ordered[:limit]
+        next_cursor = None
+        if len(ordered) > limit and page:
+            next_cursor = encode_cursor(page[-1].get("created_at"), page[-1].get("item_id"))
+
+        data = {
+            "posts": [normalize_post(item) for item in page],
+            "next_cursor": next_cursor,
+        }
+        if stale:
+            data["stale"] = True
+            data["error"] = result
+        return True, data
+
+    def items(self):
+        """镜像中的全部帖子（按时间倒序，原始结构）"""
+        return list(self._ordered)
+
+    def stats(self):
+        return {
+            "posts": len(self._posts),
+            "full_syncs": self.full_syncs,
+            "delta_syncs": self.delta_syncs,
+            "not_modified": self.not_modified,
+            "watermark": self._watermark,
+        }
+
+
+_mirror = None
+_mirror_lock = threading.Lock()
+
+
+def get_feed_mirror():
+    """获取进程级共享的帖子镜像"""
+    global _mirror
+    if _mirror is None:
+        with _mirror_lock:
+            if _mirror is None:
+                _mirror = FeedMirror(get_float_setting("POST_SYNC_INTERVAL", DEFAULT_SYNC_INTERVAL))
+    return _mirror
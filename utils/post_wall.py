@@ -0,0 +1,125 @@
+"""
+心语墙批量渲染（POST_RENDER_MODE = "batched" 时使用）：
+- 整面墙（已加载的所有帖子和回复）拼成一段 HTML，只向浏览器发送一个元素，
+  不再为每个帖子/回复各发送 expander、markdown、columns、按钮等多个元素
+- 所有用户内容都先做 HTML 转义
+- 在限定高度（POST_WALL_HEIGHT）的滚动区域内显示，每张卡片使用 content-visibility: auto，
+  浏览器只对滚动到可见区域附近的卡片做布局和绘制（帖子很多时滚动依然流畅）
+- 回复、展开回复等交互控件仍由页面用 Streamlit 组件渲染
+"""
+import html
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+from utils.config import get_int_setting
+
+# 滚动区域最大高度（像素），可通过 POST_WALL_HEIGHT 配置
+DEFAULT_WALL_HEIGHT = 900
+
+# 估算内容高度用：帖子卡片和每条回复的大致高度（像素）
+ESTIMATED_POST_HEIGHT = 200
+ESTIMATED_REPLY_HEIGHT = 70
+
+WALL_STYLE = """
+<style>
+    body { margin: 0; font-family: sans-serif; color: #31333F; }
+    .wall { height: 100vh; overflow-y: auto; padding-right: 4px; box-sizing: border-box; }
+    .post-card {
+        content-visibility: auto;
+        contain-intrinsic-size: auto 220px;
+        border: 1px solid #EEE;
+        border-radius: 10px;
+        padding: 12px 16px;
+        margin-bottom: 14px;
+    }
+    .post-header { font-weight: bold; color: #9C6ADE; }
+    .post-content {
+        background-color: #F9F0FF;
+        border-radius: 10px;
+        padding: 15px;
+        border-left: 3px solid #9C6ADE;
+        white-space: pre-wrap;
+        margin-top: 10px;
+    }
+    .reply-count { font-size: 0.9rem; color: #666; margin: 10px 0; }
+    .reply { margin-left: 20px; margin-bottom: 10px; }
+    .reply-meta { font-size: 0.9em; color: #666; }
+    .reply-content {
+        background-color: #F0F0F0;
+        padding: 10px;
+        border-radius: 5px;
+        margin-top: 5px;
+        white-space: pre-wrap;
+    }
+    .more-replies { margin-left: 20px; font-size: 0.85rem; color: #9C6ADE; }
+</style>
+"""
+
+
+def _reply_html(reply):
+    return (
+        '<div class="reply">'
+        f'<div class="reply-meta">{html.escape(str(reply["author"]))} · {html.escape(str(reply["time"]))}</div>'
+        f'<div class="reply-content">{html.escape(reply["content"] or "")}</div>'
+        '</div>'
+    )
+
+
+def _post_html(post, expanded_replies=None):
+    """
+    单个帖子卡片：
+    - expanded_replies 为页面已读取的完整回复（懒加载模式下用户展开的帖子）
+    - 否则显示帖子自带的回复；懒加载预览只显示最新一条
+    """
+    parts = [
+        '<div class="post-card">',
+        f'<div class="post-header">✨ {html.escape(str(post["author"]))} · {html.escape(str(post["time"]))}</div>',
+        f'<div class="post-content">{html.escape(post["content"] or "")}</div>',
+    ]
+
+    reply_count = post.get("reply_count", 0)
+    if reply_count:
+        parts.append(f'<div class="reply-count">💬 {reply_count}条回复</div>')
+    else:
+        parts.append('<div class="reply-count">💬 暂无回复</div>')
+
+    replies = expanded_replies if expanded_replies is not None else post.get("replies")
+    if replies is not None:
+        parts.extend(_reply_html(reply) for reply in replies)
+    elif post.get("latest_reply"):
+        parts.append(_reply_html(post["latest_reply"]))
+        if reply_count > 1:
+            parts.append(f'<div class="more-replies">还有 {reply_count - 1} 条回复，可在下方展开</div>')
+
+    parts.append('</div>')
+    return "".join(parts)
+
+
+def build_wall_html(posts, expanded_replies=None):
+    """把帖子列表拼成一段完整的 HTML；expanded_replies 为 {帖子 id: 完整回复列表}"""
+    expanded_replies = expanded_replies or {}
+    cards = "".join(_post_html(post, expanded_replies.get(post["id"])) for post in posts)
+    return f'{WALL_STYLE}<div class="wall">{cards}</div>'
+
+
+def _estimate_height(posts, expanded_replies):
+    total = 0
+    for post in posts:
+        replies = expanded_replies.get(post["id"], post.get("replies"))
+        shown = len(replies) if replies is not None else (1 if post.get("latest_reply") else 0)
+        total += ESTIMATED_POST_HEIGHT + shown * ESTIMATED_REPLY_HEIGHT
+    return total
+
+
+def render_post_wall(posts, expanded_replies=None, height=None):
+    """以单个元素渲染整面心语墙；帖子不多时按内容估算高度，避免大片空白"""
+    expanded_replies = expanded_replies or {}
+    if height is None:
+        max_height = get_int_setting("POST_WALL_HEIGHT", DEFAULT_WALL_HEIGHT)
+        height = min(max_height, _estimate_height(posts, expanded_replies))
+    wall_html = build_wall_html(posts, expanded_replies)
+    if hasattr(st, "iframe"):
+        st.iframe(wall_html, height=height)
+    else:
+        components.html(wall_html, height=height)
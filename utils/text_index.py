@@ -0,0 +1,216 @@
+"""
+内存倒排索引（中文按字二元组切分）：
+- 中文连续片段切成相邻两字的二元组（单字片段保留单字），英文和数字按整词、小写
+- 查询单个汉字时合并包含该字的所有二元组
+- 文档可以有多个字段（如正文、作者），每个字段有各自的权重
+- 支持增量添加、更新和删除文档，不需要重建整个索引
+- 按 BM25 计算相关度，可选按文档时间加权（越新的文档得分越高）
+- 可以导出为紧凑的 JSON 结构保存到磁盘，之后直接加载，不需要重新切分文档
+"""
+import math
+import re
+import threading
+import time
+from collections import Counter
+
+# 中日韩统一表意文字（含扩展 A）
+_CJK_RANGES = "㐀-䶿一-鿿豈-﫿"
+_TOKEN_PATTERN = re.compile(f"[{_CJK_RANGES}]+|[a-z0-9]+")
+_CJK_PATTERN = re.compile(f"[{_CJK_RANGES}]")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text):
+    """切分文本：中文二元组 + 英文/数字整词"""
+    tokens = []
+    for match in _TOKEN_PATTERN.finditer((text or "").lower()):
+        segment = match.group()
+        if not _CJK_PATTERN.match(segment):
+            tokens.append(segment)
+        elif len(segment) == 1:
+            tokens.append(segment)
+        else:
+            tokens.extend(segment[i:i + 2] for i in range(len(segment) - 1))
+    return tokens
+
+
+class TextIndex:
+    def __init__(self, field_weights=None, recency_weight=0.0, recency_half_life=30 * 86400):
+        """
+        field_weights: {字段名: 权重}，未列出的字段权重为 1
+        recency_weight: 时间加权的比例（0 表示只按相关度排序）
+        recency_half_life: 时间加权的半衰期（秒）
+        """
+        self.field_weights = field_weights or {}
+        self.recency_weight = recency_weight
+        self.recency_half_life = recency_half_life
+
+        # token -> {doc_id: 加权词频}
+        self._postings = {}
+        # doc_id -> (加权词频 Counter, 文档长度, 时间戳)
+        self._docs = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def __contains__(self, doc_id):
+        return doc_id in self._docs
+
+    def _remove(self, doc_id):
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return
+        term_freqs, length, _ = doc
+        self._total_length -= length
+        for token in term_freqs:
+            posting = self._postings.get(token)
+            if posting is None:
+                continue
+            posting.pop(doc_id, None)
+            if not posting:
+                del self._postings[token]
+
+    def add(self, doc_id, fields, timestamp=None):
+        """添加或更新一个文档；fields 为 {字段名: 文本}，timestamp 为 Unix 时间（用于时间加权）"""
+        term_freqs = Counter()
+        length = 0
+        for field, text in fields.items():
+            weight = self.field_weights.get(field, 1.0)
+            tokens = tokenize(text)
+            length += len(tokens)
+            for token in tokens:
+                term_freqs[token] += weight
+
+        with self._lock:
+            self._remove(doc_id)
+            self._docs[doc_id] = (term_freqs, length, timestamp)
+            self._total_length += length
+            for token, freq in term_freqs.items():
+                self._postings.setdefault(token, {})[doc_id] = freq
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+
+    def clear(self):
+        with self._lock:
+            self._postings = {}
+            self._docs = {}
+            self._total_length = 0
+
+    def _recency(self, timestamp, now):
+        if not self.recency_weight or timestamp is None:
+            return 1.0
+        age = max(0.0, now - timestamp)
+        decay = 0.5 ** (age / self.recency_half_life)
+        return (1.0 - self.recency_weight) + self.recency_weight * decay
+
+    def _posting(self, token):
+        """查询词对应的倒排表；单个汉字在二元组索引里没有独立条目，合并包含它的所有二元组"""
+        posting = self._postings.get(token)
+        if posting is not None or len(token) != 1 or not _CJK_PATTERN.match(token):
+            return posting or {}
+        merged = {}
+        for indexed_token, indexed_posting in self._postings.items():
+            if token in indexed_token:
+                for doc_id, freq in indexed_posting.items():
+                    merged[doc_id] = max(merged.get(doc_id, 0), freq)
+        return merged
+
+    def search(self, query, limit=20, require_all=True):
+        """
+        搜索，返回 [(doc_id, 得分), ...]，按得分从高到低
+        require_all 为 True 时只返回包含全部查询词的文档；没有这样的文档时退回到包含任一查询词
+        """
+        query_tokens = list(dict.fromkeys(tokenize(query)))
+        if not query_tokens:
+            return []
+
+        with self._lock:
+            doc_count = len(self._docs)
+            if not doc_count:
+                return []
+            avg_length = self._total_length / doc_count or 1.0
+            postings = [self._posting(token) for token in query_tokens]
+
+            candidates = None
+            if require_all:
+                for posting in sorted(postings, key=len):
+                    candidates = set(posting) if candidates is None else candidates & set(posting)
+                    if not candidates:
+                        break
+            if not candidates:
+                candidates = set().union(*postings)
+
+            now = time.time()
+            scores = []
+            for doc_id in candidates:
+                _, length, timestamp = self._docs[doc_id]
+                score = 0.0
+                for posting in postings:
+                    freq = posting.get(doc_id)
+                    if not freq:
+                        continue
+                    idf = math.log(1 + (doc_count - len(posting) + 0.5) / (len(posting) + 0.5))
+                    norm = freq + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                    score += idf * freq * (BM25_K1 + 1) / norm
+                scores.append((doc_id, score * self._recency(timestamp, now)))
+
+        scores.sort(key=lambda item: item[1], reverse=True)
+        return scores[:limit]
+
+    def self_score(self, text):
+        """
+        把 text 当作一个文档、再用它自己查询时的 BM25 得分（按当前索引的文档数和平均长度计算），
+        用来把 search() 的得分换算成 0~1 之间的相似度；不在索引里的词按最大 idf 计算
+        """
+        term_freqs = Counter(tokenize(text))
+        length = sum(term_freqs.values())
+        with self._lock:
+            doc_count = len(self._docs)
+            avg_length = (self._total_length / doc_count if doc_count else length) or 1.0
+            score = 0.0
+            for token, freq in term_freqs.items():
+                df = len(self._posting(token))
+                idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                norm = freq + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                score += idf * freq * (BM25_K1 + 1) / norm
+        return score
+
+    def to_dict(self):
+        """导出为可以 JSON 序列化的紧凑结构（doc_id 需要是字符串或整数，倒排表里的文档用序号表示）"""
+        with self._lock:
+            position = {doc_id: i for i, doc_id in enumerate(self._docs)}
+            return {
+                "docs": [[doc_id, length, timestamp] for doc_id, (_, length, timestamp) in self._docs.items()],
+                "postings": {
+                    token: [[position[doc_id], int(freq) if freq == int(freq) else freq] for doc_id, freq in posting.items()]
+                    for token, posting in self._postings.items()
+                },
+            }
+
+    @classmethod
+    def from_dict(cls, data, field_weights=None, recency_weight=0.0, recency_half_life=30 * 86400):
+        """从 to_dict() 的结果恢复索引；恢复后仍然可以增量添加、更新和删除文档"""
+        index = cls(field_weights, recency_weight, recency_half_life)
+        doc_ids = []
+        for doc_id, length, timestamp in data["docs"]:
+            index._docs[doc_id] = (Counter(), length, timestamp)
+            index._total_length += length
+            doc_ids.append(doc_id)
+        for token, entries in data["postings"].items():
+            posting = {}
+            for position, freq in entries:
+                doc_id = doc_ids[position]
+                posting[doc_id] = freq
+                index._docs[doc_id][0][token] = freq
+            index._postings[token] = posting
+        return index
+
+    def stats(self):
+        with self._lock:
+            return {"documents": len(self._docs), "tokens": len(self._postings)}
@@ -6,8 +6,8 @@ from datetime import datetime
 import hashlib
 
 import bcrypt  # 需要先安装: pip install bcrypt
-import requests
-import streamlit as st
+
+from utils.api_client import api_post, get_base_host
 
 class UserManager:
     def __init__(self):
@@ -94,20 +94,10 @@ class UserManager:
         user_id = str(uuid.uuid4())
         created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-        # 3. 远程 API 地址从配置读取
-        try:
-            # 优先从 secrets 中读取，如果不存在则尝试使用一个合理的默认值
-            base_host = st.secrets.get("DataBaseHOST", "").strip()
-        except Exception:
-            base_host = ""
-
-        if not base_host:
+        # 3. 远程 API 地址从配置读取（统一由 utils.api_client 处理）
+        if not get_base_host():
             return False, "服务器配置错误：未找到 DataBaseHOST"
 
-        base_host = base_host.rstrip("/")
-
-        url = f"{base_host}/api/users"
-
         # 4. 组装要发送的 JSON 数据
         #    根据是否有 avatar_file 来设置 avatar_path
         avatar_path_flag = "user_avatar" if avatar_file is not None else "default"
@@ -134,7 +124,7 @@ class UserManager:
             files["avatar"] = (avatar_file.name, avatar_file.getvalue(), avatar_file.type or "application/octet-stream")
 
         try:
-            resp = requests.post(url, files=files, timeout=10)
+            resp = api_post("/api/users", "users", files=files)
         except Exception as e:
             return False, f"远程服务调用失败：{e}"
 
@@ -183,15 +173,10 @@ class UserManager:
         # ===== 以上为旧逻辑，仅供参考 =====
 
         # 1. 从配置获取远程 HOST
-        try:
-            base_host = st.secrets.get("DataBaseHOST", "").strip()
-        except Exception:
-            base_host = ""
-
+        base_host = get_base_host()
         if not base_host:
             return False, "服务器配置错误：未找到 DataBaseHOST"
 
-        base_host = base_host.rstrip("/")
         url = f"{base_host}/api/login"
 
         # 2. 在本地按注册时相同的方法计算“传输哈希”（确定性）
@@ -212,7 +197,7 @@ class UserManager:
 
         # 4. 调用远程登录接口
         try:
-            resp = requests.post(url, json=payload, timeout=10)
+            resp = api_post("/api/login", "login", json=payload)
         except Exception as e:
             return False, f"远程服务调用失败：{e}"
 